@@ -0,0 +1,334 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Bulk product import from CSV or NDJSON.
+
+Rows are streamed from the input, validated with ``ProductCreate`` and
+written in chunks of IMPORT_CHUNK_SIZE, one transaction per chunk, with
+Core ``executemany`` statements instead of one ORM flush per product.
+Memory use depends on the chunk size, not on the size of the input.
+
+Rows with a SKU replace the fields of the product that already has it
+(rows that change nothing are skipped); other rows are inserted. Because these writes bypass
+the ORM, each chunk stamps catalog versions (changes.py), bumps the shared
+generation and publishes its changes (events.py) itself, so caches and
+indexes stay current. A chunk that breaks a constraint (say a SKU another
+writer inserted meanwhile) is rolled back and its rows reported as failed;
+the import goes on with the next chunk. Any other failure (the database is
+locked, the feed cannot be decoded) ends the import with a last report
+that carries the error.
+"""
+
+import os
+import csv
+import json
+import time
+import queue
+import codecs
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from app.catalog.changes import reserve_versions
+from app.catalog.events import INSERT, UPDATE, ProductChange, bump_shared_generation, catalog_events
+from app.models.models import Product
+from app.schemas import ProductCreate
+
+logger = logging.getLogger(__name__)
+
+CSV = "csv"
+NDJSON = "ndjson"
+FORMATS = (CSV, NDJSON)
+
+_TABLE = Product.__table__
+_COLUMNS = tuple(column.key for column in _TABLE.columns)
+_IMPORTED = tuple(ProductCreate.model_fields)
+
+
+def read_rows(lines: Iterable[str], format: str) -> Iterator[Tuple[int, Any]]:
+    """(line number, row) pairs from CSV (with a header) or NDJSON text.
+
+    A line that cannot be parsed is yielded with the exception in place of
+    the row. Empty CSV cells are left out, so the field defaults apply.
+    """
+    if format == CSV:
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, {key: value for key, value in row.items() if key and value not in ("", None)}
+    elif format == NDJSON:
+        for number, line in enumerate(lines, 1):
+            if line.strip():
+                try:
+                    yield number, json.loads(line)
+                except ValueError as error:
+                    yield number, error
+    else:
+        raise ValueError(f"Unknown import format: {format}")
+
+
+class LineFeed:
+    """Text lines of a feed whose bytes are still arriving on another thread.
+
+    The receiver hands chunks over with put() and ends the feed with
+    put(None). At most `max_chunks` chunks wait at once, so a slow import
+    holds back the upload instead of buffering it. Lines keep their endings
+    (csv needs them) and a leading byte order mark is dropped.
+    """
+
+    def __init__(self, max_chunks: int = 16):
+        self._chunks: "queue.Queue[Optional[bytes]]" = queue.Queue(max_chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._aborted = False
+        self._closed = False
+
+    def put(self, data: Optional[bytes], block: bool = True) -> bool:
+        """Queue a chunk, or None for the end; False if the queue is full and `block` is off."""
+        if self._closed:
+            # Nobody is reading any more
+            return True
+        try:
+            self._chunks.put(data, block)
+        except queue.Full:
+            return False
+        return True
+
+    def abort(self):
+        """End the feed early: the reader raises EOFError rather than import a truncated feed as complete."""
+        self._aborted = True
+        self.put(None, block=False)
+
+    def close(self):
+        """Stop reading, and drop what is queued so a blocked put() returns."""
+        self._closed = True
+        while True:
+            try:
+                self._chunks.get_nowait()
+            except queue.Empty:
+                return
+
+    def __iter__(self) -> Iterator[str]:
+        pending = ""
+        try:
+            while True:
+                data = self._chunks.get()
+                if self._aborted:
+                    raise EOFError("The feed ended early")
+                pending += self._decoder.decode(data or b"", final=data is None)
+                lines = pending.split("\n")
+                pending = lines.pop()
+                for line in lines:
+                    yield line + "\n"
+                if data is None:
+                    if pending:
+                        yield pending
+                    return
+        finally:
+            self.close()
+
+
+class ImportReport:
+    """Running totals of an import; `rows` = inserted + updated + unchanged + failed."""
+
+    def __init__(self, max_errors: int = 100):
+        self.rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.failed = 0
+        # First failures only, so a broken feed cannot fill memory
+        self.errors: List[Dict[str, Any]] = []
+        self.max_errors = max_errors
+        self.done = False
+        # Why the import stopped early, if it did
+        self.error: Optional[str] = None
+        self._started = time.perf_counter()
+        self.seconds = 0.0
+
+    def fail(self, line: int, message: str, rows: int = 1):
+        self.failed += rows
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line, "error": message})
+
+    def tick(self):
+        self.seconds = time.perf_counter() - self._started
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "rows": self.rows,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "failed": self.failed,
+            "seconds": round(self.seconds, 3),
+            "rows_per_second": round(self.rows / self.seconds) if self.seconds else 0,
+            "done": self.done,
+            "error": self.error,
+            "errors": self.errors,
+        }
+
+
+class BulkImporter:
+    """Validates and writes product rows in chunked transactions."""
+
+    def __init__(self, chunk_size: int = 5000, max_errors: int = 100):
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+
+    def run(self, bind, lines: Iterable[str], format: str,
+            progress: Optional[Callable[[ImportReport], None]] = None) -> ImportReport:
+        """Import every row, calling `progress` after each written chunk and once at the end."""
+        for report in self.steps(bind, lines, format):
+            if progress is not None:
+                progress(report)
+        return report
+
+    def steps(self, bind, lines: Iterable[str], format: str) -> Iterator[ImportReport]:
+        """Import every row, yielding the running report after each written chunk and once at the end.
+
+        The last report is always yielded, with `error` set if the import stopped early.
+        """
+        report = ImportReport(self.max_errors)
+        chunk: List[Dict[str, Any]] = []
+        first = last = 0
+        try:
+            for line, row in read_rows(lines, format):
+                report.rows += 1
+                if isinstance(row, Exception):
+                    report.fail(line, f"Invalid JSON: {row}")
+                    continue
+                try:
+                    values = ProductCreate.model_validate(row).model_dump()
+                except ValidationError as error:
+                    report.fail(line, "; ".join(
+                        f"{'.'.join(str(part) for part in detail['loc']) or 'row'}: {detail['msg']}"
+                        for detail in error.errors()
+                    ))
+                    continue
+                if not chunk:
+                    first = line
+                last = line
+                chunk.append(values)
+                if len(chunk) >= self.chunk_size:
+                    written, chunk = chunk, []
+                    self._write_chunk(bind, written, first, last, report)
+                    report.tick()
+                    yield report
+            if chunk:
+                written, chunk = chunk, []
+                self._write_chunk(bind, written, first, last, report)
+        except Exception as error:
+            # Rows read but not yet in a chunk were never written
+            if chunk:
+                report.fail(first, f"Lines {first}-{last} not imported: the import stopped", rows=len(chunk))
+            reason = getattr(error, "orig", None) or error
+            report.error = f"{type(reason).__name__}: {reason}"
+            logger.exception("Import stopped")
+        report.done = True
+        report.tick()
+        logger.info(f"Imported {report.rows:,} rows in {report.seconds:.1f}s: {report.inserted:,} inserted, "
+                    f"{report.updated:,} updated, {report.unchanged:,} unchanged, {report.failed:,} failed")
+        yield report
+
+    def _write_chunk(self, bind, chunk: List[Dict[str, Any]], first: int, last: int, report: ImportReport):
+        counts = report.inserted, report.updated, report.unchanged
+        try:
+            self._write(bind, chunk, report)
+        except SQLAlchemyError as error:
+            # The transaction rolled back, so none of the chunk's rows were written
+            report.inserted, report.updated, report.unchanged = counts
+            reason = getattr(error, "orig", None) or error
+            report.fail(first, f"Lines {first}-{last} not imported: {reason}", rows=len(chunk))
+            logger.warning(f"Import chunk at lines {first}-{last} failed: {reason}")
+            # A constraint only concerns these rows; anything else would fail the next chunk too
+            if not isinstance(error, IntegrityError):
+                raise
+
+    def _write(self, bind, chunk: List[Dict[str, Any]], report: ImportReport):
+        # The last row for a SKU wins; earlier ones in the chunk count as updates it superseded
+        plain = []
+        by_sku: Dict[str, Dict[str, Any]] = {}
+        for values in chunk:
+            if values["sku"] is None:
+                plain.append(values)
+            else:
+                if values["sku"] in by_sku:
+                    report.updated += 1
+                by_sku[values["sku"]] = values
+
+        with bind.begin() as connection:
+            existing = {
+                row.sku: row._mapping for row in connection.execute(
+                    select(_TABLE).where(_TABLE.c.sku.in_(list(by_sku)))
+                )
+            } if by_sku else {}
+            inserts = plain + [values for sku, values in by_sku.items() if sku not in existing]
+            updates = []
+            for sku, values in by_sku.items():
+                old = existing.get(sku)
+                if old is None:
+                    continue
+                changed = frozenset(column for column in _IMPORTED if values[column] != old[column])
+                if changed:
+                    updates.append((old, values, changed))
+                else:
+                    report.unchanged += 1
+            if not inserts and not updates:
+                return
+
+            version = reserve_versions(connection, len(inserts) + len(updates))
+            created_at = datetime.utcnow()
+            for values in inserts:
+                values["version"] = version
+                values["created_at"] = created_at
+                version += 1
+            # Rows come back in any order (asking for parameter order makes SQLite insert one row per
+            # statement); each insert has its own version, which maps it to its id
+            ids = dict(
+                (version, product_id) for product_id, version in
+                connection.execute(insert(_TABLE).returning(_TABLE.c.id, _TABLE.c.version), inserts)
+            ) if inserts else {}
+            for old, values, changed in updates:
+                values["version"] = version
+                values["product_id"] = old["id"]
+                version += 1
+            if updates:
+                connection.execute(
+                    update(_TABLE).where(_TABLE.c.id == bindparam("product_id")).values(
+                        {column: bindparam(column) for column in _IMPORTED + ("version",)}
+                    ),
+                    [values for _, values, _ in updates]
+                )
+            generation = bump_shared_generation(connection)
+
+        changes = [
+            ProductChange(INSERT, ids[values["version"]], {**values, "id": ids[values["version"]]}, frozenset(_COLUMNS))
+            for values in inserts
+        ]
+        for old, values, changed in updates:
+            values.pop("product_id")
+            changes.append(ProductChange(
+                UPDATE, old["id"], {**old, **values}, changed | {"version"},
+                {column: old[column] for column in changed | {"version"}}
+            ))
+        report.inserted += len(inserts)
+        report.updated += len(updates)
+        catalog_events.publish(changes, generation)
+
+
+def create_bulk_importer() -> BulkImporter:
+    """Build the importer from IMPORT_CHUNK_SIZE (rows per transaction)."""
+    return BulkImporter(chunk_size=int(os.getenv("IMPORT_CHUNK_SIZE", "5000")))
+
+
+# Global instance
+bulk_importer = create_bulk_importer()
@@ -0,0 +1,122 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Catalog versions for delta sync.
+
+Every product write made through the ORM is stamped with a new catalog
+version, unique per row and increasing: the flush that inserts or updates
+a product reserves versions from a counter in ``catalog_versions`` and sets
+``Product.version``; a delete leaves a ``ProductTombstone`` with its own
+version. Readers then ask for everything after the last version they saw
+(``changes_since``) instead of re-reading the catalog. Writers are
+serialized by the database, so versions become visible in order.
+
+Rows written before versioning keep version 0: a client starts from the
+full snapshot (``snapshot_lines``), whose catalog version is read first.
+
+Writes that bypass the ORM must call ``reserve_versions`` and stamp the
+rows themselves.
+"""
+
+import json
+import zlib
+from datetime import datetime
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.models.models import CatalogVersion, Product, ProductTombstone
+
+_VERSIONS = CatalogVersion.__table__
+_COUNTER = "product_versions"
+
+# Columns of a product in the feed and the snapshot
+SNAPSHOT_COLUMNS = ("id", "version", "sku", "name", "description", "price", "category", "image_url",
+                    "stock_quantity", "created_at")
+
+
+def catalog_version(connection) -> int:
+    """Latest catalog version handed out (0 before the first versioned write)."""
+    return connection.execute(select(_VERSIONS.c.generation).where(_VERSIONS.c.name == _COUNTER)).scalar() or 0
+
+
+def reserve_versions(connection, count: int) -> int:
+    """Reserve `count` consecutive versions inside the caller's transaction and return the first."""
+    result = connection.execute(
+        update(_VERSIONS).where(_VERSIONS.c.name == _COUNTER).values(generation=_VERSIONS.c.generation + count)
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(_VERSIONS).values(name=_COUNTER, generation=count))
+    return catalog_version(connection) - count + 1
+
+
+@event.listens_for(Session, "before_flush")
+def _stamp_versions(session: Session, flush_context, instances):
+    written = [obj for obj in session.new if isinstance(obj, Product)]
+    written += [obj for obj in session.dirty
+                if isinstance(obj, Product) and session.is_modified(obj, include_collections=False)]
+    deleted = [obj for obj in session.deleted if isinstance(obj, Product)]
+    if not written and not deleted:
+        return
+    version = reserve_versions(session.connection(), len(written) + len(deleted))
+    for product in written:
+        product.version = version
+        version += 1
+    for product in deleted:
+        session.add(ProductTombstone(version=version, product_id=product.id))
+        version += 1
+
+
+def changes_since(db: Session, since: int, limit: int) -> Tuple[List[Tuple[int, int, Optional[Product]]], bool]:
+    """(version, product id, product or None if deleted) for writes after `since`, oldest first, and whether more follow.
+
+    Only the latest write to each product is returned: an updated row
+    carries its newest version.
+    """
+    products = db.query(Product).filter(Product.version > since).order_by(Product.version).limit(limit + 1).all()
+    tombstones = db.query(ProductTombstone).filter(
+        ProductTombstone.version > since
+    ).order_by(ProductTombstone.version).limit(limit + 1).all()
+    changes = sorted(
+        [(product.version, product.id, product) for product in products]
+        + [(tombstone.version, tombstone.product_id, None) for tombstone in tombstones],
+        key=lambda change: change[0]
+    )
+    return changes[:limit], len(changes) > limit
+
+
+def _json_default(value: Any):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def snapshot_lines(rows: Iterable[Sequence[Any]], level: int = 6, flush_bytes: int = 64 * 1024) -> Iterator[bytes]:
+    """Gzip-compressed NDJSON, one product per line, from rows of SNAPSHOT_COLUMNS.
+
+    Compressed output is yielded in pieces of about `flush_bytes`, so the
+    snapshot streams without being held in memory.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    pending = []
+    size = 0
+    for row in rows:
+        line = json.dumps(dict(zip(SNAPSHOT_COLUMNS, row)), default=_json_default, separators=(",", ":"))
+        pending.append(line)
+        size += len(line) + 1
+        if size >= flush_bytes:
+            data = compressor.compress(("\n".join(pending) + "\n").encode("utf-8"))
+            pending = []
+            size = 0
+            if data:
+                yield data
+    if pending:
+        yield compressor.compress(("\n".join(pending) + "\n").encode("utf-8"))
+    yield compressor.flush()
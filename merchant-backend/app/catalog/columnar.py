@@ -0,0 +1,385 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+In-memory columnar snapshot of the product table for filter-only listings.
+
+Holds id, price, stock_quantity, created_at and a dictionary-encoded
+category column as NumPy arrays, so category / price-range listings are
+evaluated as vectorised masks instead of table scans in SQL. Category
+matching mirrors the SQL filter (case-insensitive substring): each distinct
+category is tested once and the codes are looked up in a boolean table.
+
+Pages walk a sorted row order per sort (built with ``lexsort`` on first use
+and dropped when a change touches its columns), testing the filters a chunk
+at a time until the page is full. While an order is being held back under
+writes, pages come from a partial sort (``partition``) of all matches.
+
+The snapshot follows committed product changes from this process (see
+events.py). When the shared catalog generation shows a write from another
+worker it rebuilds itself in the background; until then callers fall back
+to SQL.
+"""
+
+import time
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.catalog.events import DELETE, INSERT, ProductChange, catalog_events, shared_generation
+from app.catalog.lifecycle import CatalogIndex
+
+logger = logging.getLogger(__name__)
+
+_NO_CATEGORY = -1
+# Sorts negate keys for descending order, so keep clear of int64's minimum
+_NO_TIMESTAMP = np.iinfo(np.int64).min + 1
+_FIRST_CHUNK = 4096
+
+# Sort name -> (column, direction) keys, most significant first, as in the routes' SortOrders.
+# popularity is premium search's most-stock-then-cheapest order.
+SORTS = {
+    None: (("id", 1),),
+    "id": (("id", 1),),
+    "price_asc": (("price", 1), ("id", 1)),
+    "price_desc": (("price", -1), ("id", -1)),
+    "newest": (("created_at", -1), ("id", -1)),
+    "oldest": (("created_at", 1), ("id", 1)),
+    "popularity": (("stock", -1), ("price", 1), ("id", 1)),
+}
+_COLUMN_SORTS = {
+    column: {sort for sort, keys in SORTS.items() if sort is not None and column in dict(keys)}
+    for column in ("price", "stock", "created_at")
+}
+
+
+def _timestamp(value: Optional[datetime]) -> int:
+    if value is None:
+        return _NO_TIMESTAMP
+    return int(value.timestamp() * 1_000_000) if value.tzinfo else int(
+        (value - datetime(1970, 1, 1)).total_seconds() * 1_000_000)
+
+
+def _after(keys: List[np.ndarray], bounds: Tuple) -> np.ndarray:
+    """Rows whose key tuple sorts strictly after the bounds."""
+    greater = np.zeros(len(keys[0]), dtype=bool)
+    equal = np.ones(len(keys[0]), dtype=bool)
+    for key, bound in zip(keys, bounds):
+        greater |= equal & (key > bound)
+        equal &= key == bound
+    return greater
+
+
+class _Columns:
+    """Growable column arrays (amortised doubling)."""
+
+    def __init__(self, capacity: int = 1024):
+        self.size = 0
+        self.id = np.zeros(capacity, dtype=np.int64)
+        self.price = np.zeros(capacity, dtype=np.float64)
+        self.stock = np.zeros(capacity, dtype=np.int64)
+        self.created_at = np.zeros(capacity, dtype=np.int64)
+        self.category = np.zeros(capacity, dtype=np.int32)
+        self.alive = np.zeros(capacity, dtype=bool)
+
+    def append(self, product_id: int, price: float, stock: int, created_at: int, category: int) -> int:
+        row = self.size
+        if row == len(self.id):
+            for name in ("id", "price", "stock", "created_at", "category", "alive"):
+                column = getattr(self, name)
+                grown = np.zeros(len(column) * 2, dtype=column.dtype)
+                grown[:row] = column
+                setattr(self, name, grown)
+        self.id[row] = product_id
+        self.price[row] = price
+        self.stock[row] = stock
+        self.created_at[row] = created_at
+        self.category[row] = category
+        self.alive[row] = True
+        self.size += 1
+        return row
+
+
+class ColumnarSnapshot(CatalogIndex):
+    """Product columns for vectorised filtering and sorting.
+
+    Built from (id, price, stock_quantity, category, created_at) rows. Unlike
+    the indexes it does not serve while stale: usable() sends queries to SQL
+    until the rebuild is in.
+    """
+
+    label = "Columnar snapshot"
+    thread_name = "columnar-warm"
+
+    def __init__(self, check_interval: float = 1.0, reorder_interval: float = 1.0,
+                 clock: Callable[[], float] = time.monotonic):
+        super().__init__(check_interval, clock=clock)
+        # Minimum time between rebuilds of one sort order while writes keep invalidating it
+        self.reorder_interval = reorder_interval
+        self._columns = _Columns()
+        self._row_of: Dict[int, int] = {}
+        self._categories: List[str] = []
+        self._category_codes: Dict[str, int] = {}
+        # Rows are appended in id order until an id arrives out of order
+        self._id_ordered = True
+        # Sort name -> (rows in sort order, their leading key)
+        self._orders: Dict[Optional[str], Tuple[np.ndarray, np.ndarray]] = {}
+        self._ordered_at: Dict[Optional[str], float] = {}
+
+    # ------------------------------------------------------------------
+    # Building and updating
+    # ------------------------------------------------------------------
+
+    def _category_code(self, category: Optional[str]) -> int:
+        if category is None:
+            return _NO_CATEGORY
+        code = self._category_codes.get(category)
+        if code is None:
+            code = self._category_codes[category] = len(self._categories)
+            self._categories.append(category)
+        return code
+
+    def _append(self, product_id, price, stock, created_at, category):
+        columns = self._columns
+        if columns.size and product_id < columns.id[columns.size - 1]:
+            self._id_ordered = False
+        row = columns.append(product_id, price, stock or 0, _timestamp(created_at), self._category_code(category))
+        self._row_of[product_id] = row
+        self._orders.clear()
+
+    def _apply(self, change: ProductChange):
+        row = self._row_of.get(change.product_id)
+        values = change.values
+        columns = self._columns
+        if change.kind == DELETE:
+            if row is not None:
+                columns.alive[row] = False
+                del self._row_of[change.product_id]
+        elif row is None:
+            self._append(change.product_id, values.get("price"), values.get("stock_quantity"),
+                         values.get("created_at"), values.get("category"))
+        elif change.kind == INSERT:
+            # Replayed after a rebuild that already read the row
+            columns.price[row] = values.get("price")
+            columns.stock[row] = values.get("stock_quantity") or 0
+            columns.created_at[row] = _timestamp(values.get("created_at"))
+            columns.category[row] = self._category_code(values.get("category"))
+            self._orders.clear()
+        else:
+            # Only changed columns are sure to be loaded in the update's snapshot
+            if "price" in change.changed:
+                columns.price[row] = values["price"]
+            if "stock_quantity" in change.changed:
+                columns.stock[row] = values["stock_quantity"] or 0
+            if "created_at" in change.changed:
+                columns.created_at[row] = _timestamp(values["created_at"])
+            if "category" in change.changed:
+                columns.category[row] = self._category_code(values["category"])
+            for column, sorts in _COLUMN_SORTS.items():
+                if ("stock_quantity" if column == "stock" else column) in change.changed:
+                    for sort in sorts:
+                        self._orders.pop(sort, None)
+
+    def _build(self, rows: Iterator) -> Tuple[Any, ...]:
+        ids, prices, stocks, created, categories = [], [], [], [], []
+        codes: Dict[str, int] = {}
+        names: List[str] = []
+        for product_id, price, stock, category, created_at in rows:
+            ids.append(product_id)
+            prices.append(price)
+            stocks.append(stock or 0)
+            created.append(_timestamp(created_at))
+            if category is None:
+                categories.append(_NO_CATEGORY)
+            else:
+                code = codes.get(category)
+                if code is None:
+                    code = codes[category] = len(names)
+                    names.append(category)
+                categories.append(code)
+
+        count = len(ids)
+        columns = _Columns(max(1024, count))
+        columns.size = count
+        columns.id[:count] = ids
+        columns.price[:count] = prices
+        columns.stock[:count] = stocks
+        columns.created_at[:count] = created
+        columns.category[:count] = categories
+        columns.alive[:count] = True
+        id_ordered = bool(np.all(columns.id[1:count] > columns.id[:count - 1])) if count else True
+        return columns, ids, names, codes, id_ordered
+
+    def _install(self, built: Tuple[Any, ...]):
+        columns, ids, names, codes, id_ordered = built
+        self._columns = columns
+        self._row_of = {product_id: row for row, product_id in enumerate(ids)}
+        self._categories = names
+        self._category_codes = codes
+        self._id_ordered = id_ordered
+        self._orders = {}
+        self._ordered_at = {}
+
+    def _summary(self) -> str:
+        return f"{len(self._row_of):,} products"
+
+    def usable(self, connection) -> bool:
+        """Whether queries can be answered now; starts a rebuild when another worker changed the catalog."""
+        if not self.ready:
+            return False
+        now = self.clock()
+        if now < self._next_check:
+            return True
+        self._next_check = now + self.check_interval
+        generation = shared_generation(connection)
+        with self._lock:
+            if generation == self._generation:
+                return True
+            self.ready = False
+        logger.info("Catalog changed in another worker: rebuilding columnar snapshot")
+        self.warm(self._rows_factory)
+        return False
+
+    # ------------------------------------------------------------------
+    # Querying
+    # ------------------------------------------------------------------
+
+    def _category_table(self, category: Optional[str]) -> Optional[np.ndarray]:
+        """Per category code, whether it matches; the extra last slot is products without a category."""
+        if not category:
+            return None
+        needle = category.lower()
+        table = np.zeros(len(self._categories) + 1, dtype=bool)
+        for code, name in enumerate(self._categories):
+            table[code] = needle in name.lower()
+        return table
+
+    def _matches(self, rows, categories: Optional[np.ndarray], min_price: Optional[float],
+                 max_price: Optional[float]) -> np.ndarray:
+        """Filter mask for `rows` (a slice or row indexes)."""
+        columns = self._columns
+        mask = columns.alive[rows]
+        if isinstance(rows, slice):
+            mask = mask.copy()
+        if categories is not None:
+            mask &= categories[columns.category[rows]]
+        if min_price is not None:
+            mask &= columns.price[rows] >= min_price
+        if max_price is not None:
+            mask &= columns.price[rows] <= max_price
+        return mask
+
+    def _keys(self, sort: Optional[str], rows) -> List[np.ndarray]:
+        """Sort keys for `rows`, most significant first, oriented so ascending is the sort order."""
+        columns = self._columns
+        return [getattr(columns, column)[rows] * direction for column, direction in SORTS[sort]]
+
+    def _order(self, sort: Optional[str]):
+        """(rows in sort order or None for row order, leading key), or None while held back under writes."""
+        columns = self._columns
+        size = columns.size
+        if SORTS[sort][0][0] == "id" and self._id_ordered:
+            return None, columns.id[:size]
+        order = self._orders.get(sort)
+        if order is None:
+            now = self.clock()
+            if now - self._ordered_at.get(sort, -self.reorder_interval) < self.reorder_interval:
+                return None
+            keys = self._keys(sort, slice(0, size))
+            rows = np.lexsort(keys[::-1]).astype(np.int32)
+            order = self._orders[sort] = (rows, keys[0][rows])
+            self._ordered_at[sort] = now
+        return order
+
+    def count(self, category: Optional[str] = None, min_price: Optional[float] = None,
+              max_price: Optional[float] = None) -> int:
+        """Products matching the filters."""
+        with self._lock:
+            size = self._columns.size
+            return int(np.count_nonzero(
+                self._matches(slice(0, size), self._category_table(category), min_price, max_price)
+            ))
+
+    def query(self, category: Optional[str] = None, min_price: Optional[float] = None,
+              max_price: Optional[float] = None, sort: Optional[str] = None, after: Optional[Tuple] = None,
+              offset: int = 0, limit: int = 20) -> Tuple[List[int], bool]:
+        """(page of product ids, whether more follow) for a filter-only listing.
+
+        `after` is a keyset cursor key in the sort's columns, e.g. (price, id).
+        """
+        wanted = offset + limit + 1
+        if after is not None:
+            after = tuple(
+                (_timestamp(value) if column == "created_at" else value) * direction
+                for value, (column, direction) in zip(after, SORTS[sort])
+            )
+        with self._lock:
+            categories = self._category_table(category)
+            order = self._order(sort)
+            if order is None:
+                rows = self._partial_sort(sort, categories, min_price, max_price, after, wanted)
+            else:
+                rows = self._scan(sort, order, categories, min_price, max_price, after, wanted)
+            page = self._columns.id[rows[offset:]].tolist()
+        return page[:limit], len(page) > limit
+
+    def _scan(self, sort, order, categories, min_price, max_price, after, wanted) -> np.ndarray:
+        """First `wanted` matches walking the sort order, in chunks that double in size."""
+        sorted_rows, leading = order
+        start = int(np.searchsorted(leading, after[0], side="left")) if after is not None else 0
+        end = len(leading)
+        found = []
+        count = 0
+        step = max(_FIRST_CHUNK, wanted * 4)
+        while start < end and count < wanted:
+            stop = min(start + step, end)
+            rows = slice(start, stop) if sorted_rows is None else sorted_rows[start:stop]
+            mask = self._matches(rows, categories, min_price, max_price)
+            if after is not None:
+                mask &= _after(self._keys(sort, rows), after)
+            matched = np.flatnonzero(mask) + start if sorted_rows is None else rows[mask]
+            found.append(matched)
+            count += len(matched)
+            start = stop
+            step *= 2
+        return np.concatenate(found)[:wanted] if found else np.zeros(0, dtype=np.int64)
+
+    def _partial_sort(self, sort, categories, min_price, max_price, after, wanted) -> np.ndarray:
+        """First `wanted` matches by sorting only the ones that can make the page."""
+        size = self._columns.size
+        rows = np.flatnonzero(self._matches(slice(0, size), categories, min_price, max_price))
+        keys = self._keys(sort, rows)
+        if after is not None:
+            keep = _after(keys, after)
+            rows = rows[keep]
+            keys = [key[keep] for key in keys]
+        if len(rows) > wanted:
+            # Everything at or before the wanted-th leading key, ties included
+            threshold = np.partition(keys[0], wanted - 1)[wanted - 1]
+            keep = keys[0] <= threshold
+            rows = rows[keep]
+            keys = [key[keep] for key in keys]
+        return rows[np.lexsort(keys[::-1])[:wanted]]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "products": len(self._row_of),
+                "rows": self._columns.size,
+                "categories": len(self._categories),
+                "sort_orders": len(self._orders),
+                "generation": self._generation,
+            }
+
+
+# Global instance
+columnar_snapshot = ColumnarSnapshot()
+catalog_events.subscribe(columnar_snapshot.apply)
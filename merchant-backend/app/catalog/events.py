@@ -0,0 +1,164 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Change notifications for the product catalog.
+
+Inserts, updates and deletes of Product made through the ORM are collected
+while a session flushes and published to listeners once the transaction
+commits; rolled-back changes are dropped. Every published batch bumps
+``generation``, which caches can compare against to detect staleness.
+
+``generation`` only counts this process's writes. Each transaction that
+changes products also bumps a row in ``catalog_versions``, so caches in
+other workers can detect changes with ``shared_generation()``. Published
+batches carry the value their transaction wrote.
+
+Writes that bypass the ORM (raw SQL, bulk imports) must call
+``catalog_events.publish`` themselves.
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Dict, FrozenSet, List, NamedTuple, Optional
+
+from sqlalchemy import event, inspect, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.models.models import CatalogVersion, Product
+
+logger = logging.getLogger(__name__)
+
+INSERT = "insert"
+UPDATE = "update"
+DELETE = "delete"
+
+_PRODUCT_COLUMNS = tuple(column.key for column in inspect(Product).column_attrs)
+_VERSIONS = CatalogVersion.__table__
+_CATALOG = "products"
+
+
+class ProductChange(NamedTuple):
+    """One committed change to a product row."""
+    kind: str
+    product_id: int
+    # Column values after the change (before it, for deletes)
+    values: Dict[str, Any]
+    # Columns whose value changed; every column for inserts and deletes
+    changed: FrozenSet[str]
+    # Values before an update, for the changed columns whose old value the session had loaded
+    previous: Dict[str, Any] = {}
+
+
+class ChangeBatch(list):
+    """Changes committed together, with the shared generation their transaction wrote (if known)."""
+    shared_generation: Optional[int] = None
+
+
+def shared_generation(connection, name: str = _CATALOG) -> int:
+    """Catalog generation (or another table's, see app/database/generations.py) as stored in the database."""
+    return connection.execute(select(_VERSIONS.c.generation).where(_VERSIONS.c.name == name)).scalar() or 0
+
+
+def bump_shared_generation(connection, name: str = _CATALOG) -> int:
+    """Increment the stored generation inside the caller's transaction and return it."""
+    result = connection.execute(
+        update(_VERSIONS).where(_VERSIONS.c.name == name).values(generation=_VERSIONS.c.generation + 1)
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(_VERSIONS).values(name=name, generation=1))
+    return shared_generation(connection, name)
+
+
+class CatalogEvents:
+    """Publishes committed product changes and counts catalog generations."""
+
+    def __init__(self):
+        self.generation = 0
+        self._listeners: List[Callable[[List[ProductChange]], None]] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, listener: Callable[[List[ProductChange]], None]):
+        """Call listener with each committed batch of changes."""
+        self._listeners.append(listener)
+
+    def publish(self, changes: List[ProductChange], shared_generation: Optional[int] = None):
+        if not changes:
+            return
+        changes = ChangeBatch(changes)
+        changes.shared_generation = shared_generation
+        with self._lock:
+            self.generation += 1
+        for listener in self._listeners:
+            try:
+                listener(changes)
+            except Exception:
+                # A broken cache must not fail the write that already committed
+                logger.exception("Catalog change listener failed")
+
+
+def _snapshot(product: Product) -> Dict[str, Any]:
+    state = inspect(product)
+    return {key: state.dict.get(key) for key in _PRODUCT_COLUMNS}
+
+
+def _pending(session: Optional[Session]) -> Optional[List[ProductChange]]:
+    return session.info.setdefault("catalog_changes", []) if session is not None else None
+
+
+def _record(kind: str):
+    def listener(mapper, connection, product: Product):
+        pending = _pending(inspect(product).session)
+        if pending is None:
+            return
+        previous = {}
+        if kind == UPDATE:
+            state = inspect(product)
+            changed = frozenset(key for key in _PRODUCT_COLUMNS if state.attrs[key].history.has_changes())
+            if not changed:
+                return
+            for key in changed:
+                deleted = state.attrs[key].history.deleted
+                if deleted:
+                    previous[key] = deleted[0]
+        else:
+            changed = frozenset(_PRODUCT_COLUMNS)
+        pending.append(ProductChange(kind, product.id, _snapshot(product), changed, previous))
+    return listener
+
+
+event.listen(Product, "after_insert", _record(INSERT))
+event.listen(Product, "after_update", _record(UPDATE))
+event.listen(Product, "after_delete", _record(DELETE))
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_flushed(session: Session, flush_context):
+    changes = session.info.get("catalog_changes")
+    if changes and session.info.get("catalog_flushed", 0) < len(changes):
+        session.info["catalog_flushed"] = len(changes)
+        session.info["catalog_generation"] = bump_shared_generation(session.connection())
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session: Session):
+    changes = session.info.pop("catalog_changes", None)
+    session.info.pop("catalog_flushed", None)
+    generation = session.info.pop("catalog_generation", None)
+    if changes:
+        catalog_events.publish(changes, generation)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_rolled_back(session: Session, previous_transaction):
+    for key in ("catalog_changes", "catalog_flushed", "catalog_generation"):
+        session.info.pop(key, None)
+
+
+# Global instance
+catalog_events = CatalogEvents()
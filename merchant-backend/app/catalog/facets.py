@@ -0,0 +1,151 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Category and price facets kept as counters.
+
+Per category: how many products, how many are in stock, and how they fall
+into fixed price buckets (FACET_PRICE_BUCKETS edges). The counters are
+built once from the table, then adjusted by every committed product change
+(see events.py) instead of being recomputed with GROUP BY scans.
+
+An update whose old values the session never loaded, or a change in
+another worker, marks the counters stale: they keep serving while a
+rebuild runs in the background.
+"""
+
+import os
+import time
+import logging
+from bisect import bisect_right
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.catalog.events import DELETE, INSERT, ProductChange, catalog_events
+from app.catalog.lifecycle import CatalogIndex
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRICE_EDGES = (10.0, 25.0, 50.0, 100.0, 250.0, 500.0, 1000.0)
+
+
+class CategoryFacet:
+    __slots__ = ("count", "in_stock", "buckets")
+
+    def __init__(self, buckets: int):
+        self.count = 0
+        self.in_stock = 0
+        self.buckets = [0] * buckets
+
+
+class FacetIndex(CatalogIndex):
+    """Product counts per category and price bucket, built from (category, price, stock_quantity) rows."""
+
+    label = "Facet counters"
+    thread_name = "facets-warm"
+
+    def __init__(self, edges: Sequence[float] = DEFAULT_PRICE_EDGES, check_interval: float = 1.0,
+                 rebuild_interval: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        super().__init__(check_interval, rebuild_interval, clock)
+        # Bucket i holds prices in [edges[i-1], edges[i]); the first starts at 0, the last is open-ended
+        self.edges = tuple(sorted(edges))
+        self._categories: Dict[Optional[str], CategoryFacet] = {}
+
+    def bucket(self, price: Optional[float]) -> int:
+        return bisect_right(self.edges, price or 0.0)
+
+    def bucket_ranges(self) -> List[Tuple[float, Optional[float]]]:
+        bounds = (0.0,) + self.edges
+        return [(low, self.edges[index] if index < len(self.edges) else None) for index, low in enumerate(bounds)]
+
+    # ------------------------------------------------------------------
+    # Building and updating
+    # ------------------------------------------------------------------
+
+    def _add(self, categories: Dict[Optional[str], CategoryFacet], category: Optional[str],
+             price: Optional[float], stock: Optional[int], sign: int = 1):
+        facet = categories.get(category)
+        if facet is None:
+            facet = categories[category] = CategoryFacet(len(self.edges) + 1)
+        facet.count += sign
+        if stock and stock > 0:
+            facet.in_stock += sign
+        facet.buckets[self.bucket(price)] += sign
+        if facet.count <= 0:
+            del categories[category]
+
+    def _apply(self, change: ProductChange):
+        values = change.values
+        if change.kind == INSERT:
+            self._add(self._categories, values.get("category"), values.get("price"), values.get("stock_quantity"))
+        elif change.kind == DELETE:
+            self._add(self._categories, values.get("category"), values.get("price"),
+                      values.get("stock_quantity"), sign=-1)
+        elif change.changed & {"category", "price", "stock_quantity"}:
+            old = {}
+            for column in ("category", "price", "stock_quantity"):
+                if column not in change.changed:
+                    old[column] = values.get(column)
+                elif column in change.previous:
+                    old[column] = change.previous[column]
+                else:
+                    old = None
+                    break
+            if old is None or values.get("price") is None:
+                # Old values were never loaded (price is required): cannot take them back
+                self._stale = True
+                return
+            self._add(self._categories, old["category"], old["price"], old["stock_quantity"], sign=-1)
+            self._add(self._categories, values.get("category"), values.get("price"), values.get("stock_quantity"))
+
+    def _build(self, rows: Iterator) -> Dict[Optional[str], CategoryFacet]:
+        categories: Dict[Optional[str], CategoryFacet] = {}
+        for category, price, stock in rows:
+            self._add(categories, category, price, stock)
+        return categories
+
+    def _install(self, built: Dict[Optional[str], CategoryFacet]):
+        self._categories = built
+
+    def _summary(self) -> str:
+        return f"{len(self._categories)} categories"
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def counts(self) -> List[Tuple[Optional[str], int, int, List[int]]]:
+        """(category, products, in stock, products per price bucket), largest categories first."""
+        with self._lock:
+            facets = [(category, facet.count, facet.in_stock, list(facet.buckets))
+                      for category, facet in self._categories.items()]
+        facets.sort(key=lambda facet: (-facet[1], facet[0] or ""))
+        return facets
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "categories": len(self._categories),
+                "products": sum(facet.count for facet in self._categories.values()),
+                "stale": self._stale,
+                "generation": self._generation,
+            }
+
+
+def create_facet_index() -> FacetIndex:
+    """Build the counters from FACET_PRICE_BUCKETS (comma-separated edges) and FACET_REBUILD_INTERVAL."""
+    edges = os.getenv("FACET_PRICE_BUCKETS")
+    return FacetIndex(
+        edges=tuple(float(edge) for edge in edges.split(",")) if edges else DEFAULT_PRICE_EDGES,
+        rebuild_interval=float(os.getenv("FACET_REBUILD_INTERVAL", "30")),
+    )
+
+
+# Global instance
+facet_index = create_facet_index()
+catalog_events.subscribe(facet_index.apply)
@@ -0,0 +1,126 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+SQLite FTS5 full-text index over product name, description and category.
+
+``products_fts`` is an external-content FTS5 table over ``products``. It is
+filled once when created and kept in sync by triggers, so ORM writes and raw
+SQL writes are indexed alike. Only changes to indexed columns re-index a
+row; price and stock updates leave the index alone.
+
+Queries become prefix matches on every word (``"wireless"* AND "head"*``)
+and are ranked by bm25 with name, description and category weights. When
+the database is not SQLite, or SQLite was built without FTS5, ``available``
+stays False and callers keep their ``ilike`` filters.
+"""
+
+import re
+import logging
+from typing import Iterable, Optional
+
+from sqlalchemy import column, table, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "products_fts"
+INDEXED_COLUMNS = ("name", "description", "category")
+# bm25 weights for name, description, category
+COLUMN_WEIGHTS = (10.0, 1.0, 5.0)
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+_fts = table(FTS_TABLE, column("rowid"), column("rank"), column(FTS_TABLE))
+
+_CREATE_STATEMENTS = [
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        name, description, category,
+        content='products', content_rowid='id',
+        prefix='2 3', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', 'bm25({", ".join(map(str, COLUMN_WEIGHTS))})')""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+_TRIGGER_STATEMENTS = [
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON products BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description, category)
+        VALUES (new.id, new.name, new.description, new.category);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON products BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description, category)
+        VALUES ('delete', old.id, old.name, old.description, old.category);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, description, category ON products BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description, category)
+        VALUES ('delete', old.id, old.name, old.description, old.category);
+        INSERT INTO {FTS_TABLE}(rowid, name, description, category)
+        VALUES (new.id, new.name, new.description, new.category);
+    END""",
+]
+
+
+class FullTextIndex:
+    """Creates the FTS5 table and applies ranked full-text filters to product queries."""
+
+    def __init__(self):
+        self.available = False
+
+    def ensure(self, engine: Engine) -> bool:
+        """Create the index and its triggers if missing. Returns whether full-text search is usable."""
+        if engine.dialect.name != "sqlite":
+            self.available = False
+            return False
+        try:
+            with engine.begin() as connection:
+                exists = connection.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+                ).first()
+                if not exists:
+                    logger.info("Building full-text index over products")
+                    for statement in _CREATE_STATEMENTS:
+                        connection.execute(text(statement))
+                for statement in _TRIGGER_STATEMENTS:
+                    connection.execute(text(statement))
+            self.available = True
+        except OperationalError as e:
+            # Typically "no such module: fts5"
+            logger.warning(f"Full-text search unavailable, falling back to LIKE filters: {e}")
+            self.available = False
+        return self.available
+
+    @staticmethod
+    def match_expression(query: str, columns: Optional[Iterable[str]] = None) -> Optional[str]:
+        """FTS5 MATCH expression requiring a prefix match on every word, or None if query has no words."""
+        words = _WORD.findall(query.lower())
+        if not words:
+            return None
+        expression = " AND ".join(f'"{word}"*' for word in words)
+        if columns is not None:
+            expression = f"{{{' '.join(columns)}}} : ({expression})"
+        return expression
+
+    def filter(self, query_obj, model, query: str, columns: Optional[Iterable[str]] = None):
+        """Restrict a product query to full-text matches. Returns None when the caller should fall back."""
+        if not self.available:
+            return None
+        expression = self.match_expression(query, columns)
+        if expression is None:
+            return None
+        return query_obj.join(_fts, _fts.c.rowid == model.id).filter(_fts.c[FTS_TABLE].op("MATCH")(expression))
+
+    @staticmethod
+    def order_by_rank(query_obj):
+        """Best matches first; only valid on a query returned by filter()."""
+        return query_obj.order_by(_fts.c.rank)
+
+
+# Global instance
+fulltext_index = FullTextIndex()
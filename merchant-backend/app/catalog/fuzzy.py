@@ -0,0 +1,251 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Typo-tolerant product search over names and categories.
+
+Words are reduced by a light stemmer ("headphones" -> "headphone") and
+broken into padded trigrams, as pg_trgm does. A query word is matched to
+indexed words by counting shared trigrams through per-trigram posting
+lists, so only words sharing a trigram with the query are ever looked at;
+similarity is shared / (query trigrams + word trigrams - shared). The
+products behind the matched words form each query word's candidates, and
+the query's results are the intersection of those sorted posting lists,
+scored by the mean best similarity per word.
+
+Like the BM25 index (ranking.py) it is loaded from the database once,
+then follows committed catalog changes, and is rebuilt in the background
+when another worker changed the catalog or tombstones pile up.
+"""
+
+import os
+import time
+import logging
+from array import array
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.catalog.events import DELETE, ProductChange, catalog_events
+from app.catalog.lifecycle import CatalogIndex
+from app.catalog.ranking import tokenize
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = 0.3
+
+# (suffix, replacement, shortest stem kept)
+_SUFFIXES = (
+    ("sses", "ss", 2), ("ies", "y", 2), ("ches", "ch", 2), ("shes", "sh", 2), ("xes", "x", 2),
+    ("ss", "ss", 0), ("us", "us", 0), ("is", "is", 0), ("s", "", 3),
+    ("ing", "", 4), ("ed", "", 4),
+)
+
+
+def stem(word: str) -> str:
+    """Strip plural and common verb endings; deliberately conservative."""
+    for suffix, replacement, shortest in _SUFFIXES:
+        if word.endswith(suffix):
+            if len(word) - len(suffix) >= shortest:
+                return word[:-len(suffix)] + replacement
+            return word
+    return word
+
+
+def trigrams(word: str) -> Set[str]:
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _sorted_unique_best(docs: np.ndarray, similarity: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Unique documents (ascending) with the highest similarity each was seen with."""
+    order = np.lexsort((-similarity, docs))
+    docs, similarity = docs[order], similarity[order]
+    first = np.ones(len(docs), dtype=bool)
+    first[1:] = docs[1:] != docs[:-1]
+    return docs[first], similarity[first]
+
+
+class TrigramIndex(CatalogIndex):
+    """Stemmed words of product names and categories, searchable by trigram similarity.
+
+    Built from (id, name, category, ...) rows.
+    """
+
+    label = "Trigram index"
+    thread_name = "trigram-warm"
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, compact_ratio: float = 0.25,
+                 check_interval: float = 1.0, rebuild_interval: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        super().__init__(check_interval, rebuild_interval, clock)
+        self.threshold = threshold
+        # Share of tombstoned documents that makes the index due for a rebuild
+        self.compact_ratio = compact_ratio
+
+        # Vocabulary: stemmed word -> word number, and each word's trigram count
+        self._word_ids: Dict[str, int] = {}
+        self._word_trigrams = array("H")
+        self._trigram_words: Dict[str, array] = {}
+        # Word number -> documents containing it (appended in document order, so sorted)
+        self._word_docs: List[array] = []
+
+        self._product_ids = array("i")
+        self._alive = bytearray()
+        self._doc_of: Dict[int, int] = {}
+
+    # ------------------------------------------------------------------
+    # Building and updating
+    # ------------------------------------------------------------------
+
+    def _word_id(self, word: str) -> int:
+        word_id = self._word_ids.get(word)
+        if word_id is None:
+            word_id = self._word_ids[word] = len(self._word_docs)
+            self._word_docs.append(array("i"))
+            grams = trigrams(word)
+            self._word_trigrams.append(len(grams))
+            for gram in grams:
+                self._trigram_words.setdefault(gram, array("i")).append(word_id)
+        return word_id
+
+    def add(self, product_id: int, name: Optional[str], category: Optional[str]):
+        """Index a product, replacing any earlier version of it."""
+        with self._lock:
+            self.remove(product_id)
+            doc = len(self._product_ids)
+            self._product_ids.append(product_id)
+            self._alive.append(1)
+            self._doc_of[product_id] = doc
+            for word in {stem(token) for token in tokenize(name) + tokenize(category)}:
+                self._word_docs[self._word_id(word)].append(doc)
+
+    def remove(self, product_id: int):
+        with self._lock:
+            doc = self._doc_of.pop(product_id, None)
+            if doc is not None:
+                self._alive[doc] = 0
+                if self._tombstoned():
+                    self._stale = True
+
+    def _tombstoned(self) -> bool:
+        dead = len(self._product_ids) - len(self._doc_of)
+        return dead > self.compact_ratio * len(self._product_ids)
+
+    def _apply(self, change: ProductChange):
+        if change.kind == DELETE:
+            self.remove(change.product_id)
+        elif change.changed & {"name", "category"}:
+            self.add(change.product_id, change.values.get("name"), change.values.get("category"))
+
+    def _needs_rebuild(self) -> bool:
+        return self._tombstoned()
+
+    def _build(self, rows: Iterator) -> "TrigramIndex":
+        built = TrigramIndex(self.threshold, self.compact_ratio)
+        for row in rows:
+            built.add(row[0], row[1], row[2])
+        return built
+
+    def _install(self, built: "TrigramIndex"):
+        for name in ("_word_ids", "_word_trigrams", "_trigram_words", "_word_docs", "_product_ids", "_alive",
+                     "_doc_of"):
+            setattr(self, name, getattr(built, name))
+
+    def _summary(self) -> str:
+        return f"{len(self._doc_of):,} products, {len(self._word_ids):,} words"
+
+    # ------------------------------------------------------------------
+    # Searching
+    # ------------------------------------------------------------------
+
+    def similar_words(self, word: str, threshold: Optional[float] = None) -> List[Tuple[str, float]]:
+        """Indexed words at least `threshold` similar to `word`, most similar first."""
+        threshold = self.threshold if threshold is None else threshold
+        with self._lock:
+            matches = self._similar(stem(word), threshold)
+            words = list(self._word_ids)
+            return [(words[word_id], round(float(similarity), 4)) for word_id, similarity in zip(*matches)]
+
+    def _similar(self, word: str, threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+        grams = trigrams(word)
+        postings = [self._trigram_words[gram] for gram in grams if gram in self._trigram_words]
+        if not postings:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        shared = np.bincount(np.concatenate([np.frombuffer(p, dtype=np.int32) for p in postings]))
+        candidates = np.flatnonzero(shared)
+        shared = shared[candidates]
+        sizes = np.frombuffer(self._word_trigrams, dtype=np.uint16)[candidates]
+        similarity = (shared / (len(grams) + sizes - shared)).astype(np.float32)
+        keep = similarity >= threshold
+        candidates, similarity = candidates[keep], similarity[keep]
+        order = np.argsort(-similarity, kind="stable")
+        return candidates[order], similarity[order]
+
+    def search(self, query: str, threshold: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Product ids whose name or category fuzzily contains every query word, best first.
+
+        Scores are the mean, over query words, of the best word similarity (1.0 for exact matches).
+        """
+        threshold = self.threshold if threshold is None else threshold
+        words = list(dict.fromkeys(stem(token) for token in tokenize(query)))
+        empty = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        with self._lock:
+            if not words or not self._doc_of:
+                return empty
+
+            per_word = []
+            for word in words:
+                word_ids, similarity = self._similar(word, threshold)
+                if not len(word_ids):
+                    return empty
+                postings = [np.frombuffer(self._word_docs[word_id], dtype=np.int32) for word_id in word_ids]
+                docs = np.concatenate(postings)
+                sims = np.repeat(similarity, [len(p) for p in postings])
+                per_word.append(_sorted_unique_best(docs, sims))
+
+            # Intersect the smallest candidate lists first
+            per_word.sort(key=lambda pair: len(pair[0]))
+            docs, scores = per_word[0]
+            for other_docs, other_scores in per_word[1:]:
+                docs, mine, theirs = np.intersect1d(docs, other_docs, assume_unique=True, return_indices=True)
+                scores = scores[mine] + other_scores[theirs]
+                if not len(docs):
+                    return empty
+
+            alive = np.frombuffer(self._alive, dtype=np.uint8)[docs].astype(bool)
+            docs, scores = docs[alive], scores[alive] / len(words)
+            order = np.argsort(-scores, kind="stable")
+            product_ids = np.frombuffer(self._product_ids, dtype=np.int32)[docs[order]].astype(np.int64)
+            return product_ids, scores[order]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "products": len(self._doc_of),
+                "documents": len(self._product_ids),
+                "words": len(self._word_ids),
+                "trigrams": len(self._trigram_words),
+                "stale": self._stale,
+                "generation": self._generation,
+            }
+
+
+def create_fuzzy_index() -> TrigramIndex:
+    """Build the index settings from FUZZY_SIMILARITY_THRESHOLD and the SEARCH_INDEX_* rebuild settings."""
+    return TrigramIndex(
+        float(os.getenv("FUZZY_SIMILARITY_THRESHOLD", str(DEFAULT_THRESHOLD))),
+        compact_ratio=float(os.getenv("SEARCH_INDEX_COMPACT_RATIO", "0.25")),
+        rebuild_interval=float(os.getenv("SEARCH_INDEX_REBUILD_INTERVAL", "30")),
+    )
+
+
+# Global instance
+fuzzy_index = create_fuzzy_index()
+catalog_events.subscribe(fuzzy_index.apply)
@@ -0,0 +1,171 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Build, warm-up and rebuild lifecycle shared by the in-memory catalog indexes.
+
+An index is built from a snapshot whose first item is the shared catalog
+generation (events.py), then follows committed catalog changes. Changes
+that arrive during a build are applied to the index still serving and
+queued for the new one, which replays them once it is swapped in. When
+another worker moves the shared generation, or the index reports itself
+stale, it is rebuilt in the background at most every `rebuild_interval`
+seconds.
+"""
+
+import time
+import logging
+import threading
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+
+from app.catalog.events import ProductChange, shared_generation
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogIndex:
+    """Subclasses build their state in _build, swap it in with _install and follow changes in _apply."""
+
+    # Used in log messages and the warm-up thread's name
+    label = "Catalog index"
+    thread_name = "index-warm"
+
+    def __init__(self, check_interval: float = 1.0, rebuild_interval: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.check_interval = check_interval
+        # Minimum time between background rebuilds of a stale index
+        self.rebuild_interval = rebuild_interval
+        self.clock = clock
+        self.ready = False
+        self._lock = threading.RLock()
+        # Notified whenever a build ends, so first requests can wait for a warm-up
+        self._built = threading.Condition(self._lock)
+        self._rows_factory: Optional[Callable[[], Iterable]] = None
+        self._loading = False
+        self._queued: List[ProductChange] = []
+        self._stale = False
+        self._built_at = float("-inf")
+        # Shared catalog generation the index reflects
+        self._generation: Optional[int] = None
+        self._next_check = 0.0
+
+    # ------------------------------------------------------------------
+    # Subclass hooks
+    # ------------------------------------------------------------------
+
+    def _build(self, rows: Iterator) -> Any:
+        """New index state from the snapshot rows; runs outside the lock."""
+        raise NotImplementedError
+
+    def _install(self, built: Any):
+        """Swap in the state _build returned; runs under the lock."""
+        raise NotImplementedError
+
+    def _apply(self, change: ProductChange):
+        raise NotImplementedError
+
+    def _needs_rebuild(self) -> bool:
+        """Whether the freshly installed index is already due for a rebuild."""
+        return False
+
+    def _summary(self) -> str:
+        return ""
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def apply(self, changes: Iterable[ProductChange]):
+        with self._lock:
+            if self._loading:
+                # Replayed on the new index once the snapshot is in
+                self._queued.extend(changes)
+            if not self.ready:
+                return
+            for change in changes:
+                self._apply(change)
+            written = getattr(changes, "shared_generation", None)
+            if written is not None and self._generation is not None and written == self._generation + 1:
+                self._generation = written
+
+    def load(self, rows_factory: Callable[[], Iterable]):
+        """(Re)build from a snapshot, then replay the changes made meanwhile.
+
+        The factory yields the shared catalog generation first, then the rows
+        _build expects, read in the same transaction. The current index keeps
+        serving until the new one is swapped in.
+        """
+        started = time.perf_counter()
+        with self._lock:
+            self._rows_factory = rows_factory
+            self._loading = True
+            self._queued = []
+            self._stale = False
+            self._built_at = self.clock()
+        try:
+            rows = iter(rows_factory())
+            generation = next(rows)
+            built = self._build(rows)
+        except Exception:
+            with self._lock:
+                self._loading = False
+                self._built.notify_all()
+            raise
+
+        with self._lock:
+            self._install(built)
+            self._generation = generation
+            self._loading = False
+            # Staleness counted against the old index does not carry over
+            self._stale = self._needs_rebuild()
+            queued, self._queued = self._queued, []
+            for change in queued:
+                self._apply(change)
+            self.ready = True
+            self._built.notify_all()
+        logger.info(f"{self.label} loaded: {self._summary()} in {time.perf_counter() - started:.1f}s")
+
+    def ensure_loaded(self, rows_factory: Callable[[], Iterable]):
+        """Build on first use (blocking) when the index was not warmed, or wait for the warm-up under way."""
+        if self.ready:
+            return
+        with self._lock:
+            while not self.ready:
+                if not self._loading:
+                    self.load(rows_factory)
+                    return
+                self._built.wait()
+
+    def warm(self, rows_factory: Callable[[], Iterable]):
+        """Build (or rebuild) on a background thread; the current index keeps serving meanwhile."""
+        with self._lock:
+            if self._loading:
+                return
+            self._loading = True
+        threading.Thread(target=self._warm, args=(rows_factory,), name=self.thread_name, daemon=True).start()
+
+    def _warm(self, rows_factory):
+        try:
+            self.load(rows_factory)
+        except Exception:
+            logger.exception(f"{self.label} build failed")
+
+    def refresh(self, connection):
+        """Start a background rebuild when the index is stale or another worker changed the catalog."""
+        if not self.ready or self._rows_factory is None:
+            return
+        now = self.clock()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            generation = shared_generation(connection)
+            with self._lock:
+                if generation != self._generation:
+                    self._stale = True
+        if self._stale and not self._loading and now - self._built_at >= self.rebuild_interval:
+            logger.info(f"{self.label} is stale, rebuilding in the background")
+            self.warm(self._rows_factory)
@@ -0,0 +1,250 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Process-local cache of product rows for single-product reads and cart pricing.
+
+Records are compact ``__slots__`` objects holding the product columns, not
+ORM instances, so they are safe to share between requests and sessions.
+The cache is a bounded LRU kept current in two ways:
+
+- write-through: products created by this process are cached as they
+  commit, and its updates and deletes drop the records (see events.py);
+- shared generation: at most every PRODUCT_CACHE_CHECK_INTERVAL seconds a
+  read compares the catalog generation stored in the database with the one
+  the cache was filled at, and empties the cache when another worker has
+  written since.
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy.orm import Session
+
+from app.catalog.events import INSERT, ProductChange, catalog_events, shared_generation
+from app.etags import etag
+from app.metrics import MetricsRegistry, metrics_enabled, metrics_registry
+from app.models.models import Product as ProductModel
+from app.schemas import Product
+
+_FIELDS = ("id", "name", "description", "price", "category", "image_url", "stock_quantity", "created_at", "sku")
+
+
+class ProductRecord:
+    """Immutable-by-convention copy of a product row."""
+
+    # Plus the response JSON and its ETag, serialized on first use and dropped with the record
+    __slots__ = _FIELDS + ("_json", "_etag")
+
+    def __init__(self, id: int, name: str, description: Optional[str], price: float, category: Optional[str],
+                 image_url: Optional[str], stock_quantity: Optional[int], created_at: Optional[datetime],
+                 sku: Optional[str] = None):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.price = price
+        self.category = category
+        self.image_url = image_url
+        self.stock_quantity = stock_quantity
+        self.created_at = created_at
+        self.sku = sku
+        self._json: Optional[bytes] = None
+        self._etag: Optional[str] = None
+
+    @classmethod
+    def from_values(cls, values: Dict[str, Any]) -> "ProductRecord":
+        return cls(*(values.get(field) for field in _FIELDS))
+
+    @classmethod
+    def from_model(cls, product: ProductModel) -> "ProductRecord":
+        return cls(*(getattr(product, field) for field in _FIELDS))
+
+    def json(self) -> bytes:
+        """The product as the API returns it (the Product schema), serialized once."""
+        if self._json is None:
+            self._json = Product.model_validate(self).model_dump_json().encode()
+        return self._json
+
+    def etag(self) -> str:
+        if self._etag is None:
+            self._etag = etag(self.json())
+        return self._etag
+
+
+class ProductCacheMetrics:
+    """Lookup outcomes and cross-worker resets registered in a MetricsRegistry."""
+
+    def __init__(self, registry: MetricsRegistry = metrics_registry):
+        self.lookups = registry.counter("product_cache_lookups_total", "Product cache lookups by result", "result")
+        self.resets = registry.counter(
+            "product_cache_resets_total", "Product cache flushes after another worker changed the catalog"
+        )
+
+
+class ProductCache:
+    """Bounded LRU of ProductRecord by product id."""
+
+    def __init__(self, max_entries: int = 10000, check_interval: float = 1.0,
+                 metrics: Optional[ProductCacheMetrics] = None, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.check_interval = check_interval
+        self.metrics = metrics
+        self.clock = clock
+        self._records: "OrderedDict[int, ProductRecord]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Shared catalog generation the records are known to reflect (None until first checked)
+        self._generation: Optional[int] = None
+        self._next_check = 0.0
+        # Bumped by every change; loads that straddle one are not cached
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def get(self, db: Session, product_id: int) -> Optional[ProductRecord]:
+        """The product with this id, from the cache or the database; None if it does not exist."""
+        return self.get_many(db, [product_id]).get(product_id)
+
+    def get_many(self, db: Session, product_ids: Iterable[int],
+                 fields: Optional[Sequence[str]] = None) -> Dict[int, ProductRecord]:
+        """Records for the ids that exist, loading every miss in one query.
+
+        With `fields`, misses load only those columns (plus id): the other
+        attributes of those records are None and they are not cached.
+        """
+        self._check(db)
+        found: Dict[int, ProductRecord] = {}
+        missing = []
+        with self._lock:
+            for product_id in dict.fromkeys(product_ids):
+                record = self._records.get(product_id)
+                if record is None:
+                    missing.append(product_id)
+                else:
+                    self._records.move_to_end(product_id)
+                    found[product_id] = record
+            version = self._version
+            self.hits += len(found)
+            self.misses += len(missing)
+        if self.metrics is not None:
+            if found:
+                self.metrics.lookups.inc("hit", len(found))
+            if missing:
+                self.metrics.lookups.inc("miss", len(missing))
+
+        if missing and fields is not None and not set(_FIELDS) <= set(fields):
+            columns = ("id",) + tuple(field for field in _FIELDS if field != "id" and field in fields)
+            for row in db.query(*(getattr(ProductModel, column) for column in columns)).filter(
+                ProductModel.id.in_(missing)
+            ):
+                found[row.id] = ProductRecord.from_values(dict(zip(columns, row)))
+        elif missing:
+            loaded = [ProductRecord.from_model(product)
+                      for product in db.query(ProductModel).filter(ProductModel.id.in_(missing))]
+            with self._lock:
+                if version == self._version:
+                    for record in loaded:
+                        self._store(record)
+            for record in loaded:
+                found[record.id] = record
+        return found
+
+    def records(self, products: Iterable[ProductModel]) -> List[ProductRecord]:
+        """Records for products the caller already loaded: the cached one (with its serialized JSON) when
+        present, otherwise an uncached copy."""
+        with self._lock:
+            cached = [self._records.get(product.id) for product in products]
+        return [record if record is not None else ProductRecord.from_model(product)
+                for record, product in zip(cached, products)]
+
+    def _check(self, db: Session):
+        """Empty the cache if the shared catalog generation moved past the one it reflects."""
+        now = self.clock()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        generation = shared_generation(db.connection())
+        with self._lock:
+            if self._generation is not None and generation != self._generation:
+                self._records.clear()
+                self._version += 1
+                if self.metrics is not None:
+                    self.metrics.resets.inc()
+            self._generation = generation
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def _store(self, record: ProductRecord):
+        self._records[record.id] = record
+        self._records.move_to_end(record.id)
+        while len(self._records) > self.max_entries:
+            self._records.popitem(last=False)
+
+    def put(self, record: ProductRecord):
+        with self._lock:
+            self._version += 1
+            self._store(record)
+
+    def invalidate(self, product_id: int):
+        with self._lock:
+            self._version += 1
+            self._records.pop(product_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._version += 1
+            self._records.clear()
+
+    def apply(self, changes: Iterable[ProductChange]):
+        """Write committed changes from this process through to the cache."""
+        with self._lock:
+            self._version += 1
+            for change in changes:
+                if change.kind == INSERT:
+                    self._store(ProductRecord.from_values(change.values))
+                else:
+                    # An update's snapshot may miss columns the session never loaded: reload on next read
+                    self._records.pop(change.product_id, None)
+            # Our own commit moved the shared generation one step: nothing else changed
+            written = getattr(changes, "shared_generation", None)
+            if written is not None and self._generation is not None and written == self._generation + 1:
+                self._generation = written
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._records),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "generation": self._generation,
+            }
+
+
+def create_product_cache() -> ProductCache:
+    """Build the product cache from PRODUCT_CACHE_SIZE and PRODUCT_CACHE_CHECK_INTERVAL."""
+    return ProductCache(
+        max_entries=int(os.getenv("PRODUCT_CACHE_SIZE", "10000")),
+        check_interval=float(os.getenv("PRODUCT_CACHE_CHECK_INTERVAL", "1.0")),
+        metrics=ProductCacheMetrics() if metrics_enabled() else None,
+    )
+
+
+# Global instance
+product_cache = create_product_cache()
+catalog_events.subscribe(product_cache.apply)
@@ -0,0 +1,257 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+In-memory BM25 relevance ranking for premium product search.
+
+An inverted index over product name, category and description. Each term's
+postings are growable ``array.array`` buffers (document number plus a
+per-field term frequency), which NumPy reads in place at query time. Scores
+are BM25F-style: per-field term frequencies are length-normalised, weighted
+by field boost and summed before BM25 saturation, so a hit in the name
+counts more than one in the description.
+
+The index is loaded from the database on first use and then follows
+committed catalog changes (see events.py); a changed product is tombstoned
+and re-added. Document counts and average lengths cover live documents
+only. Once tombstones make up ``compact_ratio`` of the documents, or
+another worker changed the catalog (the shared generation moved), the
+index is rebuilt in the background while the current one keeps serving.
+
+Query words missing from the vocabulary are expanded to the most common
+indexed words they prefix, so "head" still finds "headphones".
+"""
+
+import os
+import re
+import math
+import time
+import logging
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.catalog.events import DELETE, ProductChange, catalog_events
+from app.catalog.lifecycle import CatalogIndex
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ("name", "category", "description")
+DEFAULT_BOOSTS = {"name": 3.0, "category": 2.0, "description": 1.0}
+MAX_PREFIX_EXPANSIONS = 20
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_UINT8_MAX = 255
+_UINT16_MAX = 65535
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _WORD.findall(text.lower()) if text else []
+
+
+class _Postings:
+    """Documents containing a term and the term's frequency in each field."""
+
+    __slots__ = ("docs", "tfs")
+
+    def __init__(self):
+        self.docs = array("i")
+        self.tfs = tuple(array("B") for _ in FIELDS)
+
+
+class BM25Index(CatalogIndex):
+    """Incrementally updated BM25F index over products, built from (id, name, category, description) rows."""
+
+    label = "BM25 index"
+    thread_name = "bm25-warm"
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, boosts: Optional[Dict[str, float]] = None,
+                 compact_ratio: float = 0.25, check_interval: float = 1.0, rebuild_interval: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        # The lock also keeps searches and updates apart: NumPy views pin the arrays' buffers
+        super().__init__(check_interval, rebuild_interval, clock)
+        self.k1 = k1
+        self.b = b
+        boosts = boosts or DEFAULT_BOOSTS
+        self.boosts = tuple(float(boosts.get(field, 0.0)) for field in FIELDS)
+        # Share of tombstoned documents that makes the index due for a rebuild
+        self.compact_ratio = compact_ratio
+
+        self._postings: Dict[str, _Postings] = {}
+        self._vocabulary: List[str] = []
+        self._product_ids = array("i")
+        self._lengths = tuple(array("H") for _ in FIELDS)
+        # Summed over live documents only
+        self._length_totals = [0] * len(FIELDS)
+        self._alive = bytearray()
+        self._doc_of: Dict[int, int] = {}
+
+    # ------------------------------------------------------------------
+    # Building and updating
+    # ------------------------------------------------------------------
+
+    def add(self, product_id: int, name: Optional[str], category: Optional[str], description: Optional[str]):
+        """Index a product, replacing any earlier version of it."""
+        with self._lock:
+            self.remove(product_id)
+            doc = len(self._product_ids)
+            self._product_ids.append(product_id)
+            self._alive.append(1)
+            self._doc_of[product_id] = doc
+
+            per_field = []
+            for field_index, text in enumerate((name, category, description)):
+                tokens = tokenize(text)
+                length = min(len(tokens), _UINT16_MAX)
+                self._lengths[field_index].append(length)
+                self._length_totals[field_index] += length
+                per_field.append(Counter(tokens))
+
+            for term in set().union(*per_field):
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = _Postings()
+                    insort(self._vocabulary, term)
+                postings.docs.append(doc)
+                for field_index, counts in enumerate(per_field):
+                    postings.tfs[field_index].append(min(counts.get(term, 0), _UINT8_MAX))
+
+    def remove(self, product_id: int):
+        with self._lock:
+            doc = self._doc_of.pop(product_id, None)
+            if doc is not None:
+                self._alive[doc] = 0
+                for field_index, lengths in enumerate(self._lengths):
+                    self._length_totals[field_index] -= lengths[doc]
+                # Tombstones still hold postings and count towards document frequencies
+                if self._tombstoned():
+                    self._stale = True
+
+    def _tombstoned(self) -> bool:
+        dead = len(self._product_ids) - len(self._doc_of)
+        return dead > self.compact_ratio * len(self._product_ids)
+
+    def _apply(self, change: ProductChange):
+        if change.kind == DELETE:
+            self.remove(change.product_id)
+        elif change.changed & {"name", "category", "description"}:
+            values = change.values
+            self.add(change.product_id, values.get("name"), values.get("category"), values.get("description"))
+
+    def _needs_rebuild(self) -> bool:
+        return self._tombstoned()
+
+    def _build(self, rows: Iterator) -> "BM25Index":
+        built = BM25Index(self.k1, self.b, dict(zip(FIELDS, self.boosts)), self.compact_ratio)
+        for product_id, name, category, description in rows:
+            built.add(product_id, name, category, description)
+        return built
+
+    def _install(self, built: "BM25Index"):
+        for name in ("_postings", "_vocabulary", "_product_ids", "_lengths", "_length_totals", "_alive", "_doc_of"):
+            setattr(self, name, getattr(built, name))
+
+    def _summary(self) -> str:
+        return f"{len(self._doc_of):,} products, {len(self._postings):,} terms"
+
+    # ------------------------------------------------------------------
+    # Searching
+    # ------------------------------------------------------------------
+
+    def _expand(self, word: str) -> List[str]:
+        if word in self._postings:
+            return [word]
+        start = bisect_left(self._vocabulary, word)
+        end = bisect_left(self._vocabulary, word + "￿", start)
+        candidates = self._vocabulary[start:end]
+        if len(candidates) > MAX_PREFIX_EXPANSIONS:
+            candidates = sorted(candidates, key=lambda term: len(self._postings[term].docs), reverse=True)
+            candidates = candidates[:MAX_PREFIX_EXPANSIONS]
+        return candidates
+
+    def knows(self, word: str) -> bool:
+        """Whether a query word matches an indexed word or prefixes one."""
+        with self._lock:
+            return bool(self._expand(word))
+
+    def _score_term(self, term: str, documents: int, norms: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        postings = self._postings[term]
+        docs = np.frombuffer(postings.docs, dtype=np.int32)
+        tf = np.zeros(len(docs), dtype=np.float32)
+        for field_index, boost in enumerate(self.boosts):
+            if boost:
+                field_tf = np.frombuffer(postings.tfs[field_index], dtype=np.uint8)
+                tf += boost * field_tf / norms[field_index][docs]
+        # Tombstones still hold postings until the next rebuild; the clamp keeps idf positive
+        df = min(len(docs), documents)
+        idf = math.log(1.0 + (documents - df + 0.5) / (df + 0.5))
+        return docs, idf * tf * (self.k1 + 1.0) / (tf + self.k1)
+
+    def search(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Product ids matching any query word, best first, with their BM25 scores."""
+        words = tokenize(query)
+        with self._lock:
+            documents = len(self._product_ids)
+            live = len(self._doc_of)
+            if not words or not live:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+            # (1 - b) + b * length / average length, per field
+            norms = []
+            for field_index, lengths in enumerate(self._lengths):
+                average = self._length_totals[field_index] / live or 1.0
+                field_lengths = np.frombuffer(lengths, dtype=np.uint16).astype(np.float32)
+                norms.append((1.0 - self.b) + self.b * field_lengths / average)
+
+            scores = np.zeros(documents, dtype=np.float32)
+            for word in dict.fromkeys(words):
+                terms = self._expand(word)
+                if len(terms) == 1:
+                    docs, contribution = self._score_term(terms[0], live, norms)
+                    scores[docs] += contribution
+                elif terms:
+                    # A prefix counts once, at its best-scoring completion
+                    best = np.zeros(documents, dtype=np.float32)
+                    for term in terms:
+                        docs, contribution = self._score_term(term, live, norms)
+                        best[docs] = np.maximum(best[docs], contribution)
+                    scores += best
+
+            scores *= np.frombuffer(self._alive, dtype=np.uint8)
+            matched = np.flatnonzero(scores > 0)
+            order = matched[np.argsort(-scores[matched], kind="stable")]
+            product_ids = np.frombuffer(self._product_ids, dtype=np.int32)[order].astype(np.int64)
+            return product_ids, scores[order]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "products": len(self._doc_of),
+                "documents": len(self._product_ids),
+                "terms": len(self._postings),
+                "postings": sum(len(postings.docs) for postings in self._postings.values()),
+                "stale": self._stale,
+                "generation": self._generation,
+            }
+
+
+def create_product_ranker() -> BM25Index:
+    """Build the index settings from SEARCH_INDEX_REBUILD_INTERVAL and SEARCH_INDEX_COMPACT_RATIO."""
+    return BM25Index(
+        compact_ratio=float(os.getenv("SEARCH_INDEX_COMPACT_RATIO", "0.25")),
+        rebuild_interval=float(os.getenv("SEARCH_INDEX_REBUILD_INTERVAL", "30")),
+    )
+
+
+# Global instance
+product_ranker = create_product_ranker()
+catalog_events.subscribe(product_ranker.apply)
@@ -0,0 +1,182 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Cache of serialised product listing pages.
+
+Agent traffic repeats a few hundred listings, so whole `GET /api/products/`
+responses are kept as JSON bytes keyed on the normalised filters, sort,
+page and total mode. Storing bytes makes hits skip serialisation as well
+as SQL, and gives an exact size for the memory bound (LRU by bytes).
+
+Any committed product change in this process (new products, stock or price
+updates, deletes) empties the cache; a change in another worker is noticed
+through the shared catalog generation, checked at most every
+`check_interval` seconds. Each entry also expires after a TTL with random
+jitter, so pages filled together are not all recomputed in the same second.
+"""
+
+import os
+import time
+import random
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.catalog.events import ProductChange, catalog_events, shared_generation
+from app.metrics import MetricsRegistry, metrics_enabled, metrics_registry
+
+# Key, bookkeeping tuple and OrderedDict node, roughly
+_ENTRY_OVERHEAD = 200
+
+
+class SearchCacheMetrics:
+    """Lookup outcomes and evictions registered in a MetricsRegistry."""
+
+    def __init__(self, registry: MetricsRegistry = metrics_registry):
+        self.lookups = registry.counter("search_cache_lookups_total", "Listing cache lookups by result", "result")
+        self.evictions = registry.counter("search_cache_evictions_total", "Listing cache evictions by reason", "reason")
+
+
+class SearchResultCache:
+    """Byte-bounded LRU of serialised listing pages."""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, ttl: float = 60.0, jitter: float = 0.1,
+                 check_interval: float = 1.0, metrics: Optional[SearchCacheMetrics] = None,
+                 clock: Callable[[], float] = time.monotonic, rng: Callable[[], float] = random.random):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # Fraction of the TTL each entry's lifetime is randomly shortened or lengthened by
+        self.jitter = jitter
+        self.check_interval = check_interval
+        self.metrics = metrics
+        self.clock = clock
+        self.rng = rng
+        # key -> (body, expires_at)
+        self._entries: "OrderedDict[Hashable, Tuple[bytes, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Shared catalog generation the entries reflect (None until first checked)
+        self._generation: Optional[int] = None
+        self._next_check = 0.0
+        # Bumped by every change; pages read across one are not stored
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, db: Session, key: Hashable) -> Optional[bytes]:
+        """The cached page for `key`, or None."""
+        if self.max_bytes <= 0:
+            return None
+        self._check(db)
+        expired = False
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= self.clock():
+                self._remove(key)
+                entry, expired = None, True
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if self.metrics is not None:
+            self.metrics.lookups.inc("miss" if entry is None else "hit")
+            if expired:
+                self.metrics.evictions.inc("ttl")
+        return entry[0] if entry is not None else None
+
+    def version(self) -> int:
+        """Token to take before reading a page and hand back to put()."""
+        return self._version
+
+    def put(self, key: Hashable, body: bytes, version: int) -> bytes:
+        """Store a page read since `version` was taken, unless the catalog changed meanwhile."""
+        size = len(body) + _ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return body
+        evicted = 0
+        with self._lock:
+            if version != self._version:
+                return body
+            if key in self._entries:
+                self._remove(key)
+            lifetime = self.ttl * (1 + self.jitter * (2 * self.rng() - 1))
+            self._entries[key] = (body, self.clock() + lifetime)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                evicted += 1
+        if evicted and self.metrics is not None:
+            self.metrics.evictions.inc("size", evicted)
+        return body
+
+    def _remove(self, key: Hashable):
+        body, _ = self._entries.pop(key)
+        self._bytes -= len(body) + _ENTRY_OVERHEAD
+
+    def _check(self, db: Session):
+        """Empty the cache if the shared catalog generation moved past the one it reflects."""
+        now = self.clock()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        generation = shared_generation(db.connection())
+        with self._lock:
+            if self._generation is not None and generation != self._generation:
+                self._clear("generation")
+            self._generation = generation
+
+    def _clear(self, reason: str):
+        self._version += 1
+        if self._entries and self.metrics is not None:
+            self.metrics.evictions.inc(reason, len(self._entries))
+        self._entries.clear()
+        self._bytes = 0
+
+    def clear(self):
+        with self._lock:
+            self._clear("clear")
+
+    def apply(self, changes: Iterable[ProductChange]):
+        """Any committed product change in this process can move any listing: start over."""
+        with self._lock:
+            self._clear("generation")
+            written = getattr(changes, "shared_generation", None)
+            if written is not None and self._generation is not None and written == self._generation + 1:
+                self._generation = written
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "generation": self._generation,
+            }
+
+
+def create_search_cache() -> SearchResultCache:
+    """Build the listing cache from SEARCH_CACHE_MAX_BYTES, SEARCH_CACHE_TTL and SEARCH_CACHE_TTL_JITTER."""
+    return SearchResultCache(
+        max_bytes=int(os.getenv("SEARCH_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+        ttl=float(os.getenv("SEARCH_CACHE_TTL", "60")),
+        jitter=float(os.getenv("SEARCH_CACHE_TTL_JITTER", "0.1")),
+        check_interval=float(os.getenv("SEARCH_CACHE_CHECK_INTERVAL", "1.0")),
+        metrics=SearchCacheMetrics() if metrics_enabled() else None,
+    )
+
+
+# Global instance
+search_cache = create_search_cache()
+catalog_events.subscribe(search_cache.apply)
@@ -0,0 +1,321 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Prefix autocomplete over product names and categories.
+
+Each distinct name and category is a phrase, weighted by the stock of the
+products carrying it. Every word start of a phrase is an entry ("hair
+dryer" and "dryer" for "Hair Dryer"), and entries live in two flat arrays
+(phrase id, character offset) sorted by the suffix they point at, so a
+prefix is two ``bisect`` calls over the phrase texts without storing any
+suffix strings.
+
+Phrases created after the build go to a small sorted delta that is merged
+into the arrays in bulk. Narrow prefixes rank their whole range with
+NumPy. Wide ones (a letter or two, thousands of entries) rank a memoised
+candidate set by current weights, and that set is recomputed at most every
+`refresh_interval` seconds while weights keep changing.
+
+Weights follow committed product changes (see events.py). An update whose
+old values the session never loaded, or a change in another worker, marks
+the index stale: it keeps serving while a rebuild runs in the background.
+"""
+
+import os
+import re
+import time
+import logging
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.catalog.events import DELETE, INSERT, ProductChange, catalog_events
+from app.catalog.lifecycle import CatalogIndex
+
+logger = logging.getLogger(__name__)
+
+NAME = "name"
+CATEGORY = "category"
+_KINDS = (NAME, CATEGORY)
+
+_WORD_START = re.compile(r"(?<![\w'])[\w']")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    return _SPACES.sub(" ", text.lower()).lstrip()
+
+
+def word_starts(text: str) -> List[int]:
+    return [match.start() for match in _WORD_START.finditer(text)]
+
+
+class SuggestIndex(CatalogIndex):
+    """Word-start prefix index over name and category phrases, built from (name, category, stock_quantity) rows."""
+
+    label = "Suggest index"
+    thread_name = "suggest-warm"
+
+    def __init__(self, merge_at: int = 4096, scan_limit: int = 1024, candidates: int = 64,
+                 refresh_interval: float = 1.0, check_interval: float = 1.0, rebuild_interval: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        super().__init__(check_interval, rebuild_interval, clock)
+        self.merge_at = merge_at
+        # Ranges up to this many entries are ranked in full on every query
+        self.scan_limit = scan_limit
+        self.candidates = candidates
+        self.refresh_interval = refresh_interval
+        self._reset()
+
+    def _reset(self):
+        # Display text per phrase id (whitespace collapsed); matching uses its lowercase form
+        self._texts: List[str] = []
+        self._kinds = bytearray()
+        self._weights = array("q")
+        self._counts = array("i")
+        # Entries sorted by (suffix, offset > 0): phrase id and offset of the word start
+        self._entry_phrases = array("i")
+        self._entry_offsets = array("i")
+        # Entries added since the last merge: (suffix, phrase id, offset), in the same order
+        self._delta: List[Tuple[str, int, int]] = []
+        self._delta_keys: List[str] = []
+        # Wide prefix -> (weights version, computed at, candidate phrase ids)
+        self._memo: Dict[str, Tuple[int, float, np.ndarray]] = {}
+        self._version = 0
+
+    # ------------------------------------------------------------------
+    # Building and updating
+    # ------------------------------------------------------------------
+
+    def _suffix(self, entry: int) -> str:
+        return self._texts[self._entry_phrases[entry]].lower()[self._entry_offsets[entry]:]
+
+    def _find(self, kind: int, lowered: str) -> Optional[int]:
+        """Phrase id of a text, through its whole-text entry (first in its run of equal suffixes)."""
+        count = len(self._entry_phrases)
+        entry = bisect_left(range(count), lowered, key=self._suffix)
+        while entry < count and self._entry_offsets[entry] == 0 and self._suffix(entry) == lowered:
+            phrase_id = self._entry_phrases[entry]
+            if self._kinds[phrase_id] == kind:
+                return phrase_id
+            entry += 1
+        index = bisect_left(self._delta_keys, lowered)
+        while index < len(self._delta) and self._delta[index][2] == 0 and self._delta_keys[index] == lowered:
+            phrase_id = self._delta[index][1]
+            if self._kinds[phrase_id] == kind:
+                return phrase_id
+            index += 1
+        return None
+
+    def _new_phrase(self, kind: int, display: str) -> int:
+        phrase_id = len(self._texts)
+        self._texts.append(display)
+        self._kinds.append(kind)
+        self._weights.append(0)
+        self._counts.append(0)
+        return phrase_id
+
+    def _phrase(self, kind: int, text: str) -> Optional[int]:
+        display = _SPACES.sub(" ", text).strip()
+        if not display:
+            return None
+        lowered = display.lower()
+        phrase_id = self._find(kind, lowered)
+        if phrase_id is None:
+            phrase_id = self._new_phrase(kind, display)
+            for offset in word_starts(lowered):
+                suffix = lowered[offset:]
+                # Whole-text entries lead their run of equal suffixes (see _find)
+                index = (bisect_left if offset == 0 else bisect_right)(self._delta_keys, suffix)
+                self._delta_keys.insert(index, suffix)
+                self._delta.insert(index, (suffix, phrase_id, offset))
+        return phrase_id
+
+    def _add(self, name: Optional[str], category: Optional[str], stock: Optional[int], sign: int = 1):
+        for kind, text in enumerate((name, category)):
+            phrase_id = self._phrase(kind, text) if text else None
+            if phrase_id is not None:
+                self._weights[phrase_id] += sign * (stock or 0)
+                self._counts[phrase_id] += sign
+
+    def _apply(self, change: ProductChange):
+        values = change.values
+        # Weights change: memoised candidate sets are due for a recount
+        self._version += 1
+        if change.kind == INSERT:
+            self._add(values.get("name"), values.get("category"), values.get("stock_quantity"))
+        elif change.kind == DELETE:
+            self._add(values.get("name"), values.get("category"), values.get("stock_quantity"), sign=-1)
+        elif change.changed & {"name", "category", "stock_quantity"}:
+            if values.get("name") is None:
+                # Names are required: the session had not loaded the row
+                self._stale = True
+                return
+            old = {}
+            for column in ("name", "category", "stock_quantity"):
+                if column not in change.changed:
+                    old[column] = values.get(column)
+                elif column in change.previous:
+                    old[column] = change.previous[column]
+                else:
+                    # The old value was never loaded: cannot take its weight back
+                    self._stale = True
+                    return
+            self._add(old["name"], old["category"], old["stock_quantity"], sign=-1)
+            self._add(values.get("name"), values.get("category"), values.get("stock_quantity"))
+        if len(self._delta) >= self.merge_at:
+            self._merge()
+
+    def _merge(self):
+        """Fold the delta into the sorted arrays."""
+        if not self._delta:
+            return
+        count = len(self._entry_phrases)
+        positions = [
+            (bisect_left if offset == 0 else bisect_right)(range(count), suffix, key=self._suffix)
+            for suffix, _, offset in self._delta
+        ]
+        phrases = np.insert(np.frombuffer(self._entry_phrases, dtype=np.int32), positions,
+                            [phrase for _, phrase, _ in self._delta])
+        offsets = np.insert(np.frombuffer(self._entry_offsets, dtype=np.int32), positions,
+                            [offset for _, _, offset in self._delta])
+        self._entry_phrases = array("i", phrases.tobytes())
+        self._entry_offsets = array("i", offsets.tobytes())
+        self._delta = []
+        self._delta_keys = []
+        self._memo.clear()
+
+    def _build(self, rows: Iterator) -> "SuggestIndex":
+        built = SuggestIndex()
+        weights: List[int] = []
+        counts: List[int] = []
+        # Per kind: raw text -> phrase id, and lowercase text -> phrase id (build-time only)
+        raw_ids: Tuple[Dict[str, int], ...] = ({}, {})
+        lowered_ids: Tuple[Dict[str, int], ...] = ({}, {})
+        for name, category, stock in rows:
+            for kind, text in ((0, name), (1, category)):
+                if not text:
+                    continue
+                phrase_id = raw_ids[kind].get(text)
+                if phrase_id is None:
+                    display = _SPACES.sub(" ", text).strip()
+                    if not display:
+                        continue
+                    phrase_id = lowered_ids[kind].get(display.lower())
+                    if phrase_id is None:
+                        phrase_id = lowered_ids[kind][display.lower()] = len(built._texts)
+                        built._texts.append(display)
+                        built._kinds.append(kind)
+                        weights.append(0)
+                        counts.append(0)
+                    raw_ids[kind][text] = phrase_id
+                weights[phrase_id] += stock or 0
+                counts[phrase_id] += 1
+        del raw_ids, lowered_ids
+        built._weights = array("q", weights)
+        built._counts = array("i", counts)
+
+        entries = [(phrase_id, offset) for phrase_id, text in enumerate(built._texts)
+                   for offset in word_starts(text.lower())]
+        texts = built._texts
+        entries.sort(key=lambda entry: (texts[entry[0]].lower()[entry[1]:], entry[1] > 0))
+        built._entry_phrases = array("i", (phrase for phrase, _ in entries))
+        built._entry_offsets = array("i", (offset for _, offset in entries))
+        return built
+
+    def _install(self, built: "SuggestIndex"):
+        for name in ("_texts", "_kinds", "_weights", "_counts", "_entry_phrases", "_entry_offsets",
+                     "_delta", "_delta_keys", "_memo"):
+            setattr(self, name, getattr(built, name))
+        self._version += 1
+
+    def _summary(self) -> str:
+        return f"{len(self._texts):,} phrases, {len(self._entry_phrases) + len(self._delta):,} entries"
+
+    # ------------------------------------------------------------------
+    # Querying
+    # ------------------------------------------------------------------
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Tuple[str, str, int]]:
+        """(text, kind, weight) of the heaviest phrases with a word starting with `prefix`."""
+        key = normalize(prefix)
+        if not key:
+            return []
+        with self._lock:
+            length = len(key)
+            count = len(self._entry_phrases)
+
+            def entry_key(entry: int) -> str:
+                offset = self._entry_offsets[entry]
+                return self._texts[self._entry_phrases[entry]].lower()[offset:offset + length]
+
+            low = bisect_left(range(count), key, key=entry_key)
+            high = bisect_right(range(count), key, lo=low, key=entry_key)
+            delta_low = bisect_left(self._delta_keys, key)
+            delta_high = bisect_left(self._delta_keys, key + "\uffff", lo=delta_low)
+            delta = np.array([phrase for _, phrase, _ in self._delta[delta_low:delta_high]], dtype=np.int32)
+
+            weights = np.frombuffer(self._weights, dtype=np.int64)
+            counts = np.frombuffer(self._counts, dtype=np.int32)
+            if high - low <= self.scan_limit:
+                ranged = np.frombuffer(self._entry_phrases, dtype=np.int32)[low:high]
+            else:
+                ranged = self._wide(key, low, high, weights)
+            phrases = np.unique(np.concatenate((ranged, delta)))
+            # Phrases whose products were all deleted stay in the arrays until the next build
+            phrases = phrases[counts[phrases] > 0]
+            phrase_weights = weights[phrases]
+            order = np.lexsort((phrases, -phrase_weights))[:limit]
+            results = [(self._texts[phrase], _KINDS[self._kinds[phrase]], int(weight))
+                       for phrase, weight in zip(phrases[order].tolist(), phrase_weights[order].tolist())]
+            del weights, counts, ranged
+        return results
+
+    def _wide(self, key: str, low: int, high: int, weights: np.ndarray) -> np.ndarray:
+        """Candidate phrases for a prefix with too many entries to rank on every query."""
+        memo = self._memo.get(key)
+        now = self.clock()
+        if memo is not None and (memo[0] == self._version or now - memo[1] < self.refresh_interval):
+            return memo[2]
+        phrases = np.frombuffer(self._entry_phrases, dtype=np.int32)[low:high]
+        # A phrase has one entry per word, so over-fetch before de-duplicating
+        fetch = min(len(phrases), self.candidates * 8)
+        top = np.argpartition(-weights[phrases], fetch - 1)[:fetch]
+        candidates = np.unique(phrases[top])
+        if len(self._memo) >= 4096:
+            self._memo.clear()
+        self._memo[key] = (self._version, now, candidates)
+        return candidates
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "phrases": len(self._texts),
+                "entries": len(self._entry_phrases) + len(self._delta),
+                "delta": len(self._delta),
+                "memoised_prefixes": len(self._memo),
+                "stale": self._stale,
+                "generation": self._generation,
+            }
+
+
+def create_suggest_index() -> SuggestIndex:
+    """Build the index settings from SUGGEST_REBUILD_INTERVAL and SUGGEST_REFRESH_INTERVAL."""
+    return SuggestIndex(
+        rebuild_interval=float(os.getenv("SUGGEST_REBUILD_INTERVAL", "30")),
+        refresh_interval=float(os.getenv("SUGGEST_REFRESH_INTERVAL", "1.0")),
+    )
+
+
+# Global instance
+suggest_index = create_suggest_index()
+catalog_events.subscribe(suggest_index.apply)
@@ -0,0 +1,168 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Cached and estimated totals for list endpoints.
+
+Endpoints report how many rows match their filters next to each page.
+Counting re-runs the filter over every match, so totals are cached per
+table and normalised filter signature. An entry is reused while its
+table's shared write generation (app/database/generations.py) is
+unchanged and for at most COUNT_CACHE_TTL seconds, which bounds staleness
+from writes that bypass the ORM.
+
+Callers choose a total_mode:
+- exact: the real count, cached.
+- estimate: a cached total, even one superseded by writes, as long as it
+  is younger than COUNT_CACHE_STALE_TTL. Otherwise, read the ids of the
+  first ESTIMATE_SAMPLE matches in primary-key order and scale by how far
+  into the id range they reach. Small result sets come back exact.
+  Sampling is cheap when the database walks the primary key (unindexed
+  filters such as category LIKE). When an index on the filter drives the
+  query, as with a price range, the exact count is a cheap index range
+  count and sampling can cost more.
+- none: no total at all.
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import func
+
+from app.database.generations import TableGenerations, table_generations
+
+EXACT = "exact"
+ESTIMATE = "estimate"
+NONE = "none"
+TOTAL_MODES = (EXACT, ESTIMATE, NONE)
+
+ESTIMATE_SAMPLE = 1000
+
+
+def filter_signature(**filters: Any) -> Tuple:
+    """Hashable, order-independent form of an endpoint's filters; unset filters are dropped."""
+    items = []
+    for name, value in sorted(filters.items()):
+        if value is None or value == "":
+            continue
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        items.append((name, value))
+    return tuple(items)
+
+
+def check_total_mode(mode: str):
+    if mode not in TOTAL_MODES:
+        raise HTTPException(status_code=400, detail=f"total_mode must be one of: {', '.join(TOTAL_MODES)}")
+
+
+def estimate_count(query: Any, id_column: Any, sample: int = ESTIMATE_SAMPLE) -> Tuple[int, bool]:
+    """(count, exact): extrapolated from the id of the sample-th match when there are more."""
+    ids = [row[0] for row in query.with_entities(id_column).order_by(id_column).limit(sample)]
+    if len(ids) < sample:
+        return len(ids), True
+    # Separate queries: SQLite answers a lone min() or max() from the index, both together by a scan
+    low = query.session.query(func.min(id_column)).scalar()
+    high = query.session.query(func.max(id_column)).scalar()
+    return round(sample * (high - low + 1) / (ids[-1] - low + 1)), False
+
+
+class CountCache:
+    """LRU of (table, filter signature) -> total, invalidated by table write generations."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 30.0, stale_ttl: float = 300.0,
+                 generations: TableGenerations = table_generations, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # Superseded totals still serve as estimates for this long
+        self.stale_ttl = max(stale_ttl, ttl)
+        self.generations = generations
+        self.clock = clock
+        # key -> (total, exact, generation, stored_at)
+        self._entries: "OrderedDict[Tuple, Tuple[int, bool, int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def get(self, table: str, signature: Tuple, generation: int, exact_only: bool = True) -> Optional[Tuple[int, bool]]:
+        """(total, exact) for a filter at a table generation; with exact_only=False, estimates and stale totals count too."""
+        key = (table, signature)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                total, exact, _, stored_at = entry
+                age = self.clock() - stored_at
+                if age >= self.stale_ttl:
+                    del self._entries[key]
+                elif entry[2] == generation and age < self.ttl:
+                    if exact or not exact_only:
+                        self._entries.move_to_end(key)
+                        self.hits += 1
+                        return total, exact
+                elif not exact_only:
+                    self._entries.move_to_end(key)
+                    self.stale_hits += 1
+                    return total, False
+            self.misses += 1
+            return None
+
+    def put(self, table: str, signature: Tuple, total: int, exact: bool, generation: int):
+        key = (table, signature)
+        with self._lock:
+            self._entries[key] = (total, exact, generation, self.clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def total(self, query: Any, table: str, signature: Tuple, mode: str, id_column: Any,
+              count: Optional[Callable[[], int]] = None) -> Tuple[Optional[int], str]:
+        """Total rows matching `query` under `mode`, and the mode actually delivered.
+
+        `count` computes the exact total in place of the query (for totals cheap enough not to estimate).
+        """
+        check_total_mode(mode)
+        if mode == NONE:
+            return None, NONE
+
+        # Read before counting: a write that lands meanwhile leaves the entry stale, not wrongly fresh
+        generation = self.generations.get(table, query.session)
+        cached = self.get(table, signature, generation, exact_only=(mode == EXACT))
+        if cached is not None:
+            total, exact = cached
+        elif count is not None:
+            total, exact = count(), True
+        elif mode == EXACT:
+            total, exact = query.count(), True
+        else:
+            total, exact = estimate_count(query, id_column)
+        if cached is None and self.max_entries > 0:
+            self.put(table, signature, total, exact, generation)
+        return total, EXACT if exact else ESTIMATE
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "stale_hits": self.stale_hits,
+                    "misses": self.misses}
+
+
+def create_count_cache() -> CountCache:
+    """Build the count cache from COUNT_CACHE_SIZE (0 disables caching), COUNT_CACHE_TTL and COUNT_CACHE_STALE_TTL."""
+    return CountCache(
+        max_entries=int(os.getenv("COUNT_CACHE_SIZE", "1024")),
+        ttl=float(os.getenv("COUNT_CACHE_TTL", "30")),
+        stale_ttl=float(os.getenv("COUNT_CACHE_STALE_TTL", "300")),
+    )
+
+
+# Global instance
+count_cache = create_count_cache()
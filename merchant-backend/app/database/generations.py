@@ -0,0 +1,121 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Per-table write generations, shared by every worker.
+
+Generations live in the ``catalog_versions`` table, one row per table name.
+Each transaction that writes a tracked table through the ORM (unit of work
+flushes and bulk query.update()/delete()) bumps that table's row before it
+commits; the products row is bumped by the catalog change events (see
+app/catalog/events.py), which also cover bulk imports. Caches of derived
+data store the generation they were computed at and treat any later
+generation as stale.
+
+``table_generations.get()`` returns the newest generation this process
+knows of: its own commits are seen at once, other workers' writes within
+``check_interval`` seconds, when the stored value is read again.
+"""
+
+import os
+import time
+import threading
+from itertools import chain
+from typing import Callable, Dict, Iterable
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.catalog.events import bump_shared_generation, catalog_events, shared_generation
+
+_BUMPED = "bumped_generations"
+_CATALOG = "products"
+
+
+class TableGenerations:
+    """Newest known write generation per tracked table name."""
+
+    def __init__(self, tables: Iterable[str], check_interval: float = 1.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.tables = frozenset(tables)
+        self.check_interval = check_interval
+        self.clock = clock
+        self._generations: Dict[str, int] = {}
+        self._next_check: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def get(self, table: str, session: Session) -> int:
+        """Generation of table, re-reading the stored value at most every check_interval.
+
+        The session only checks out a connection for that read, so callers
+        that go on to wait for another request's result do not hold one.
+        """
+        now = self.clock()
+        if now >= self._next_check.get(table, 0.0):
+            self._next_check[table] = now + self.check_interval
+            self.observe(table, shared_generation(session.connection(), table))
+        return self._generations.get(table, 0)
+
+    def observe(self, table: str, generation: int):
+        """Record a generation committed or read for table; generations only move forward."""
+        with self._lock:
+            if generation > self._generations.get(table, 0):
+                self._generations[table] = generation
+
+    def _bump(self, session: Session, table: str):
+        # Once per transaction: later flushes in it commit together
+        bumped = session.info.setdefault(_BUMPED, {})
+        if table in self.tables and table != _CATALOG and table not in bumped:
+            bumped[table] = bump_shared_generation(session.connection(), table)
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_flushed(session: Session, flush_context):
+    for instance in chain(session.new, session.dirty, session.deleted):
+        table = getattr(instance, "__tablename__", None)
+        if table:
+            table_generations._bump(session, table)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _bump_bulk(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None:
+            session = orm_execute_state.session
+            if table.name == _CATALOG:
+                # Bulk statements skip the unit of work, so the catalog events never see them
+                session.info.setdefault(_BUMPED, {}).setdefault(
+                    _CATALOG, bump_shared_generation(session.connection(), _CATALOG)
+                )
+            else:
+                table_generations._bump(session, table.name)
+
+
+@event.listens_for(Session, "after_commit")
+def _observe_committed(session: Session):
+    for table, generation in session.info.pop(_BUMPED, {}).items():
+        table_generations.observe(table, generation)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_rolled_back(session: Session, previous_transaction):
+    session.info.pop(_BUMPED, None)
+
+
+def _observe_catalog(changes):
+    generation = getattr(changes, "shared_generation", None)
+    if generation is not None:
+        table_generations.observe(_CATALOG, generation)
+
+
+# Global instance
+table_generations = TableGenerations(
+    ("products", "orders"), check_interval=float(os.getenv("TABLE_GENERATION_CHECK_INTERVAL", "1.0"))
+)
+catalog_events.subscribe(_observe_catalog)
@@ -0,0 +1,49 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Strong ETags and conditional GETs for JSON responses.
+
+The ETag is a hash of the exact response bytes, so it changes whenever the
+representation does. A request whose If-None-Match lists it gets a 304
+with no body. Cache-Control lets the CDN proxy and agents keep responses
+for HTTP_CACHE_MAX_AGE seconds (default 0) and revalidate them after that.
+"""
+
+import os
+import hashlib
+from typing import Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", "0"))
+CACHE_CONTROL = f"public, max-age={MAX_AGE}, must-revalidate"
+
+
+def etag(body: bytes) -> str:
+    """Strong entity tag for a response body."""
+    return f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+
+
+def not_modified(if_none_match: Optional[str], tag: str) -> bool:
+    """Whether an If-None-Match header matches the tag (weak comparison, as RFC 9110 requires for GET)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(candidate.strip().removeprefix("W/") == tag for candidate in if_none_match.split(","))
+
+
+def json_response(request: Request, body: bytes, tag: Optional[str] = None) -> Response:
+    """The JSON body with its ETag, or a bodiless 304 when the client already has it."""
+    tag = tag or etag(body)
+    headers = {"ETag": tag, "Cache-Control": CACHE_CONTROL}
+    if not_modified(request.headers.get("if-none-match"), tag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -12,12 +12,23 @@ import json
 import os
 from dotenv import load_dotenv
 from fastapi import FastAPI, Depends, HTTPException, Request, Response
+from fastapi.responses import PlainTextResponse
 
 # Load environment variables
 load_dotenv()
 from fastapi.middleware.cors import CORSMiddleware
 from app.database.database import create_tables
 from app.routes import products, cart, orders, auth
+from app.security.batch_verification import batch_signature_verifier
+from app.security.signature_verification import signature_verifier
+from app.security.tap_middleware import TAPVerificationMiddleware
+from app.security.session_tokens import session_issuer
+from app.metrics import metrics_registry
+from app.catalog.ranking import product_ranker
+from app.catalog.fuzzy import fuzzy_index
+from app.catalog.columnar import columnar_snapshot
+from app.catalog.suggest import suggest_index
+from app.catalog.facets import facet_index
 
 # Configure logging
 logging.basicConfig(
@@ -50,6 +61,12 @@ async def log_requests(request: Request, call_next):
     
     return response
 
+# Verify TAP signatures in-process (TAP_VERIFICATION_MODE=proxy keeps trusting CDN headers)
+app.add_middleware(TAPVerificationMiddleware, verifier=signature_verifier, sessions=session_issuer)
+if session_issuer is not None and signature_verifier.key_store is not None:
+    # Sessions die with the registry key they were issued for
+    signature_verifier.key_store.on_remove(session_issuer.revoke_key)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -71,6 +88,23 @@ def startup_event():
     logger.info("🚀 Starting Reference Merchant API...")
     create_tables()
     logger.info("✅ Database tables created/verified")
+    if signature_verifier.key_store is not None:
+        signature_verifier.key_store.start()
+        logger.info(f"🔑 Loading agent keys from {signature_verifier.key_store.registry_url}")
+    if os.getenv("SEARCH_INDEX_WARM", "true").lower() == "true":
+        product_ranker.warm(products.ranking_snapshot)
+        fuzzy_index.warm(products.ranking_snapshot)
+        suggest_index.warm(products.suggest_snapshot)
+        facet_index.warm(products.facet_snapshot)
+    if os.getenv("COLUMNAR_SNAPSHOT", "true").lower() == "true":
+        columnar_snapshot.warm(products.columnar_rows)
+
+@app.on_event("shutdown")
+def shutdown_event():
+    """Release background resources on shutdown"""
+    batch_signature_verifier.shutdown()
+    if signature_verifier.key_store is not None:
+        signature_verifier.key_store.stop()
 
 @app.get("/")
 def read_root():
@@ -82,6 +116,11 @@ def health_check():
     """Health check endpoint"""
     return {"status": "healthy"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus metrics (empty when METRICS_ENABLED=false)"""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     # Run development server
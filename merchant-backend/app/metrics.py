@@ -0,0 +1,157 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+In-process metrics registry with Prometheus text export.
+
+Counters and fixed-bucket histograms, each with at most one label. Durations
+are observed as integer nanoseconds from ``time.perf_counter_ns`` and
+exported in seconds, so recording a sample is a bisect plus a few integer
+additions under an uncontended lock.
+
+METRICS_ENABLED=false turns recording off; components then skip their
+timing calls entirely.
+"""
+
+import os
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence
+
+# 1us .. 100ms, roughly 1-2.5-5 per decade
+DEFAULT_DURATION_BUCKETS_NS = (
+    1_000, 2_500, 5_000, 10_000, 25_000, 50_000, 100_000, 250_000,
+    500_000, 1_000_000, 2_500_000, 5_000_000, 10_000_000, 100_000_000,
+)
+
+_INF_BUCKET = 'le="+Inf"'
+
+
+def metrics_enabled() -> bool:
+    return os.getenv("METRICS_ENABLED", "true").lower() not in ("0", "false", "no", "off")
+
+
+def _label_text(labelname: Optional[str], label: Optional[str], extra: str = "") -> str:
+    labels = []
+    if labelname is not None:
+        escaped = str(label).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        labels.append(f'{labelname}="{escaped}"')
+    if extra:
+        labels.append(extra)
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+
+class Counter:
+    """Monotonic counter, optionally split by one label."""
+
+    def __init__(self, name: str, documentation: str, labelname: Optional[str] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelname = labelname
+        self._values: Dict[Optional[str], int] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label: Optional[str] = None, amount: int = 1):
+        with self._lock:
+            self._values[label] = self._values.get(label, 0) + amount
+
+    def value(self, label: Optional[str] = None) -> int:
+        return self._values.get(label, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for label, value in sorted(self._values.items(), key=lambda item: str(item[0])):
+            lines.append(f"{self.name}{_label_text(self.labelname, label)} {value}")
+        return lines
+
+    def snapshot(self) -> Dict[str, int]:
+        return {str(label): value for label, value in self._values.items()}
+
+
+class Histogram:
+    """Fixed-bucket histogram of nanosecond durations, optionally split by one label."""
+
+    def __init__(self, name: str, documentation: str, labelname: Optional[str] = None,
+                 buckets_ns: Sequence[int] = DEFAULT_DURATION_BUCKETS_NS):
+        self.name = name
+        self.documentation = documentation
+        self.labelname = labelname
+        self.buckets_ns = tuple(buckets_ns)
+        # label -> [per-bucket counts (last one is +Inf), sum in ns, count]
+        self._series: Dict[Optional[str], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, duration_ns: int, label: Optional[str] = None):
+        index = bisect_left(self.buckets_ns, duration_ns)
+        with self._lock:
+            series = self._series.get(label)
+            if series is None:
+                series = self._series[label] = [[0] * (len(self.buckets_ns) + 1), 0, 0]
+            series[0][index] += 1
+            series[1] += duration_ns
+            series[2] += 1
+
+    def count(self, label: Optional[str] = None) -> int:
+        series = self._series.get(label)
+        return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for label, (counts, total_ns, count) in sorted(self._series.items(), key=lambda item: str(item[0])):
+            cumulative = 0
+            for bound_ns, bucket_count in zip(self.buckets_ns, counts):
+                cumulative += bucket_count
+                le = _label_text(self.labelname, label, f'le="{bound_ns / 1e9:g}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            lines.append(f"{self.name}_bucket{_label_text(self.labelname, label, _INF_BUCKET)} {count}")
+            lines.append(f"{self.name}_sum{_label_text(self.labelname, label)} {total_ns / 1e9:.9f}")
+            lines.append(f"{self.name}_count{_label_text(self.labelname, label)} {count}")
+        return lines
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        return {
+            str(label): {"count": count, "mean_us": total_ns / count / 1000 if count else 0.0}
+            for label, (_, total_ns, count) in self._series.items()
+        }
+
+
+class MetricsRegistry:
+    """Named collection of counters and histograms."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str, labelname: Optional[str] = None) -> Counter:
+        return self._get_or_create(name, lambda: Counter(name, documentation, labelname))
+
+    def histogram(self, name: str, documentation: str, labelname: Optional[str] = None,
+                  buckets_ns: Sequence[int] = DEFAULT_DURATION_BUCKETS_NS) -> Histogram:
+        return self._get_or_create(name, lambda: Histogram(name, documentation, labelname, buckets_ns))
+
+    def _get_or_create(self, name: str, factory):
+        # Registering twice (e.g. a second verifier instance) shares the existing metric
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory()
+            return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        lines: List[str] = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, dict]:
+        return {name: metric.snapshot() for name, metric in sorted(self._metrics.items())}
+
+
+# Global instance
+metrics_registry = MetricsRegistry()
@@ -6,7 +6,7 @@
 #
 # THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -24,10 +24,20 @@ class Product(Base):
     image_url = Column(String(500))
     stock_quantity = Column(Integer, default=0)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Supplier stock-keeping unit: bulk imports update the product with the same SKU
+    sku = Column(String(100), unique=True, index=True)
+    # Catalog version of the last write to this row (see app/catalog/changes.py)
+    version = Column(Integer, nullable=False, default=0, server_default="0", index=True)
     
     # Relationship with cart items
     cart_items = relationship("CartItem", back_populates="product")
     order_items = relationship("OrderItem", back_populates="product")
+    
+    # Keyset pagination sort orders (see app/pagination.py)
+    __table_args__ = (
+        Index("ix_products_price_id", "price", "id"),
+        Index("ix_products_created_at_id", "created_at", "id"),
+    )
 
 class Cart(Base):
     __tablename__ = "carts"
@@ -77,6 +87,12 @@ class Order(Base):
     
     # Relationship with order items
     items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
+    
+    # Newest-first listings, overall and per customer
+    __table_args__ = (
+        Index("ix_orders_created_at_id", "created_at", "id"),
+        Index("ix_orders_customer_email_created_at_id", "customer_email", "created_at", "id"),
+    )
 
 class OrderItem(Base):
     __tablename__ = "order_items"
@@ -90,3 +106,17 @@ class OrderItem(Base):
     # Relationships
     order = relationship("Order", back_populates="items")
     product = relationship("Product", back_populates="order_items")
+
+class CatalogVersion(Base):
+    """Write generation shared by every worker on the database (see app/catalog/events.py)."""
+    __tablename__ = "catalog_versions"
+    
+    name = Column(String(50), primary_key=True)
+    generation = Column(Integer, nullable=False, default=0)
+
+class ProductTombstone(Base):
+    """A deleted product, kept for the changes feed (see app/catalog/changes.py)."""
+    __tablename__ = "product_tombstones"
+    
+    version = Column(Integer, primary_key=True)
+    product_id = Column(Integer, nullable=False)
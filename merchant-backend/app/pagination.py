@@ -0,0 +1,106 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Keyset (cursor) pagination.
+
+A cursor is the sort key of the last row on a page, base64url-encoded
+together with the name of the sort order it belongs to. The next page
+starts strictly after that key through a row-value comparison the
+matching composite index can seek to, so page N costs the same as page 1,
+where OFFSET reads and discards every earlier row. Every sort key ends in
+the primary key, so keys are unique and rows neither repeat nor go
+missing across a page boundary.
+"""
+
+import json
+import base64
+from datetime import datetime
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import literal, tuple_
+
+
+class InvalidCursor(HTTPException):
+    def __init__(self, detail: str = "Invalid cursor"):
+        super().__init__(status_code=400, detail=detail)
+
+
+class SortOrder(NamedTuple):
+    """A named ordering over columns that ends in the primary key, all in one direction."""
+    name: str
+    columns: Tuple[Any, ...]
+    descending: bool = False
+
+    def order_by(self) -> List[Any]:
+        return [column.desc() if self.descending else column.asc() for column in self.columns]
+
+    def after(self, key: Tuple) -> Any:
+        """Filter for the rows that follow `key` in this order."""
+        columns = tuple_(*self.columns)
+        bound = tuple_(*(literal(value, column.type) for value, column in zip(key, self.columns)))
+        return columns < bound if self.descending else columns > bound
+
+    def key(self, row: Any) -> Tuple:
+        return tuple(getattr(row, column.key) for column in self.columns)
+
+
+def encode_cursor(sort: SortOrder, row: Any) -> str:
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in sort.key(row)]
+    payload = json.dumps([sort.name, values], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str, sort: SortOrder) -> Tuple:
+    """Sort key stored in a cursor issued for `sort`."""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        name, values = json.loads(payload)
+    except (ValueError, TypeError):
+        raise InvalidCursor()
+    if name != sort.name:
+        raise InvalidCursor(f"Cursor belongs to sort order '{name}', not '{sort.name}'")
+    if not isinstance(values, list) or len(values) != len(sort.columns):
+        raise InvalidCursor()
+    key = []
+    for value, column in zip(values, sort.columns):
+        python_type = column.type.python_type
+        try:
+            if python_type is datetime:
+                value = datetime.fromisoformat(value)
+            elif not isinstance(value, python_type) or isinstance(value, bool):
+                value = python_type(value)
+        except (ValueError, TypeError):
+            raise InvalidCursor()
+        key.append(value)
+    return tuple(key)
+
+
+def sort_order(orders: Tuple[SortOrder, ...], name: str) -> SortOrder:
+    for order in orders:
+        if order.name == name:
+            return order
+    raise HTTPException(
+        status_code=400, detail=f"Unknown sort order '{name}' (expected one of: {', '.join(o.name for o in orders)})"
+    )
+
+
+def keyset_page(query: Any, sort: SortOrder, limit: int, cursor: Optional[str],
+                offset: int = 0) -> Tuple[List[Any], Optional[str]]:
+    """One page of `query` in `sort` order after `cursor` (or `offset`), and the cursor for the page after it."""
+    if cursor:
+        query = query.filter(sort.after(decode_cursor(cursor, sort)))
+    query = query.order_by(*sort.order_by())
+    if offset:
+        query = query.offset(offset)
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(sort, rows[-1])
@@ -7,11 +7,18 @@
 # THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 from fastapi import APIRouter, HTTPException, Request
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from app.security.signature_verification import signature_verifier
-import base64
-import json
+from app.security.batch_verification import batch_signature_verifier, MAX_BATCH_SIZE
+from app.security.session_tokens import session_issuer
+from app.security.agent_data import agent_data_decoder
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+# Per-request verification details are logged at DEBUG; AUTH_LOG_LEVEL=DEBUG turns them on
+logger.setLevel(os.getenv("AUTH_LOG_LEVEL", "INFO").upper())
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
@@ -23,40 +30,57 @@ class SignatureVerificationRequest(BaseModel):
     path: str
     directory_agent: Optional[str] = None
     query_param: Optional[str] = None
+    method: Optional[str] = None
+    target_uri: Optional[str] = None
+    # Used to build @target-uri when target_uri is not given (default https)
+    scheme: Optional[str] = None
+    content_digest: Optional[str] = None
 
 class SignatureVerificationResponse(BaseModel):
     is_trusted: bool
     message: str
     agent_name: Optional[str] = None
 
+class BatchSignatureVerificationRequest(BaseModel):
+    items: List[SignatureVerificationRequest] = Field(..., max_length=MAX_BATCH_SIZE)
+
+class BatchSignatureVerificationResponse(BaseModel):
+    results: List[SignatureVerificationResponse]
+    total: int
+    trusted: int
+
+class SessionTokenResponse(BaseModel):
+    token: str
+    expires: int
+    agent_name: Optional[str] = None
+
+def _request_data(verification_request: SignatureVerificationRequest) -> dict:
+    """Prepare request data for signature verification"""
+    return {
+        "authority": verification_request.authority,
+        "path": verification_request.path,
+        "directory-agent": verification_request.directory_agent or "",
+        "query-param": verification_request.query_param or "",
+        "method": verification_request.method or "",
+        "target-uri": verification_request.target_uri or "",
+        "scheme": verification_request.scheme or "",
+        "content-digest": verification_request.content_digest or ""
+    }
+
 @router.post("/verify-signature", response_model=SignatureVerificationResponse)
 def verify_signature(verification_request: SignatureVerificationRequest):
     """Verify the signature from a trusted agent."""
     
     try:
-        # Prepare request data for signature verification
-        request_data = {
-            "authority": verification_request.authority,
-            "path": verification_request.path,
-            "directory-agent": verification_request.directory_agent or "",
-            "query-param": verification_request.query_param or ""
-        }
-        
         # Verify the signature
         is_trusted, message = signature_verifier.is_trusted_agent(
             verification_request.signature_agent,
             verification_request.signature_input,
             verification_request.signature,
-            request_data
+            _request_data(verification_request)
         )
         
-        agent_name = None
-        if is_trusted:
-            # Extract agent name from the trusted agents
-            for agent_url, agent_info in signature_verifier.trusted_agents.items():
-                if agent_url in verification_request.signature_agent:
-                    agent_name = agent_info["name"]
-                    break
+        agent_name = signature_verifier.agent_name(verification_request.signature_agent) if is_trusted else None
         
         return SignatureVerificationResponse(
             is_trusted=is_trusted,
@@ -67,60 +91,123 @@ def verify_signature(verification_request: SignatureVerificationRequest):
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Signature verification failed: {str(e)}")
 
+@router.post("/verify-signature/batch", response_model=BatchSignatureVerificationResponse)
+def verify_signature_batch(batch_request: BatchSignatureVerificationRequest):
+    """Verify many signatures in one call. Results are returned in input order."""
+    
+    try:
+        outcomes = batch_signature_verifier.verify([
+            (
+                item.signature_agent,
+                item.signature_input,
+                item.signature,
+                _request_data(item)
+            )
+            for item in batch_request.items
+        ])
+        
+        results = [
+            SignatureVerificationResponse(
+                is_trusted=is_trusted,
+                message=message,
+                agent_name=signature_verifier.agent_name(item.signature_agent) if is_trusted else None
+            )
+            for item, (is_trusted, message) in zip(batch_request.items, outcomes)
+        ]
+        
+        return BatchSignatureVerificationResponse(
+            results=results,
+            total=len(results),
+            trusted=sum(1 for result in results if result.is_trusted)
+        )
+        
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Batch signature verification failed: {str(e)}")
+
 
 
+@router.post("/session", response_model=SessionTokenResponse)
+def create_session(request: Request, verification_request: Optional[SignatureVerificationRequest] = None):
+    """Exchange a verified TAP signature for a session token to send as X-TAP-Session.
+    
+    The signature is either the one on this request (verified by the TAP middleware)
+    or, as with /verify-signature, one passed in the body.
+    """
+    if session_issuer is None:
+        raise HTTPException(status_code=404, detail="Session tokens are disabled")
+    
+    if verification_request is not None:
+        parsed = signature_verifier.parse_signature_headers(
+            verification_request.signature_agent,
+            verification_request.signature_input,
+            verification_request.signature
+        )
+        if parsed is None:
+            raise HTTPException(status_code=401, detail="Invalid signature format")
+        is_trusted, message = signature_verifier.verify_signature(parsed, _request_data(verification_request))
+        if not is_trusted:
+            raise HTTPException(status_code=401, detail=message)
+        agent_url, keyid, tag = parsed["agent_url"], parsed["keyid"], parsed["tag"]
+        authority = verification_request.authority
+    else:
+        tap = getattr(request.state, "tap", None)
+        # A session may not be used to mint a longer-lived one
+        if tap is None or not tap.verified or tap.session:
+            raise HTTPException(status_code=401, detail="A verified TAP signature is required")
+        agent_url, keyid, tag = tap.agent_url, tap.keyid, tap.tag
+        authority = request.headers.get("host", "")
+    
+    token, claims = session_issuer.issue(agent_url, keyid, authority, tag)
+    return SessionTokenResponse(token=token, expires=claims.expires, agent_name=signature_verifier.agent_name(agent_url))
+
+@router.post("/session/revoke")
+def revoke_session(request: Request):
+    """Revoke the X-TAP-Session token sent with this request"""
+    token = request.headers.get("x-tap-session")
+    if session_issuer is None or not token:
+        raise HTTPException(status_code=400, detail="No session token")
+    is_valid, message, claims = session_issuer.verify(token, None)
+    if not is_valid:
+        raise HTTPException(status_code=400, detail=message)
+    session_issuer.revoke(claims)
+    return {"revoked": True}
+
+@router.get("/signature-cache")
+def signature_cache_stats():
+    """Hit/miss counters of the verified-signature cache, for sizing SIGNATURE_CACHE_SIZE"""
+    if signature_verifier.result_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **signature_verifier.result_cache.stats()}
+
 @router.get("/check-verification")
 def check_verification(request: Request):
-    """Check if request was verified by CDN/Proxy"""
+    """Check if request was verified in-process or by the CDN/Proxy"""
     
-    print("🔍 /api/auth/check-verification endpoint called!")
-    print(f"🔍 Request headers: {dict(request.headers)}")
+    # Prefer the in-process TAP verification; forwarded headers are only trusted in proxy mode
+    tap = getattr(request.state, "tap", None)
+    if tap is not None:
+        agent_verified = "true" if tap.verified else None
+        agent_name = tap.agent_name or tap.keyid
+        verified_by = "merchant-backend"
+    else:
+        # Check headers set by CDN/Proxy
+        agent_verified = request.headers.get("x-signature-verified") or request.headers.get("x-agent-verified")
+        agent_name = request.headers.get("x-signature-key-id") or request.headers.get("x-agent-name") 
+        verified_by = request.headers.get("x-verified-by")
     
-    # Check headers set by CDN/Proxy
-    agent_verified = request.headers.get("x-signature-verified") or request.headers.get("x-agent-verified")
-    agent_name = request.headers.get("x-signature-key-id") or request.headers.get("x-agent-name") 
-    verified_by = request.headers.get("x-verified-by")
-    agent_data = request.headers.get("x-agent-data")
-
-    decoded_agent_data = None
-    if agent_data:
-        try:
-            decoded_agent_data = base64.b64decode(agent_data).decode("utf-8")
-            print(f"Decoded agent data: {decoded_agent_data}")
-        except Exception as e:
-            print(f"Failed to decode agent data: {e}")
-
-    access_allowed = True
-
-    access_url = None
-    if decoded_agent_data:
-        try:
-            data_json = json.loads(decoded_agent_data)
-            access_url = data_json.get("accessUrl")
-            if access_url and "admin" in access_url:
-                access_allowed = False
-            token = data_json.get("token")
-            jwt_body = None
-            if token:
-                try:
-                    # JWT format: header.payload.signature
-                    parts = token.split(".")
-                    if len(parts) == 3:
-                        payload_b64 = parts[1]
-                        # Add padding if necessary
-                        padding = '=' * (-len(payload_b64) % 4)
-                        payload_b64 += padding
-                        payload_bytes = base64.urlsafe_b64decode(payload_b64)
-                        jwt_body = json.loads(payload_bytes.decode("utf-8"))
-                        print(f"JWT body: {jwt_body}")
-                    else:
-                        print("Invalid JWT format.")
-                except Exception as e:
-                    print(f"Failed to decode JWT body: {e}")
-        except json.JSONDecodeError:
-            print("Failed to parse decoded agent data as JSON.")
-
-    print(f"Verification headers: verified={agent_verified}, name={agent_name}, by={verified_by}, data={decoded_agent_data}")
+    # Decoded (and JWT-verified) once per distinct header value
+    raw_agent_data = request.headers.get("x-agent-data")
+    agent_data = agent_data_decoder.decode(raw_agent_data) if raw_agent_data else None
+    access_allowed = agent_data is None or agent_data.access_allowed
+    
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "check_verification verified=%s agent=%s by=%s access_url=%s token_verified=%s error=%s",
+            agent_verified, agent_name, verified_by,
+            agent_data.access_url if agent_data else None,
+            agent_data.token_verified if agent_data else None,
+            (agent_data.error or agent_data.token_error) if agent_data else None,
+        )
 
     if agent_verified == "true":
         if not access_allowed:
@@ -128,12 +215,15 @@ def check_verification(request: Request):
                 "verified": False,
                 "message": "Access Denied."
             }
-        return {
+        response = {
             "verified": True,
             "agent_name": agent_name,
             "verified_by": verified_by or "CDN",
             "message": f"Request verified by {verified_by or 'CDN'}: {agent_name}"
         }
+        if agent_data is not None and agent_data.data and agent_data.data.get("token"):
+            response["agent_token_verified"] = agent_data.token_verified
+        return response
     else:
         return {
             "verified": False,
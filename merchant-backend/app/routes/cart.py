@@ -21,10 +21,16 @@ from app.schemas import (
     CartFinalizeRequest, CartFinalizeResponse, 
     CartFulfillRequest, CartFulfillResponse, Message
 )
+from app.catalog.product_cache import ProductRecord, product_cache
+from typing import Dict
 import uuid
 
 router = APIRouter(prefix="/cart", tags=["cart"])
 
+def _cart_products(db: Session, cart: CartModel) -> Dict[int, ProductRecord]:
+    """Current product records for a cart's items, from the product cache"""
+    return product_cache.get_many(db, [item.product_id for item in cart.items])
+
 def generate_order_number():
     """Generate a unique order number"""
     from datetime import datetime
@@ -66,7 +72,7 @@ def add_item_to_cart(
         db.refresh(cart)
     
     # Check if product exists
-    product = db.query(ProductModel).filter(ProductModel.id == item.product_id).first()
+    product = product_cache.get(db, item.product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     
@@ -284,7 +290,8 @@ def checkout_cart(
         raise HTTPException(status_code=400, detail="Cart is empty")
     
     # Calculate total amount
-    total_amount = sum(item.product.price * item.quantity for item in cart.items)
+    products = _cart_products(db, cart)
+    total_amount = sum(products[item.product_id].price * item.quantity for item in cart.items)
     
     # Extract required fields from checkout_data
     customer_email = checkout_data.get('customer_email')
@@ -368,7 +375,7 @@ def checkout_cart(
             order_id=order.id,
             product_id=cart_item.product_id,
             quantity=cart_item.quantity,
-            price=cart_item.product.price
+            price=products[cart_item.product_id].price
         )
         db.add(order_item)
     
@@ -505,7 +512,8 @@ def finalize_cart(
     customer_info = finalize_data.customer_info
     
     # Calculate base amount
-    subtotal = sum(item.product.price * item.quantity for item in cart.items)
+    products = _cart_products(db, cart)
+    subtotal = sum(products[item.product_id].price * item.quantity for item in cart.items)
     
     # Calculate shipping (simplified logic - in production this would be more complex)
     shipping_cost = 0.0
@@ -554,10 +562,10 @@ def finalize_cart(
         'items': [
             {
                 'product_id': item.product_id,
-                'product_name': item.product.name,
+                'product_name': products[item.product_id].name,
                 'quantity': item.quantity,
-                'unit_price': item.product.price,
-                'total_price': item.product.price * item.quantity
+                'unit_price': products[item.product_id].price,
+                'total_price': products[item.product_id].price * item.quantity
             } for item in cart.items
         ]
     }
@@ -788,7 +796,8 @@ async def x402_checkout(
             raise HTTPException(status_code=400, detail="Cart is empty")
         
         # Calculate totals
-        subtotal = sum(item.quantity * item.product.price for item in cart.items)
+        products = _cart_products(db, cart)
+        subtotal = sum(item.quantity * products[item.product_id].price for item in cart.items)
         shipping_cost = 15.00  # Standard shipping
         tax_rate = 0.0875  # 8.75% tax
         tax_amount = subtotal * tax_rate
@@ -799,9 +808,9 @@ async def x402_checkout(
         for cart_item in cart.items:
             items.append({
                 "product_id": cart_item.product_id,
-                "name": cart_item.product.name,
+                "name": products[cart_item.product_id].name,
                 "quantity": cart_item.quantity,
-                "price": float(cart_item.product.price)
+                "price": float(products[cart_item.product_id].price)
             })
         
         # Prepare settlement request to Payment Facilitator
@@ -883,7 +892,7 @@ async def x402_checkout(
                 order_id=order.id,
                 product_id=cart_item.product_id,
                 quantity=cart_item.quantity,
-                price=cart_item.product.price
+                price=products[cart_item.product_id].price
             )
             db.add(order_item)
         
@@ -14,11 +14,15 @@ from app.models.models import (
     OrderItem as OrderItemModel
 )
 from app.schemas import Order, OrderList, Message
+from app.pagination import SortOrder, keyset_page
+from app.counts import EXACT, count_cache, filter_signature
 import uuid
 from datetime import datetime
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
+NEWEST_FIRST = SortOrder("newest", (OrderModel.created_at, OrderModel.id), descending=True)
+
 def generate_order_number():
     """Generate a unique order number"""
     timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
@@ -33,9 +37,14 @@ def get_orders(
     status: str = None,
     limit: int = 20,
     offset: int = 0,
+    cursor: str = None,
+    total_mode: str = EXACT,
     db: Session = Depends(get_db)
 ):
-    """Get orders with optional filtering"""
+    """Get orders with optional filtering, newest first"""
+    if cursor and offset:
+        raise HTTPException(status_code=400, detail="Use either cursor or offset, not both")
+    
     query = db.query(OrderModel)
     
     if customer_email:
@@ -44,10 +53,11 @@ def get_orders(
     if status:
         query = query.filter(OrderModel.status == status)
     
-    total = query.count()
-    orders = query.order_by(OrderModel.created_at.desc()).offset(offset).limit(limit).all()
+    signature = filter_signature(customer_email=customer_email, status=status)
+    total, total_mode = count_cache.total(query, "orders", signature, total_mode, OrderModel.id)
+    orders, next_cursor = keyset_page(query, NEWEST_FIRST, limit, cursor, offset)
     
-    return OrderList(orders=orders, total=total)
+    return OrderList(orders=orders, total=total, next_cursor=next_cursor, total_mode=total_mode)
 
 @router.get("/{order_id}", response_model=Order)
 def get_order(order_id: int, db: Session = Depends(get_db)):
@@ -7,42 +7,142 @@
 # THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
-from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import Optional
 import requests
 import logging
-from app.database.database import get_db
+import time
+import queue
+import json
+import threading
+import numpy as np
+from app.database.database import SessionLocal, get_db
 from app.models.models import Product as ProductModel
-from app.schemas import Product, ProductList, ProductSearch, ProductCreate
-from sqlalchemy import and_, or_
+from app.schemas import (
+    Product, ProductList, ProductSearch, ProductCreate, SuggestionList, FacetList, ProductBatch, ProductBatchRequest,
+    ProductChangeFeed
+)
+from app.catalog.fulltext import fulltext_index
+from app.catalog.ranking import product_ranker, tokenize
+from app.catalog.fuzzy import fuzzy_index
+from app.catalog.product_cache import product_cache
+from app.catalog.columnar import columnar_snapshot
+from app.catalog.search_cache import search_cache
+from app.catalog.suggest import suggest_index
+from app.catalog.facets import facet_index
+from app.catalog.changes import SNAPSHOT_COLUMNS, catalog_version, changes_since, snapshot_lines
+from app.catalog.bulk_import import CSV, NDJSON, LineFeed, bulk_importer
+from app.catalog.events import shared_generation
+from app.pagination import SortOrder, decode_cursor, encode_cursor, keyset_page, sort_order
+from app.counts import EXACT, NONE, check_total_mode, count_cache, filter_signature
+from app.database.generations import table_generations
+from app.singleflight import single_flight
+from app.etags import json_response
+from sqlalchemy import and_, case, func, or_
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/products", tags=["products"])
 
+RELEVANCE = "relevance"
+PRODUCT_SORT_ORDERS = (
+    SortOrder("id", (ProductModel.id,)),
+    SortOrder("price_asc", (ProductModel.price, ProductModel.id)),
+    SortOrder("price_desc", (ProductModel.price, ProductModel.id), descending=True),
+    SortOrder("newest", (ProductModel.created_at, ProductModel.id), descending=True),
+    SortOrder("oldest", (ProductModel.created_at, ProductModel.id)),
+)
+
 @router.get("/", response_model=ProductList)
 def search_products(
+    request: Request,
     query: Optional[str] = Query(None, description="Search query for product name or description"),
     category: Optional[str] = Query(None, description="Filter by category"),
     min_price: Optional[float] = Query(None, description="Minimum price filter"),
     max_price: Optional[float] = Query(None, description="Maximum price filter"),
     limit: int = Query(20, ge=1, le=100, description="Number of products to return"),
     offset: int = Query(0, ge=0, description="Number of products to skip"),
+    sort: Optional[str] = Query(None, description="relevance (default with a query), id, price_asc, price_desc, newest or oldest"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page, instead of offset"),
+    total_mode: str = Query(EXACT, description="exact, estimate or none (skip counting)"),
     db: Session = Depends(get_db)
 ):
     """Search and filter products"""
+    key = filter_signature(
+        query=query.lower() if query else None, category=category.lower() if category else None,
+        min_price=min_price, max_price=max_price, limit=limit, offset=offset, sort=sort, cursor=cursor,
+        total_mode=total_mode
+    )
+    # Repeated listings are served as cached JSON until the catalog changes
+    body = search_cache.get(db, key)
+    if body is None:
+        def read() -> bytes:
+            version = search_cache.version()
+            page = list_products(query, category, min_price, max_price, limit, offset, sort, cursor, total_mode, db)
+            return search_cache.put(key, _page_json(page), version)
+        
+        # Identical listings requested at the same moment share one database read
+        body = single_flight.do(("search", table_generations.get("products", db), key), read)
+    return json_response(request, body)
+
+def _page_json(page: ProductList) -> bytes:
+    """A listing page from list_products serialized like ProductList, joining each product's cached JSON."""
+    products = b",".join(product.json() for product in page.products)
+    rest = json.dumps({
+        "total": page.total, "limit": page.limit, "offset": page.offset,
+        "next_cursor": page.next_cursor, "total_mode": page.total_mode
+    }, separators=(",", ":"), ensure_ascii=False)
+    return b'{"products":[' + products + b"]," + rest[1:].encode()
+
+def list_products(query: Optional[str], category: Optional[str], min_price: Optional[float],
+                  max_price: Optional[float], limit: int, offset: int, sort: Optional[str],
+                  cursor: Optional[str], total_mode: str, db: Session) -> ProductList:
+    """One page of a product listing, read from the database (or the columnar snapshot).
+    
+    The page holds ProductRecords, unvalidated: serialize it with _page_json().
+    """
+    # Without a sort order, results come in whatever order the filters are cheapest to evaluate in
+    keyset = sort_order(PRODUCT_SORT_ORDERS, sort) if sort and sort != RELEVANCE else None
+    if cursor and (keyset is None or offset):
+        raise HTTPException(status_code=400, detail="cursor needs a sort order other than relevance, and no offset")
+    
+    # Filter-only listings are answered from the in-memory columns when they are loaded
+    if not query:
+        after = decode_cursor(cursor, keyset) if cursor else None
+        page = _columnar_page(db, category, min_price, max_price, keyset.name if keyset else None,
+                              after, offset, limit, total_mode)
+        if page is not None:
+            products, total, total_mode, more = page
+            # Records are not validated again: they are serialized from their cached JSON (see _page_json)
+            return ProductList.model_construct(
+                products=products,
+                total=total,
+                limit=limit,
+                offset=offset,
+                next_cursor=encode_cursor(keyset, products[-1]) if keyset is not None and more else None,
+                total_mode=total_mode
+            )
     
     # Build query
     filters = []
+    query_obj = db.query(ProductModel)
     
+    # Full-text index when available (ranked), substring scan otherwise
+    ranked = None
     if query:
-        filters.append(
-            or_(
-                ProductModel.name.ilike(f"%{query}%"),
-                ProductModel.description.ilike(f"%{query}%")
+        ranked = fulltext_index.filter(query_obj, ProductModel, query, columns=("name", "description"))
+        if ranked is not None:
+            query_obj = ranked
+        else:
+            filters.append(
+                or_(
+                    ProductModel.name.ilike(f"%{query}%"),
+                    ProductModel.description.ilike(f"%{query}%")
+                )
             )
-        )
     
     if category:
         filters.append(ProductModel.category.ilike(f"%{category}%"))
@@ -54,21 +154,35 @@ def search_products(
         filters.append(ProductModel.price <= max_price)
     
     # Apply filters
-    query_obj = db.query(ProductModel)
     if filters:
         query_obj = query_obj.filter(and_(*filters))
     
-    # Get total count
-    total = query_obj.count()
+    # Get total count (cached per filter until the catalog changes)
+    signature = filter_signature(
+        query=query.lower() if query else None, category=category.lower() if category else None,
+        min_price=min_price, max_price=max_price, fulltext=ranked is not None
+    )
+    total, total_mode = count_cache.total(query_obj, "products", signature, total_mode, ProductModel.id)
     
-    # Apply pagination and get results
-    products = query_obj.offset(offset).limit(limit).all()
+    # Stable sort keys page by cursor; relevance order pages by offset
+    next_cursor = None
+    if keyset is not None:
+        products, next_cursor = keyset_page(query_obj, keyset, limit, cursor, offset)
+    else:
+        # Best matches first when searching the full-text index
+        if ranked is not None:
+            query_obj = fulltext_index.order_by_rank(query_obj)
+        
+        # Apply pagination and get results
+        products = query_obj.offset(offset).limit(limit).all()
     
-    return ProductList(
-        products=products,
+    return ProductList.model_construct(
+        products=product_cache.records(products),
         total=total,
         limit=limit,
-        offset=offset
+        offset=offset,
+        next_cursor=next_cursor,
+        total_mode=total_mode
     )
 
 @router.get("/premium/search")
@@ -81,6 +195,7 @@ def premium_search_products(
     limit: int = Query(20, ge=1, le=100, description="Number of products to return"),
     offset: int = Query(0, ge=0, description="Number of products to skip"),
     delegate_token: Optional[str] = Query(None, description="x402 delegation token for payment"),
+    total_mode: str = Query(EXACT, description="exact, estimate or none (skip counting)"),
     db: Session = Depends(get_db)
 ):
     """Premium search endpoint that requires x402 payment via delegation token"""
@@ -151,18 +266,9 @@ def premium_search_products(
     logger.info(f"🔍 Premium search authorized for query: '{query}'")
     
     # Build enhanced query with premium features
+    started = time.perf_counter()
     filters = []
     
-    if query:
-        # Enhanced search with stemming and fuzzy matching (premium feature)
-        filters.append(
-            or_(
-                ProductModel.name.ilike(f"%{query}%"),
-                ProductModel.description.ilike(f"%{query}%"),
-                ProductModel.category.ilike(f"%{query}%")  # Also search in category
-            )
-        )
-    
     if category:
         filters.append(ProductModel.category.ilike(f"%{category}%"))
     
@@ -172,53 +278,361 @@ def premium_search_products(
     if max_price is not None:
         filters.append(ProductModel.price <= max_price)
     
-    # Apply filters with premium sorting
-    query_obj = db.query(ProductModel)
-    if filters:
-        query_obj = query_obj.filter(and_(*filters))
-    
-    # Premium feature: Sort by relevance and popularity
-    query_obj = query_obj.order_by(ProductModel.stock_quantity.desc(), ProductModel.price.asc())
-    
-    # Get total count
-    total = query_obj.count()
+    scores = {}
+    fuzzy = False
+    page = None if query else _columnar_page(
+        db, category, min_price, max_price, "popularity", None, offset, limit, total_mode
+    )
+    if query:
+        # Premium feature: BM25 relevance over name, category and description
+        # Rebuilds run on a background thread, so they read through a session of their own
+        product_ranker.ensure_loaded(ranking_snapshot)
+        product_ranker.refresh(db.connection())
+        ranked_ids, ranked_scores = product_ranker.search(query)
+        if not all(product_ranker.knows(word) for word in tokenize(query)):
+            # Premium feature: typo-tolerant matching when a query word is not in the catalog
+            fuzzy_index.ensure_loaded(ranking_snapshot)
+            fuzzy_index.refresh(db.connection())
+            fuzzy_ids, fuzzy_scores = fuzzy_index.search(query)
+            if len(fuzzy_ids):
+                ranked_ids, ranked_scores, fuzzy = fuzzy_ids, fuzzy_scores, True
+        if filters:
+            ranked_ids, ranked_scores = _filter_ranked(db, ranked_ids, ranked_scores, filters)
+        # Ranking already found every match
+        check_total_mode(total_mode)
+        total = len(ranked_ids) if total_mode != NONE else None
+        total_mode = EXACT if total is not None else NONE
+        page_ids = ranked_ids[offset:offset + limit].tolist()
+        page_scores = ranked_scores[offset:offset + limit].tolist()
+        rows = {p.id: p for p in db.query(ProductModel).filter(ProductModel.id.in_(page_ids))} if page_ids else {}
+        products = [rows[product_id] for product_id in page_ids if product_id in rows]
+        scores = {product_id: round(score, 4) for product_id, score in zip(page_ids, page_scores)}
+    elif page is not None:
+        # Premium feature: sort by popularity, straight from the in-memory columns
+        products, total, total_mode, _ = page
+    else:
+        query_obj = db.query(ProductModel)
+        if filters:
+            query_obj = query_obj.filter(and_(*filters))
+        signature = filter_signature(
+            category=category.lower() if category else None, min_price=min_price, max_price=max_price
+        )
+        total, total_mode = count_cache.total(query_obj, "products", signature, total_mode, ProductModel.id)
+        # Premium feature: sort by popularity
+        query_obj = query_obj.order_by(ProductModel.stock_quantity.desc(), ProductModel.price.asc())
+        products = query_obj.offset(offset).limit(limit).all()
     
-    # Apply pagination
-    products = query_obj.offset(offset).limit(limit).all()
+    search_time_ms = round((time.perf_counter() - started) * 1000, 2)
+    results = []
+    for product in products:
+        result = Product.model_validate(product).model_dump()
+        if query:
+            result["relevance_score"] = scores.get(product.id, 0.0)
+        results.append(result)
     
     # Premium response with enhanced data
     return {
-        "products": products,
+        "products": results,
         "total": total,
+        "total_mode": total_mode,
         "limit": limit,
         "offset": offset,
         "premium_features": {
             "enhanced_search": True,
-            "relevance_sorted": True,
+            "relevance_sorted": bool(query),
             "payment_confirmed": True,
             "service_tier": "premium"
         },
         "search_analytics": {
             "query_processed": query,
-            "results_found": len(products),
-            "search_time_ms": 45,  # Simulated faster response
-            "relevance_score": 0.95
+            "results_found": len(results),
+            "search_time_ms": search_time_ms,
+            "fuzzy_matched": fuzzy,
+            "relevance_score": results[0]["relevance_score"] if query and results else None
         }
     }
 
+def _columnar_page(db: Session, category: Optional[str], min_price: Optional[float], max_price: Optional[float],
+                   sort: Optional[str], after, offset: int, limit: int, total_mode: str):
+    """(products, total, total_mode, more) from the columnar snapshot, or None when SQL has to answer."""
+    # LIKE wildcards in the category only mean something to SQL
+    if category and ("%" in category or "_" in category):
+        return None
+    if not columnar_snapshot.usable(db.connection()):
+        return None
+    signature = filter_signature(
+        category=category.lower() if category else None, min_price=min_price, max_price=max_price
+    )
+    # Counting the columns is cheap enough that estimates are exact too
+    total, total_mode = count_cache.total(
+        db.query(ProductModel), "products", signature, total_mode, ProductModel.id,
+        count=lambda: columnar_snapshot.count(category, min_price, max_price)
+    )
+    page_ids, more = columnar_snapshot.query(category, min_price, max_price, sort, after, offset, limit)
+    records = product_cache.get_many(db, page_ids)
+    products = [records[product_id] for product_id in page_ids if product_id in records]
+    return products, total, total_mode, more
+
+def columnar_rows():
+    """Catalog generation, then the snapshot columns, read in one transaction of their own."""
+    db = SessionLocal()
+    try:
+        yield shared_generation(db.connection())
+        yield from db.query(
+            ProductModel.id, ProductModel.price, ProductModel.stock_quantity,
+            ProductModel.category, ProductModel.created_at
+        ).yield_per(10000)
+    finally:
+        db.close()
+
+def _suggest_rows(db: Session):
+    """Catalog generation, then the columns the suggest index is built from."""
+    yield shared_generation(db.connection())
+    yield from db.query(ProductModel.name, ProductModel.category, ProductModel.stock_quantity).yield_per(10000)
+
+def suggest_snapshot():
+    """Suggest rows read through a session of their own (for warming the index off-request)."""
+    db = SessionLocal()
+    try:
+        yield from _suggest_rows(db)
+    finally:
+        db.close()
+
+def _facet_rows(db: Session):
+    """Catalog generation, then the columns the facet counters are built from."""
+    yield shared_generation(db.connection())
+    yield from db.query(ProductModel.category, ProductModel.price, ProductModel.stock_quantity).yield_per(10000)
+
+def facet_snapshot():
+    """Facet rows read through a session of their own (for warming the counters off-request)."""
+    db = SessionLocal()
+    try:
+        yield from _facet_rows(db)
+    finally:
+        db.close()
+
+def _query_facets(db: Session, query: str):
+    """Facet counts over the products matching a search query, aggregated in SQL over the matches only."""
+    bucket = case(
+        *[(ProductModel.price < edge, index) for index, edge in enumerate(facet_index.edges)],
+        else_=len(facet_index.edges)
+    )
+    query_obj = db.query(
+        ProductModel.category, bucket, func.count(), func.sum(case((ProductModel.stock_quantity > 0, 1), else_=0))
+    )
+    matched = fulltext_index.filter(query_obj, ProductModel, query, columns=("name", "description"))
+    if matched is None:
+        matched = query_obj.filter(
+            or_(
+                ProductModel.name.ilike(f"%{query}%"),
+                ProductModel.description.ilike(f"%{query}%")
+            )
+        )
+    
+    facets = {}
+    for category, index, count, in_stock in matched.group_by(ProductModel.category, bucket):
+        facet = facets.setdefault(category, [category, 0, 0, [0] * (len(facet_index.edges) + 1)])
+        facet[1] += count
+        facet[2] += in_stock or 0
+        facet[3][index] += count
+    return sorted(facets.values(), key=lambda facet: (-facet[1], facet[0] or ""))
+
+def _ranking_rows(db: Session):
+    """Catalog generation, then the columns the BM25 index is built from."""
+    yield shared_generation(db.connection())
+    yield from db.query(
+        ProductModel.id, ProductModel.name, ProductModel.category, ProductModel.description
+    ).yield_per(10000)
+
+def ranking_snapshot():
+    """Index rows read through a session of their own (for warming the index off-request)."""
+    db = SessionLocal()
+    try:
+        yield from _ranking_rows(db)
+    finally:
+        db.close()
+
+def _filter_ranked(db: Session, ranked_ids, ranked_scores, filters, chunk_size: int = 10000):
+    """Keep the ranked products that also pass the SQL filters, in rank order."""
+    allowed = set()
+    candidates = ranked_ids.tolist()
+    for start in range(0, len(candidates), chunk_size):
+        chunk = candidates[start:start + chunk_size]
+        allowed.update(
+            product_id for (product_id,) in
+            db.query(ProductModel.id).filter(ProductModel.id.in_(chunk), *filters)
+        )
+    keep = np.fromiter((product_id in allowed for product_id in candidates), dtype=bool, count=len(candidates))
+    return ranked_ids[keep], ranked_scores[keep]
+
+@router.get("/suggest", response_model=SuggestionList)
+def suggest_products(
+    prefix: str = Query(..., min_length=1, max_length=100, description="Start of a word in a product name or category"),
+    limit: int = Query(10, ge=1, le=50, description="Number of completions to return"),
+    db: Session = Depends(get_db)
+):
+    """Autocomplete product names and categories, heaviest stock first"""
+    suggest_index.ensure_loaded(suggest_snapshot)
+    suggest_index.refresh(db.connection())
+    return SuggestionList(
+        prefix=prefix,
+        suggestions=[
+            {"text": text, "type": kind, "weight": weight}
+            for text, kind, weight in suggest_index.suggest(prefix, limit)
+        ]
+    )
+
+@router.get("/facets", response_model=FacetList)
+def product_facets(
+    query: Optional[str] = Query(None, description="Only count products matching this search"),
+    db: Session = Depends(get_db)
+):
+    """Product counts per category and price bucket"""
+    if query:
+        facets = _query_facets(db, query)
+    else:
+        facet_index.ensure_loaded(facet_snapshot)
+        facet_index.refresh(db.connection())
+        facets = facet_index.counts()
+    
+    histogram = [sum(counts) for counts in zip(*(facet[3] for facet in facets))] or [0] * (len(facet_index.edges) + 1)
+    return FacetList(
+        query=query,
+        total=sum(facet[1] for facet in facets),
+        categories=[
+            {"name": category, "count": count, "in_stock": in_stock, "price_buckets": buckets}
+            for category, count, in_stock, buckets in facets
+        ],
+        price_buckets=[
+            {"min": low, "max": high, "count": count}
+            for (low, high), count in zip(facet_index.bucket_ranges(), histogram)
+        ]
+    )
+
+@router.post("/batch", response_model=ProductBatch)
+def batch_products(request: ProductBatchRequest, db: Session = Depends(get_db)):
+    """Look up several products at once, in request order, with explicit not-found entries"""
+    fields = list(Product.model_fields)
+    if request.fields is not None:
+        unknown = sorted(set(request.fields) - set(fields))
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown product fields: {', '.join(unknown)}")
+        fields = ["id"] + [field for field in fields if field != "id" and field in request.fields]
+    
+    records = product_cache.get_many(db, request.ids, fields=fields)
+    return ProductBatch(products=[
+        {"id": product_id, "found": True, "product": {field: getattr(records[product_id], field) for field in fields}}
+        if product_id in records else {"id": product_id, "found": False}
+        for product_id in request.ids
+    ])
+
+@router.get("/changes", response_model=ProductChangeFeed)
+def product_changes(
+    since: int = Query(0, ge=0, description="Catalog version already seen (X-Catalog-Version of the snapshot, or next_since)"),
+    limit: int = Query(500, ge=1, le=5000, description="Maximum number of changes to return"),
+    db: Session = Depends(get_db)
+):
+    """Products created, updated or deleted after a catalog version, oldest first"""
+    changes, more = changes_since(db, since, limit)
+    return ProductChangeFeed(
+        since=since,
+        next_since=changes[-1][0] if changes else since,
+        more=more,
+        changes=[
+            {"version": version, "id": product_id, "deleted": product is None, "product": product}
+            for version, product_id, product in changes
+        ]
+    )
+
+def _snapshot_stream(db: Session):
+    try:
+        yield from snapshot_lines(
+            db.query(*(getattr(ProductModel, column) for column in SNAPSHOT_COLUMNS)).yield_per(10000)
+        )
+    finally:
+        db.close()
+
+@router.get("/snapshot")
+def product_snapshot():
+    """Every product as gzip-compressed NDJSON, for a cold start before following /changes"""
+    db = SessionLocal()
+    try:
+        # Read before the rows: changes made during the stream are replayed by /changes, not lost
+        version = catalog_version(db.connection())
+    except Exception:
+        db.close()
+        raise
+    return StreamingResponse(
+        _snapshot_stream(db),
+        media_type="application/x-ndjson",
+        headers={"Content-Encoding": "gzip", "X-Catalog-Version": str(version)}
+    )
+
 @router.get("/{product_id}", response_model=Product)
-def get_product(product_id: int, db: Session = Depends(get_db)):
+def get_product(product_id: int, request: Request, db: Session = Depends(get_db)):
     """Get a specific product by ID"""
-    product = db.query(ProductModel).filter(ProductModel.id == product_id).first()
+    product = single_flight.do(
+        ("product", table_generations.get("products", db), product_id), lambda: product_cache.get(db, product_id)
+    )
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    return product
+    return json_response(request, product.json(), product.etag())
 
 @router.post("/", response_model=Product)
 def create_product(product: ProductCreate, db: Session = Depends(get_db)):
     """Create a new product (admin functionality)"""
     db_product = ProductModel(**product.dict())
     db.add(db_product)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=f"A product with SKU {product.sku} already exists")
     db.refresh(db_product)
     return db_product
+
+@router.post("/import")
+async def import_products(
+    request: Request,
+    format: str = Query(CSV, pattern=f"^({CSV}|{NDJSON})$", description="Body format: csv (with a header row) or ndjson"),
+    db: Session = Depends(get_db)
+):
+    """Bulk create or update (by SKU) products from a CSV or NDJSON body (admin functionality)
+    
+    Rows are validated and written on a worker thread while the body is still
+    arriving. Responds with NDJSON progress reports, one per imported chunk,
+    the last with "done": true and, if the import stopped early, "error".
+    """
+    feed = LineFeed()
+    reports: "queue.Queue[Optional[str]]" = queue.Queue()
+    bind = db.get_bind()
+    
+    def run():
+        try:
+            for report in bulk_importer.steps(bind, feed, format):
+                reports.put(json.dumps(report.as_dict()) + "\n")
+        except Exception as error:
+            # steps() reports its own failures; this is the last resort so the stream still ends with done
+            logger.exception("Product import stopped")
+            reports.put(json.dumps({"done": True, "error": f"{type(error).__name__}: {error}"}) + "\n")
+        finally:
+            feed.close()
+            reports.put(None)
+    
+    threading.Thread(target=run, name="product-import", daemon=True).start()
+    try:
+        async for chunk in request.stream():
+            # Wait for room off the event loop only when the import falls behind
+            if not feed.put(chunk, block=False):
+                await run_in_threadpool(feed.put, chunk)
+        if not feed.put(None, block=False):
+            await run_in_threadpool(feed.put, None)
+    except BaseException:
+        feed.abort()
+        raise
+    
+    def progress():
+        while (line := reports.get()) is not None:
+            yield line
+    
+    return StreamingResponse(progress(), media_type="application/x-ndjson")
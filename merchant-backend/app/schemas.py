@@ -6,8 +6,8 @@
 #
 # THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
-from pydantic import BaseModel, EmailStr
-from typing import List, Optional
+from pydantic import BaseModel, EmailStr, Field
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 
 # Product schemas
@@ -18,6 +18,7 @@ class ProductBase(BaseModel):
     category: Optional[str] = None
     image_url: Optional[str] = None
     stock_quantity: int = 0
+    sku: Optional[str] = None
 
 class ProductCreate(ProductBase):
     pass
@@ -29,6 +30,32 @@ class Product(ProductBase):
     class Config:
         from_attributes = True
 
+class ProductBatchRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=100)
+    # Product fields to return (all when omitted); id is always included
+    fields: Optional[List[str]] = None
+
+class ProductBatchEntry(BaseModel):
+    id: int
+    found: bool
+    product: Optional[Dict[str, Any]] = None
+
+class ProductBatch(BaseModel):
+    products: List[ProductBatchEntry]
+
+class ProductChangeEntry(BaseModel):
+    version: int
+    id: int
+    deleted: bool = False
+    product: Optional[Product] = None
+
+class ProductChangeFeed(BaseModel):
+    since: int
+    # Pass as `since` to get the following changes
+    next_since: int
+    more: bool
+    changes: List[ProductChangeEntry]
+
 # Cart schemas
 class CartItemBase(BaseModel):
     product_id: int
@@ -194,13 +221,43 @@ class ProductSearch(BaseModel):
 # Response schemas
 class ProductList(BaseModel):
     products: List[Product]
-    total: int
+    total: Optional[int]
     limit: int
     offset: int
+    next_cursor: Optional[str] = None
+    total_mode: str = "exact"
+
+class Suggestion(BaseModel):
+    text: str
+    type: str
+    weight: int
+
+class SuggestionList(BaseModel):
+    prefix: str
+    suggestions: List[Suggestion]
+
+class PriceBucket(BaseModel):
+    min: float
+    max: Optional[float]
+    count: int
+
+class CategoryFacet(BaseModel):
+    name: Optional[str]
+    count: int
+    in_stock: int
+    price_buckets: List[int]
+
+class FacetList(BaseModel):
+    query: Optional[str] = None
+    total: int
+    categories: List[CategoryFacet]
+    price_buckets: List[PriceBucket]
 
 class OrderList(BaseModel):
     orders: List[Order]
-    total: int
+    total: Optional[int]
+    next_cursor: Optional[str] = None
+    total_mode: str = "exact"
 
 # Message schemas
 class Message(BaseModel):
@@ -0,0 +1,245 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Decoding and verification of the X-Agent-Data header.
+
+The header is base64 JSON, optionally carrying a JWT under ``token``. Hot
+agents send the same blob thousands of times an hour, so decoded results are
+kept in an LRU keyed on the raw header value. JWT signatures are verified
+against a JWKS document (AGENT_JWKS_URL) that is cached for AGENT_JWKS_TTL
+seconds and refetched early when a token names an unknown ``kid``. Expired
+key sets are refetched on a background thread while the old one keeps
+being served, so only a token with an unknown ``kid`` waits on the network.
+
+Cached results stay correct over time: token expiry is re-checked on every
+hit, and entries verified against an older JWKS are re-verified once the key
+set changes.
+"""
+
+import os
+import json
+import time
+import base64
+import logging
+import binascii
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+import requests
+from jose import jwt, JWTError
+from jose.constants import ALGORITHMS
+
+logger = logging.getLogger(__name__)
+
+# Asymmetric signatures only: an HMAC algorithm would let a public JWK be used as a shared secret
+TOKEN_ALGORITHMS = sorted({"RS256", "RS384", "RS512", "ES256", "ES384", "ES512"} & ALGORITHMS.SUPPORTED)
+
+UNKNOWN_KEY = "Unknown signing key"
+
+
+class AgentData(NamedTuple):
+    """Decoded X-Agent-Data header."""
+    data: Optional[Dict[str, Any]]
+    access_url: Optional[str]
+    token_claims: Optional[Dict[str, Any]] = None
+    token_verified: bool = False
+    token_error: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def access_allowed(self) -> bool:
+        return not (self.access_url and "admin" in self.access_url)
+
+
+class JWKSCache:
+    """Signing keys from a JWKS URL, indexed by kid and refreshed after ttl seconds."""
+
+    def __init__(self, url: str, ttl: float = 300.0, min_refresh_interval: float = 30.0, timeout: float = 2.0):
+        self.url = url
+        self.ttl = ttl
+        # Fetches (early ones for unknown kids, retries after failures) happen at most this often
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        # Bumped whenever the key set changes, so cached verifications can tell they are stale
+        self.generation = 0
+        self._keys: Dict[str, Dict[str, Any]] = {}
+        self._fetched_at = 0.0
+        self._attempted_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def current_generation(self) -> int:
+        """Key set generation; an expired key set is refetched in the background meanwhile."""
+        self._refresh_if_expired()
+        return self.generation
+
+    def get(self, kid: Optional[str]) -> Optional[Dict[str, Any]]:
+        if kid not in self._keys:
+            # The token cannot be verified without this key: fetch it now
+            if time.time() - self._attempted_at > self.min_refresh_interval:
+                self._refresh()
+        else:
+            self._refresh_if_expired()
+        return self._keys.get(kid)
+
+    def _refresh_if_expired(self):
+        now = time.time()
+        if now - self._fetched_at <= self.ttl or now - self._attempted_at <= self.min_refresh_interval:
+            return
+        # A second thread slipping past this check is harmless: _refresh() only fetches once per interval
+        if self._refreshing:
+            return
+        self._refreshing = True
+        threading.Thread(target=self._refresh_in_background, name="jwks-refresh", daemon=True).start()
+
+    def _refresh_in_background(self):
+        try:
+            self._refresh()
+        finally:
+            self._refreshing = False
+
+    def _refresh(self):
+        with self._lock:
+            now = time.time()
+            # Another thread may have refreshed while we waited for the lock
+            if now - self._attempted_at < self.min_refresh_interval:
+                return
+            self._attempted_at = now
+            try:
+                response = requests.get(self.url, timeout=self.timeout)
+                response.raise_for_status()
+                keys = {key.get("kid"): key for key in response.json().get("keys", [])}
+            except (requests.RequestException, ValueError, AttributeError) as e:
+                # Keep serving the last key set until the JWKS endpoint is back
+                logger.warning("jwks_refresh_failed url=%s error=%s", self.url, e)
+                return
+            if keys != self._keys:
+                self._keys = keys
+                self.generation += 1
+                logger.info("jwks_updated url=%s keys=%d", self.url, len(keys))
+            self._fetched_at = now
+
+
+class AgentDataDecoder:
+    """Decodes X-Agent-Data values through an LRU keyed on the raw header."""
+
+    def __init__(self, jwks: Optional[JWKSCache] = None, max_entries: int = 1024,
+                 audience: Optional[str] = None, leeway: int = 30):
+        self.jwks = jwks
+        self.max_entries = max_entries
+        self.audience = audience
+        self.leeway = leeway
+        # raw header -> (decoded value, JWKS generation it was verified against, None without a token)
+        self._entries: "OrderedDict[str, Tuple[AgentData, Optional[int]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def decode(self, raw: str) -> AgentData:
+        with self._lock:
+            entry = self._entries.get(raw)
+        # Entries without a token (generation None) do not depend on the key set
+        if entry is not None and (entry[1] is None or entry[1] == self._current_generation()):
+            with self._lock:
+                if raw in self._entries:
+                    self._entries.move_to_end(raw)
+                self.hits += 1
+            return self._check_expiry(entry[0])
+        with self._lock:
+            self.misses += 1
+        
+        # Read before verifying, so a key set swapped mid-verify marks the entry stale
+        generation = self.jwks.generation if self.jwks is not None else 0
+        agent_data = self._decode(raw)
+        # A kid missing now may be published shortly; let the next request look again
+        if agent_data.token_error == UNKNOWN_KEY:
+            return agent_data
+        if agent_data.token_claims is None and agent_data.token_error is None:
+            generation = None
+        with self._lock:
+            self._entries[raw] = (agent_data, generation)
+            self._entries.move_to_end(raw)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return agent_data
+
+    def _current_generation(self) -> int:
+        return self.jwks.current_generation() if self.jwks is not None else 0
+
+    def _check_expiry(self, agent_data: AgentData) -> AgentData:
+        # Verified claims are cached; their validity window is not
+        if agent_data.token_verified:
+            expires = agent_data.token_claims.get("exp")
+            if isinstance(expires, (int, float)) and time.time() > expires + self.leeway:
+                return agent_data._replace(token_verified=False, token_error="Signature has expired.")
+        return agent_data
+
+    def _decode(self, raw: str) -> AgentData:
+        try:
+            data = json.loads(base64.b64decode(raw).decode("utf-8"))
+        except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+            return AgentData(None, None, error=f"Invalid agent data: {e}")
+        if not isinstance(data, dict):
+            return AgentData(None, None, error="Agent data is not a JSON object")
+        
+        access_url = data.get("accessUrl")
+        agent_data = AgentData(data, access_url if isinstance(access_url, str) else None)
+        token = data.get("token")
+        if not token:
+            return agent_data
+        if not isinstance(token, str):
+            return agent_data._replace(token_error="Token is not a string")
+        
+        claims, error = self._verify_token(token)
+        return agent_data._replace(token_claims=claims, token_verified=claims is not None, token_error=error)
+
+    def _verify_token(self, token: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        if self.jwks is None:
+            return None, "No JWKS configured"
+        try:
+            key = self.jwks.get(jwt.get_unverified_header(token).get("kid"))
+            if key is None:
+                return None, UNKNOWN_KEY
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=TOKEN_ALGORITHMS,
+                audience=self.audience,
+                options={"verify_aud": self.audience is not None, "leeway": self.leeway},
+            )
+            return claims, None
+        except JWTError as e:
+            return None, str(e)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "jwks_url": self.jwks.url if self.jwks is not None else None,
+        }
+
+
+def create_agent_data_decoder() -> AgentDataDecoder:
+    """Build the decoder from AGENT_JWKS_URL / AGENT_JWKS_TTL / AGENT_JWT_AUDIENCE / AGENT_DATA_CACHE_SIZE."""
+    jwks_url = os.getenv("AGENT_JWKS_URL")
+    jwks = JWKSCache(jwks_url, ttl=float(os.getenv("AGENT_JWKS_TTL", "300"))) if jwks_url else None
+    return AgentDataDecoder(
+        jwks,
+        max_entries=int(os.getenv("AGENT_DATA_CACHE_SIZE", "1024")),
+        audience=os.getenv("AGENT_JWT_AUDIENCE") or None,
+    )
+
+
+# Global instance
+agent_data_decoder = create_agent_data_decoder()
@@ -0,0 +1,124 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import os
+import atexit
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
+
+from cryptography.hazmat.primitives.asymmetric import ed25519
+
+from app.security.signature_verification import (
+    VERIFICATION_ERROR, PendingSignature, SignatureVerifier, signature_verifier, verify_ed25519
+)
+
+logger = logging.getLogger(__name__)
+
+# A single TAP signature triple plus the request components it covers:
+# (signature_agent, signature_input, signature, request_data)
+SignatureItem = Tuple[str, str, str, Dict]
+
+# What a worker needs for one Ed25519 verify: (raw public key, Base58 signature, signature base)
+Ed25519Item = Tuple[bytes, str, bytes]
+
+# Upper bound on items accepted in one batch request
+MAX_BATCH_SIZE = 1000
+
+# Batches smaller than this are verified inline; the IPC round-trip to the
+# worker processes costs more than the Ed25519 verifies it would offload.
+INLINE_THRESHOLD = int(os.getenv("SIGNATURE_BATCH_INLINE_THRESHOLD", "32"))
+
+
+def _verify_chunk(items: List[Ed25519Item]) -> List[Tuple[bool, str]]:
+    """Ed25519-verify a chunk of items, normally inside a worker process.
+    
+    Workers only see key bytes, never their forked copy of the verifier:
+    key lookup, the result cache, replay protection and metrics all stay
+    in the parent, so registry updates after the fork are honoured.
+    """
+    results = []
+    for public_key, signature, signature_base in items:
+        try:
+            results.append(verify_ed25519(ed25519.Ed25519PublicKey.from_public_bytes(public_key), signature, signature_base))
+        except Exception as e:
+            results.append((False, f"{VERIFICATION_ERROR}: {str(e)}"))
+    return results
+
+
+class BatchSignatureVerifier:
+    """Verifies many TAP signatures at once, spreading the work across CPU cores."""
+
+    def __init__(self, verifier: SignatureVerifier, max_workers: Optional[int] = None):
+        self.verifier = verifier
+        self.max_workers = max_workers or int(os.getenv("SIGNATURE_BATCH_WORKERS", "0")) or os.cpu_count() or 1
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Lazily start the worker pool so single-call deployments never pay for it."""
+        if self._executor is None:
+            logger.info(f"Starting signature verification pool with {self.max_workers} workers")
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def verify(self, items: List[SignatureItem]) -> List[Tuple[bool, str]]:
+        """Verify every item and return (is_trusted, message) pairs in input order."""
+        verifier = self.verifier
+        prepared: List[Union[PendingSignature, Tuple[bool, str, str], None]] = []
+        for agent, sig_input, sig, request_data in items:
+            parsed = verifier.parse_signature_headers(agent, sig_input, sig)
+            prepared.append(verifier.prepare(parsed, request_data) if parsed else None)
+
+        pending = [item for item in prepared if isinstance(item, PendingSignature) and item.cached is None]
+        verified = iter(self._verify_ed25519([
+            (item.public_key.public_bytes_raw(), item.signature, item.signature_base) for item in pending
+        ]))
+
+        # Settle in input order, so a nonce repeated within a batch is caught too
+        outcomes = []
+        for item in prepared:
+            if item is None:
+                outcomes.append((False, "Invalid signature format"))
+                continue
+            if isinstance(item, PendingSignature):
+                item = verifier.complete(item, item.cached if item.cached is not None else next(verified))
+            outcomes.append(verifier.outcome(item))
+        return outcomes
+
+    def _verify_ed25519(self, items: List[Ed25519Item]) -> List[Tuple[bool, str]]:
+        """Run the Ed25519 verifies, across the worker pool when the batch is big enough."""
+        if self.max_workers <= 1 or len(items) < INLINE_THRESHOLD:
+            return _verify_chunk(items)
+
+        # One contiguous chunk per worker keeps IPC overhead to a handful of
+        # messages while preserving input order when results are concatenated.
+        chunk_size = -(-len(items) // self.max_workers)
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+        try:
+            results: List[Tuple[bool, str]] = []
+            for chunk_result in self._get_executor().map(_verify_chunk, chunks):
+                results.extend(chunk_result)
+            return results
+        except Exception as e:
+            # A broken pool (e.g. a worker killed by the OOM killer) must not
+            # take verification down with it
+            logger.error(f"Batch verification pool failed, falling back to inline: {e}")
+            self.shutdown()
+            return _verify_chunk(items)
+
+    def shutdown(self):
+        """Stop the worker pool if it was started."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Global instance
+batch_signature_verifier = BatchSignatureVerifier(signature_verifier)
+atexit.register(batch_signature_verifier.shutdown)
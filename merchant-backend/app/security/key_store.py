@@ -0,0 +1,309 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Trusted-agent public keys fetched from the Agent Registry.
+
+Keys are indexed by keyid and held as decoded Ed25519PublicKey objects.
+Lookups never touch the network: a background thread preloads every active
+key from ``GET /agents``, fetches unknown keyids from ``GET /{key_id}``
+and refreshes each key before its TTL runs out. If the registry is
+unreachable the last known key keeps being served; a key is only dropped
+when the registry marks it inactive or the listing no longer has it.
+"""
+
+import os
+import time
+import logging
+import threading
+from urllib.parse import quote
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+import base58
+import requests
+from cryptography.hazmat.primitives.asymmetric import ed25519
+
+logger = logging.getLogger(__name__)
+
+
+class RegistryKey:
+    """A decoded agent key plus its refresh bookkeeping."""
+
+    __slots__ = ("key_id", "public_key", "agent_name", "agent_domain", "fetched_at", "refresh_at")
+
+    def __init__(self, key_id: str, public_key: ed25519.Ed25519PublicKey, agent_name: Optional[str],
+                 agent_domain: Optional[str], fetched_at: float, refresh_at: float):
+        self.key_id = key_id
+        self.public_key = public_key
+        self.agent_name = agent_name
+        self.agent_domain = agent_domain
+        self.fetched_at = fetched_at
+        self.refresh_at = refresh_at
+
+
+def decode_ed25519_public_key(public_key_base58: str) -> ed25519.Ed25519PublicKey:
+    """Decode a Base58 Ed25519 public key as stored by the Agent Registry."""
+    public_key_bytes = base58.b58decode(public_key_base58)
+    if len(public_key_bytes) != 32:
+        raise ValueError(f"Ed25519 public key must be 32 bytes, got {len(public_key_bytes)}")
+    return ed25519.Ed25519PublicKey.from_public_bytes(public_key_bytes)
+
+
+class AgentKeyStore:
+    """In-memory keyid -> RegistryKey map kept fresh by a background thread."""
+
+    def __init__(self, registry_url: str, ttl: float = 300.0, refresh_ahead: float = 0.2,
+                 miss_ttl: float = 30.0, retry_interval: float = 5.0, timeout: float = 2.0,
+                 key_path: str = "/{key_id}"):
+        self.registry_url = registry_url.rstrip("/")
+        # Single-key lookup route, relative to registry_url
+        self.key_path = key_path
+        self.ttl = ttl
+        # Keys are refreshed once this fraction of their TTL is left
+        self.refresh_ahead = refresh_ahead
+        # Unknown keyids are not asked for again until this many seconds have passed
+        self.miss_ttl = miss_ttl
+        self.retry_interval = retry_interval
+        self.timeout = timeout
+        # Bounds the registry lookups a flood of made-up keyids can trigger
+        self.max_pending = 256
+
+        self._keys: Dict[str, RegistryKey] = {}
+        self._misses: Dict[str, float] = {}
+        self._pending: Set[str] = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._available = True
+        self._listeners: List[Callable[[str], None]] = []
+        self._session = requests.Session()
+
+    # ------------------------------------------------------------------
+    # Hot path
+    # ------------------------------------------------------------------
+
+    def get(self, key_id: str) -> Optional[RegistryKey]:
+        """Return the key for key_id without blocking. Unknown or stale keys are queued for refresh."""
+        self._ensure_started()
+        key = self._keys.get(key_id)
+        now = time.time()
+        if key is None:
+            if now >= self._misses.get(key_id, 0.0):
+                self._request(key_id)
+            return None
+        if now >= key.refresh_at:
+            self._request(key_id)
+        return key
+
+    def keys(self) -> List[RegistryKey]:
+        return list(self._keys.values())
+
+    def on_remove(self, listener: Callable[[str], None]):
+        """Register a callback invoked with the keyid whenever a key is removed or replaced."""
+        self._listeners.append(listener)
+
+    # ------------------------------------------------------------------
+    # Background refresh
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Start the refresh thread and preload all active keys. Safe to call repeatedly."""
+        self._ensure_started()
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+
+    def _running(self) -> bool:
+        # Worker processes forked from the app inherit the map but not the thread
+        return self._pid == os.getpid() and self._thread is not None and self._thread.is_alive()
+
+    def _ensure_started(self):
+        if self._running() or self._stopped.is_set():
+            return
+        with self._lock:
+            if self._running():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="agent-key-refresh", daemon=True)
+            self._thread.start()
+
+    def _request(self, key_id: str):
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                return
+            self._pending.add(key_id)
+        self._wakeup.set()
+
+    def _run(self):
+        loaded = False
+        while not self._stopped.is_set():
+            try:
+                loaded = self._refresh_due(loaded)
+            except Exception:
+                # A bad registry response must not end the thread, or keys stop refreshing for good
+                logger.exception("Agent key refresh failed")
+            self._wakeup.wait(timeout=self._next_refresh_in() if loaded else self.retry_interval)
+            self._wakeup.clear()
+
+    def _refresh_due(self, loaded: bool) -> bool:
+        """One pass of the refresh loop; returns whether the listing has been loaded yet."""
+        now = time.time()
+        self._misses = {k: until for k, until in self._misses.items() if until > now}
+        with self._lock:
+            pending, self._pending = self._pending, set()
+
+        # Known keys are refreshed together from the listing, one request per TTL
+        if not loaded or any(now >= key.refresh_at for key in self._keys.values()):
+            loaded = self.refresh_all() or loaded
+            if not loaded or not self._available:
+                for key in self._keys.values():
+                    key.refresh_at = max(key.refresh_at, now + self.retry_interval)
+
+        # Keyids seen on the hot path that the listing did not have
+        for key_id in pending:
+            if key_id not in self._keys and self._available:
+                self.refresh(key_id)
+        return loaded
+
+    def _set_available(self, available: bool, reason: str = ""):
+        """Log registry outages once, not once per key."""
+        if available and not self._available:
+            logger.info(f"Agent registry at {self.registry_url} is reachable again")
+        elif not available and self._available:
+            logger.warning(f"Agent registry unavailable, serving {len(self._keys)} cached keys: {reason}")
+        self._available = available
+
+    def _next_refresh_in(self) -> float:
+        keys = list(self._keys.values())
+        if not keys:
+            return self.ttl
+        return max(0.05, min(key.refresh_at for key in keys) - time.time())
+
+    def _store(self, key_id: str, public_key_base58: str, agent_name: Optional[str],
+               agent_domain: Optional[str]):
+        now = time.time()
+        public_key = decode_ed25519_public_key(public_key_base58)
+        previous = self._keys.get(key_id)
+        self._keys[key_id] = RegistryKey(
+            key_id, public_key, agent_name, agent_domain,
+            now, now + self.ttl * (1.0 - self.refresh_ahead),
+        )
+        self._misses.pop(key_id, None)
+        if previous is not None and previous.public_key.public_bytes_raw() != public_key.public_bytes_raw():
+            logger.info(f"Agent key '{key_id}' rotated in registry")
+            self._notify_removed(key_id)
+
+    def _remove(self, key_id: str):
+        self._misses[key_id] = time.time() + self.miss_ttl
+        if self._keys.pop(key_id, None) is not None:
+            logger.info(f"Agent key '{key_id}' removed from registry")
+            self._notify_removed(key_id)
+
+    def _notify_removed(self, key_id: str):
+        for listener in self._listeners:
+            listener(key_id)
+
+    def _retry_later(self, key_id: str):
+        key = self._keys.get(key_id)
+        if key is not None:
+            # Keep serving the stale key, ask again shortly
+            key.refresh_at = time.time() + self.retry_interval
+        else:
+            self._misses[key_id] = time.time() + self.retry_interval
+
+    def refresh(self, key_id: str) -> bool:
+        """Fetch one key from GET {key_path}. Returns False if the registry could not be reached."""
+        try:
+            # The keyid comes from the request: quoted, it cannot reach another registry route
+            url = self.registry_url + self.key_path.format(key_id=quote(key_id, safe=""))
+            response = self._session.get(url, timeout=self.timeout)
+        except requests.RequestException as e:
+            self._set_available(False, str(e))
+            self._retry_later(key_id)
+            return False
+
+        self._set_available(True)
+        if response.status_code == 404:
+            if key_id not in self._keys:
+                self._misses[key_id] = time.time() + self.miss_ttl
+                return True
+            # A misconfigured key_path answers 404 too: only the listing may revoke a known key
+            if not self.refresh_all():
+                self._retry_later(key_id)
+                return False
+            return True
+        if response.status_code != 200:
+            logger.warning(f"Agent registry returned {response.status_code} for key '{key_id}'")
+            self._retry_later(key_id)
+            return False
+
+        try:
+            data = response.json()
+            if not isinstance(data, dict):
+                raise ValueError(f"expected an object, got {type(data).__name__}")
+            if data.get("is_active") != "true" or str(data.get("algorithm", "ed25519")).lower() != "ed25519":
+                self._remove(key_id)
+                return True
+            self._store(key_id, data["public_key"], data.get("agent_name"), data.get("agent_domain"))
+            return True
+        except (ValueError, KeyError) as e:
+            logger.error(f"Invalid key data from agent registry for '{key_id}': {e}")
+            self._retry_later(key_id)
+            return False
+
+    def refresh_all(self) -> bool:
+        """Load every active key from GET /agents. Returns False if the registry could not be reached."""
+        try:
+            response = self._session.get(f"{self.registry_url}/agents", timeout=self.timeout)
+            response.raise_for_status()
+            agents = response.json()
+            if not isinstance(agents, list) or not all(isinstance(agent, dict) for agent in agents):
+                raise ValueError("expected a list of agents")
+        except (requests.RequestException, ValueError) as e:
+            self._set_available(False, str(e))
+            return False
+
+        self._set_available(True)
+        seen = set()
+        for agent in agents:
+            if agent.get("is_active") != "true":
+                continue
+            for key in agent.get("keys", []):
+                if key.get("is_active") != "true" or str(key.get("algorithm", "ed25519")).lower() != "ed25519":
+                    continue
+                try:
+                    self._store(key["key_id"], key["public_key"], agent.get("name"), agent.get("domain"))
+                    seen.add(key["key_id"])
+                except (ValueError, KeyError) as e:
+                    logger.error(f"Skipping invalid key for agent '{agent.get('name')}': {e}")
+
+        for key_id in set(self._keys) - seen:
+            self._remove(key_id)
+
+        logger.debug(f"Loaded {len(seen)} agent keys from {self.registry_url}")
+        return True
+
+    def load(self, keys: Iterable[Dict]):
+        """Seed the store directly, e.g. from configuration, using the registry single-key response fields."""
+        for key in keys:
+            self._store(key["key_id"], key["public_key"], key.get("agent_name"), key.get("agent_domain"))
+
+
+def create_key_store() -> Optional[AgentKeyStore]:
+    """Build the registry-backed key store when AGENT_REGISTRY_URL is configured."""
+    registry_url = os.getenv("AGENT_REGISTRY_URL")
+    if not registry_url:
+        return None
+    return AgentKeyStore(
+        registry_url,
+        ttl=float(os.getenv("AGENT_KEY_TTL", "300")),
+        key_path=os.getenv("AGENT_REGISTRY_KEY_PATH", "/{key_id}"),
+    )
@@ -0,0 +1,137 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Replay protection for TAP signatures.
+
+A nonce only has to be remembered until the signature carrying it expires,
+so nonces are filed into fixed-width time buckets by their ``expires``
+timestamp and a whole bucket is dropped once that time has passed. Memory
+therefore scales with request rate times validity window, not with total
+traffic. Nonces are scoped per signing key (the hex of its raw public
+key bytes, never the unsigned keyid parameter).
+
+``NonceStore`` keeps buckets in process memory. ``SQLiteNonceStore`` keeps
+them in a shared SQLite file so every uvicorn worker sees the same nonces.
+"""
+
+import os
+import time
+import sqlite3
+import threading
+from typing import Callable, Dict, Optional, Set, Tuple, Union
+
+# Width of one time bucket in seconds
+DEFAULT_BUCKET_SECONDS = 10
+
+
+class NonceStore:
+    """In-memory nonce store with time-bucketed expiry."""
+
+    def __init__(self, bucket_seconds: int = DEFAULT_BUCKET_SECONDS,
+                 clock: Callable[[], float] = time.time):
+        self.bucket_seconds = bucket_seconds
+        self.clock = clock
+        self._buckets: Dict[int, Set[Tuple[str, str]]] = {}
+        self._oldest = 0
+        self._lock = threading.Lock()
+
+    def check_and_store(self, key: str, nonce: str, expires: int) -> bool:
+        """Record a nonce. Returns False if it was already used by the same key."""
+        bucket = expires // self.bucket_seconds
+        entry = (key, nonce)
+        with self._lock:
+            self._expire(int(self.clock()) // self.bucket_seconds)
+            nonces = self._buckets.get(bucket)
+            if nonces is None:
+                self._buckets[bucket] = {entry}
+                return True
+            if entry in nonces:
+                return False
+            nonces.add(entry)
+            return True
+
+    def _expire(self, current_bucket: int):
+        # Buckets older than the current one only hold expired signatures
+        if current_bucket <= self._oldest:
+            return
+        for bucket in [b for b in self._buckets if b < current_bucket]:
+            del self._buckets[bucket]
+        self._oldest = current_bucket
+
+    def __len__(self) -> int:
+        return sum(len(nonces) for nonces in self._buckets.values())
+
+    def bucket_count(self) -> int:
+        return len(self._buckets)
+
+
+class SQLiteNonceStore:
+    """Nonce store shared by all worker processes through one SQLite file."""
+
+    def __init__(self, path: str, bucket_seconds: int = DEFAULT_BUCKET_SECONDS,
+                 clock: Callable[[], float] = time.time):
+        self.path = path
+        self.bucket_seconds = bucket_seconds
+        self.clock = clock
+        self._local = threading.local()
+        self._oldest = 0
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS tap_key_nonces ("
+            " bucket INTEGER NOT NULL,"
+            " key TEXT NOT NULL,"
+            " nonce TEXT NOT NULL,"
+            " PRIMARY KEY (bucket, key, nonce)"
+            ") WITHOUT ROWID"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections are per thread; the sync routes run on a threadpool
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def check_and_store(self, key: str, nonce: str, expires: int) -> bool:
+        """Record a nonce. Returns False if any worker already saw it for the same key."""
+        conn = self._connection()
+        current_bucket = int(self.clock()) // self.bucket_seconds
+        if current_bucket > self._oldest:
+            # Dropping a bucket is a range delete on the primary key prefix
+            conn.execute("DELETE FROM tap_key_nonces WHERE bucket < ?", (current_bucket,))
+            self._oldest = current_bucket
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO tap_key_nonces (bucket, key, nonce) VALUES (?, ?, ?)",
+            (expires // self.bucket_seconds, key, nonce),
+        )
+        return cursor.rowcount == 1
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM tap_key_nonces").fetchone()[0]
+
+    def bucket_count(self) -> int:
+        return self._connection().execute("SELECT COUNT(DISTINCT bucket) FROM tap_key_nonces").fetchone()[0]
+
+
+ReplayStore = Union[NonceStore, SQLiteNonceStore]
+
+
+def create_nonce_store() -> Optional[ReplayStore]:
+    """Build the nonce store selected by NONCE_STORE (memory, sqlite or none)."""
+    backend = os.getenv("NONCE_STORE", "memory").lower()
+    bucket_seconds = int(os.getenv("NONCE_BUCKET_SECONDS", str(DEFAULT_BUCKET_SECONDS)))
+    if backend == "none":
+        return None
+    if backend == "sqlite":
+        return SQLiteNonceStore(os.getenv("NONCE_STORE_PATH", "./nonces.db"), bucket_seconds)
+    return NonceStore(bucket_seconds)
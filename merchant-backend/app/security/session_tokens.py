@@ -0,0 +1,252 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+HMAC-signed TAP session tokens.
+
+Once an agent's RFC 9421 signature has been verified, the backend can hand
+out a short-lived session token bound to the agent URL, keyid, authority
+and tag. Presenting the token (``X-TAP-Session`` header) is then checked
+with one HMAC-SHA256 and a constant-time compare instead of a Base58
+decode and Ed25519 verify.
+
+Token layout: ``v1.<base64url claims JSON>.<base64url HMAC-SHA256>``. The
+claims are only parsed after the MAC matches.
+
+Tokens can be revoked one at a time (by token id) or all at once for a
+keyid, e.g. when the key is rotated out of the Agent Registry. Revocations
+are forgotten once the revoked tokens would have expired anyway. With
+several uvicorn workers set SESSION_TOKEN_SECRET so every worker accepts
+the same tokens; revocations then go to ``SQLiteRevocationList``, a SQLite
+file every worker reads, as the nonce store does (nonce_store.py).
+``RevocationList`` keeps them in process memory, which is enough when each
+process signs with its own random secret.
+"""
+
+import os
+import hmac
+import json
+import time
+import base64
+import hashlib
+import secrets
+import sqlite3
+import threading
+from typing import Callable, Dict, NamedTuple, Optional, Tuple, Union
+
+TOKEN_VERSION = "v1"
+
+
+class SessionClaims(NamedTuple):
+    """What a session token vouches for."""
+    agent_url: str
+    keyid: str
+    authority: str
+    tag: str
+    issued_at: int
+    expires: int
+    token_id: str
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+class RevocationList:
+    """Revoked token ids and keyids in process memory."""
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        # token id -> expires, for tokens revoked before they ran out
+        self._tokens: Dict[str, int] = {}
+        # keyid -> (time of revocation, when it can be forgotten); tokens issued at or before it are refused
+        self._keys: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    def revoke_token(self, token_id: str, expires: int):
+        with self._lock:
+            self._prune()
+            self._tokens[token_id] = expires
+
+    def revoke_key(self, keyid: str, revoked_at: int, until: int):
+        with self._lock:
+            self._prune()
+            self._keys[keyid] = (revoked_at, until)
+
+    def is_revoked(self, token_id: str, keyid: str, issued_at: int) -> bool:
+        if token_id in self._tokens:
+            return True
+        revoked = self._keys.get(keyid)
+        return revoked is not None and issued_at <= revoked[0]
+
+    def _prune(self):
+        # Revocations only need to outlive the tokens they cover
+        now = int(self.clock())
+        for token_id in [token_id for token_id, expires in self._tokens.items() if expires < now]:
+            del self._tokens[token_id]
+        for keyid in [keyid for keyid, (_, until) in self._keys.items() if until < now]:
+            del self._keys[keyid]
+
+    def counts(self) -> Tuple[int, int]:
+        return len(self._tokens), len(self._keys)
+
+
+class SQLiteRevocationList:
+    """Revoked token ids and keyids shared by all worker processes through one SQLite file."""
+
+    def __init__(self, path: str, clock: Callable[[], float] = time.time):
+        self.path = path
+        self.clock = clock
+        self._local = threading.local()
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS tap_session_revocations ("
+            " kind TEXT NOT NULL,"
+            " id TEXT NOT NULL,"
+            " revoked_at INTEGER NOT NULL,"
+            " until INTEGER NOT NULL,"
+            " PRIMARY KEY (kind, id)"
+            ") WITHOUT ROWID"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections are per thread; the sync routes run on a threadpool
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _revoke(self, kind: str, name: str, revoked_at: int, until: int):
+        conn = self._connection()
+        # Revocations only need to outlive the tokens they cover
+        conn.execute("DELETE FROM tap_session_revocations WHERE until < ?", (int(self.clock()),))
+        conn.execute(
+            "INSERT OR REPLACE INTO tap_session_revocations (kind, id, revoked_at, until) VALUES (?, ?, ?, ?)",
+            (kind, name, revoked_at, until),
+        )
+
+    def revoke_token(self, token_id: str, expires: int):
+        self._revoke("token", token_id, int(self.clock()), expires)
+
+    def revoke_key(self, keyid: str, revoked_at: int, until: int):
+        self._revoke("key", keyid, revoked_at, until)
+
+    def is_revoked(self, token_id: str, keyid: str, issued_at: int) -> bool:
+        # One primary-key probe per kind
+        return self._connection().execute(
+            "SELECT 1 FROM tap_session_revocations WHERE (kind = 'token' AND id = ?)"
+            " OR (kind = 'key' AND id = ? AND revoked_at >= ?) LIMIT 1",
+            (token_id, keyid, issued_at),
+        ).fetchone() is not None
+
+    def counts(self) -> Tuple[int, int]:
+        rows = dict(self._connection().execute(
+            "SELECT kind, COUNT(*) FROM tap_session_revocations WHERE until >= ? GROUP BY kind", (int(self.clock()),)
+        ).fetchall())
+        return rows.get("token", 0), rows.get("key", 0)
+
+
+Revocations = Union[RevocationList, SQLiteRevocationList]
+
+
+class SessionTokenIssuer:
+    """Issues and checks session tokens against a revocation list."""
+
+    def __init__(self, secret: bytes, ttl: int = 300, clock: Callable[[], float] = time.time,
+                 revocations: Optional[Revocations] = None):
+        if len(secret) < 32:
+            raise ValueError("Session token secret must be at least 32 bytes")
+        self.ttl = ttl
+        self.clock = clock
+        self._secret = secret
+        self.revocations = revocations if revocations is not None else RevocationList(clock)
+
+    def _mac(self, signed_part: bytes) -> bytes:
+        return hmac.new(self._secret, signed_part, hashlib.sha256).digest()
+
+    def issue(self, agent_url: str, keyid: str, authority: str, tag: str) -> Tuple[str, SessionClaims]:
+        """Create a token for an agent whose signature was just verified."""
+        now = int(self.clock())
+        claims = SessionClaims(agent_url, keyid, authority, tag, now, now + self.ttl,
+                               secrets.token_hex(8))
+        payload = json.dumps(list(claims), separators=(",", ":")).encode("utf-8")
+        signed_part = f"{TOKEN_VERSION}.{_b64encode(payload)}".encode("ascii")
+        return f"{signed_part.decode('ascii')}.{_b64encode(self._mac(signed_part))}", claims
+
+    def verify(self, token: str, authority: Optional[str]) -> Tuple[bool, str, Optional[SessionClaims]]:
+        """Check a token presented for a request to authority (None skips the authority binding)."""
+        version, _, rest = token.partition(".")
+        payload_b64, _, mac_b64 = rest.partition(".")
+        if version != TOKEN_VERSION or not payload_b64 or not mac_b64:
+            return False, "Invalid session token format", None
+        
+        try:
+            signed_part = f"{version}.{payload_b64}".encode("ascii")
+            mac = _b64decode(mac_b64)
+        except (UnicodeEncodeError, ValueError):
+            return False, "Invalid session token format", None
+        if not hmac.compare_digest(mac, self._mac(signed_part)):
+            return False, "Invalid session token signature", None
+        
+        try:
+            claims = SessionClaims(*json.loads(_b64decode(payload_b64)))
+        except (TypeError, ValueError):
+            return False, "Invalid session token claims", None
+        
+        if int(self.clock()) > claims.expires:
+            return False, "Session token expired", None
+        if authority is not None and claims.authority != authority:
+            return False, "Session token was issued for another authority", None
+        if self.revocations.is_revoked(claims.token_id, claims.keyid, claims.issued_at):
+            return False, "Session token revoked", None
+        
+        return True, "", claims
+
+    def revoke(self, claims: SessionClaims):
+        """Revoke one token until it would have expired."""
+        self.revocations.revoke_token(claims.token_id, claims.expires)
+
+    def revoke_key(self, keyid: str):
+        """Revoke every token issued so far for keyid."""
+        now = int(self.clock())
+        self.revocations.revoke_key(keyid, now, now + self.ttl)
+
+    def stats(self) -> Dict[str, int]:
+        revoked_tokens, revoked_keys = self.revocations.counts()
+        return {"ttl": self.ttl, "revoked_tokens": revoked_tokens, "revoked_keys": revoked_keys}
+
+
+def create_session_issuer() -> Optional[SessionTokenIssuer]:
+    """Build the issuer from SESSION_TOKEN_SECRET / SESSION_TOKEN_TTL (TTL 0 disables sessions).
+
+    SESSION_REVOCATION_STORE (memory or sqlite) picks the revocation list; it
+    defaults to sqlite, at SESSION_REVOCATION_PATH, when a shared secret is set.
+    """
+    ttl = int(os.getenv("SESSION_TOKEN_TTL", "300"))
+    if ttl <= 0:
+        return None
+    secret = os.getenv("SESSION_TOKEN_SECRET")
+    # Without a configured secret tokens are only valid in the process that issued them
+    backend = os.getenv("SESSION_REVOCATION_STORE", "sqlite" if secret else "memory").lower()
+    if backend == "sqlite":
+        revocations: Revocations = SQLiteRevocationList(os.getenv("SESSION_REVOCATION_PATH", "./sessions.db"))
+    else:
+        revocations = RevocationList()
+    return SessionTokenIssuer(secret.encode("utf-8") if secret else secrets.token_bytes(32), ttl,
+                              revocations=revocations)
+
+
+# Global instance
+session_issuer = create_session_issuer()
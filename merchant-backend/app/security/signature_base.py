@@ -0,0 +1,81 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Signature base construction from a registry of covered components.
+
+Each component identifier maps to a getter that pulls its value out of the
+request data dict. The getters for a given Signature-Input component list
+are resolved once and cached, so building a base is a single pass of getter
+calls and one join.
+
+Lines keep this backend's historical form, ``"<name>": "<value>"``,
+followed by the nonce, created and expires lines. Components without a
+registered getter are left out of the base, as before.
+"""
+
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Tuple
+
+ComponentGetter = Callable[[Dict[str, str]], str]
+
+_components: Dict[str, ComponentGetter] = {}
+
+
+def register_component(name: str, getter: ComponentGetter):
+    """Add or replace the getter for a covered component identifier."""
+    _components[name] = getter
+    _compile.cache_clear()
+
+
+def _field(key: str) -> ComponentGetter:
+    def getter(request_data: Dict[str, str]) -> str:
+        return request_data.get(key) or ""
+    return getter
+
+
+def _query(request_data: Dict[str, str]) -> str:
+    # RFC 9421 2.2.7: the query string including its leading "?", which alone stands for an empty query
+    query = request_data.get("query")
+    if query is None:
+        query = request_data.get("path", "").partition("?")[2]
+    return f"?{query}"
+
+
+def _target_uri(request_data: Dict[str, str]) -> str:
+    target_uri = request_data.get("target-uri")
+    if target_uri:
+        return target_uri
+    scheme = request_data.get("scheme") or "https"
+    return f"{scheme}://{request_data.get('authority', '')}{request_data.get('path', '')}"
+
+
+def _method(request_data: Dict[str, str]) -> str:
+    return (request_data.get("method") or "").upper()
+
+
+@lru_cache(maxsize=256)
+def _compile(names: Tuple[str, ...]) -> Tuple[Tuple[str, ComponentGetter], ...]:
+    return tuple((f'"{name}": "', _components[name]) for name in names if name in _components)
+
+
+for _name in ("@authority", "@path"):
+    register_component(_name, _field(_name[1:]))
+for _name in ("directory-agent", "query-param", "content-digest"):
+    register_component(_name, _field(_name))
+register_component("@method", _method)
+register_component("@query", _query)
+register_component("@target-uri", _target_uri)
+
+
+def build_signature_base(names: Iterable[str], request_data: Dict[str, str], nonce: str,
+                         created: int, expires: int) -> str:
+    """Signature base for the covered components, in the order they were signed."""
+    lines = [prefix + getter(request_data) + '"' for prefix, getter in _compile(tuple(names))]
+    lines.append(f'"nonce": "{nonce}"\n"created": {created}\n"expires": {expires}')
+    return "\n".join(lines)
@@ -6,105 +6,248 @@
 #
 # THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
-import re
+import os
 import time
 import json
-from typing import Dict, Optional, Tuple
+from time import perf_counter_ns
+from typing import Dict, NamedTuple, Optional, Tuple, Union
 from cryptography.hazmat.primitives.asymmetric import ed25519
 from cryptography.exceptions import InvalidSignature
 import base58
+from app.security.structured_fields import parse_signature_input, parse_signature
+from app.security.signature_base import build_signature_base
+from app.security.key_store import AgentKeyStore, create_key_store, decode_ed25519_public_key
+from app.security.nonce_store import ReplayStore, create_nonce_store
+from app.security.verification_cache import VerificationCache, create_verification_cache
+from app.security import verification_metrics as reasons
+from app.security.verification_metrics import VerificationMetrics, create_verification_metrics
 
 # Example Ed25519 public key in Base58 format (32 bytes encoded)
 # In production, replace with actual public key
 publicKeyBase58 = "4LhKd577EeQdSSrLfnq43RfxG4VofDe3HuwNuoR8szLt"
 
+INVALID_SIGNATURE = "Invalid Ed25519 signature"
+VERIFICATION_ERROR = "Verification error"
+
+class PendingSignature(NamedTuple):
+    """A signature that passed every check except the Ed25519 verify and the replay check."""
+    public_key: ed25519.Ed25519PublicKey
+    agent_name: str
+    signature: str
+    signature_base: bytes
+    nonce: str
+    expires: int
+    # Result-cache key and the cached (is_valid, message), when a result cache is configured
+    cache_key: Optional[tuple]
+    cached: Optional[Tuple[bool, str]]
+
+
+def verify_ed25519(public_key: ed25519.Ed25519PublicKey, signature: str, signature_base: bytes,
+                   metrics: Optional[VerificationMetrics] = None) -> Tuple[bool, str]:
+    """Check a Base58 Ed25519 signature over the signature base.
+    
+    Depends on nothing but its arguments, so batch workers can run it.
+    """
+    started = perf_counter_ns() if metrics is not None else 0
+    
+    # Decode Base58 signature to bytes
+    signature_bytes = base58.b58decode(signature)
+    if metrics is not None:
+        started = metrics.stage("decode", started)
+    
+    # Ed25519 signatures should be exactly 64 bytes
+    if len(signature_bytes) != 64:
+        return False, f"Ed25519 signature must be 64 bytes, got {len(signature_bytes)}"
+    
+    try:
+        # Ed25519 verification (no hashing needed, pure signature)
+        public_key.verify(signature_bytes, signature_base)
+        return True, ""
+    except InvalidSignature:
+        return False, INVALID_SIGNATURE
+    finally:
+        if metrics is not None:
+            metrics.stage("verify", started)
+
 class SignatureVerifier:
-    def __init__(self):
-        # In production, these would be loaded from secure storage/config
+    def __init__(self, key_store: Optional[AgentKeyStore] = None, nonce_store: Optional[ReplayStore] = None,
+                 result_cache: Optional[VerificationCache] = None, metrics: Optional[VerificationMetrics] = None):
+        # Keys published in the Agent Registry, looked up by keyid (None when no registry is configured)
+        self.key_store = key_store
+        # Nonces seen within their signature's validity window (None disables replay protection)
+        self.nonce_store = nonce_store
+        self.max_validity = int(os.getenv("SIGNATURE_MAX_VALIDITY", "3600"))
+        # Outcomes of recent Ed25519 verifies, reused when an agent retries the same signed request
+        self.result_cache = result_cache
+        if key_store is not None and result_cache is not None:
+            key_store.on_remove(result_cache.invalidate_key)
+        # Stage timings and outcome reasons (None when metrics are switched off)
+        self.metrics = metrics
+        
+        # Static fallback for agents that are not in the registry
+        default_key = self._load_public_key(publicKeyBase58)
         self.trusted_agents = {
             "https://directory.example.com": {
-                "public_key": self._load_public_key("example"),
+                "public_key": default_key,
                 "name": "Example Directory"
             },
             "https://payment.sample.org": {
-                "public_key": self._load_public_key("sample"),
+                "public_key": default_key,
                 "name": "Sample Payment Directory"
             }
         }
     
-    def _load_public_key(self, agent_name: str):
+    def _load_public_key(self, public_key_base58: str):
         """Load Ed25519 public key from Base58 string. In production, load from secure storage."""
+        return decode_ed25519_public_key(public_key_base58)
+    
+    def _resolve_key(self, agent_url: str, keyid: str) -> Optional[Tuple[ed25519.Ed25519PublicKey, str]]:
+        """Find the public key and agent name for a signature, preferring the registry."""
+        if self.key_store is not None:
+            registry_key = self.key_store.get(keyid)
+            # A registry key only vouches for the agent domain it was registered under
+            if registry_key is not None and self._same_agent(registry_key.agent_domain, agent_url):
+                return registry_key.public_key, registry_key.agent_name or agent_url
         
-        if agent_name == "example":
-            # Decode Base58 to get 32-byte Ed25519 public key
-            public_key_bytes = base58.b58decode(publicKeyBase58)
-            if len(public_key_bytes) != 32:
-                raise ValueError(f"Ed25519 public key must be 32 bytes, got {len(public_key_bytes)}")
-            return ed25519.Ed25519PublicKey.from_public_bytes(public_key_bytes)
-        elif agent_name == "sample":
-            # Replace with actual sample public key in production
-            public_key_bytes = base58.b58decode(publicKeyBase58)
-            if len(public_key_bytes) != 32:
-                raise ValueError(f"Ed25519 public key must be 32 bytes, got {len(public_key_bytes)}")
-            return ed25519.Ed25519PublicKey.from_public_bytes(public_key_bytes)
-        else:
-            raise ValueError(f"Unknown agent name: {agent_name}")
-
+        agent = self.trusted_agents.get(agent_url)
+        if agent is not None:
+            return agent["public_key"], agent["name"]
+        return None
+    
+    @staticmethod
+    def _same_agent(registered_domain: Optional[str], agent_url: str) -> bool:
+        return not registered_domain or registered_domain.rstrip("/") == agent_url.rstrip("/")
     
+    def agent_name(self, signature_agent: str) -> Optional[str]:
+        """Display name of the agent behind a Signature-Agent value"""
+        agent_url = signature_agent.strip('"')
+        if self.key_store is not None:
+            for registry_key in self.key_store.keys():
+                if registry_key.agent_domain and self._same_agent(registry_key.agent_domain, agent_url):
+                    return registry_key.agent_name
+        for trusted_url, agent_info in self.trusted_agents.items():
+            if trusted_url in signature_agent:
+                return agent_info["name"]
+        return None
+
     def parse_signature_headers(self, signature_agent: str, signature_input: str, signature: str) -> Optional[Dict]:
         """Parse the signature headers and extract components."""
+        metrics = self.metrics
+        started = perf_counter_ns() if metrics is not None else 0
+        parsed = self._parse_signature_headers(signature_agent, signature_input, signature)
+        if metrics is not None:
+            metrics.stage("parse", started)
+            if parsed is None:
+                metrics.outcome(reasons.MALFORMED)
+        return parsed
+    
+    def _parse_signature_headers(self, signature_agent: str, signature_input: str, signature: str) -> Optional[Dict]:
         try:
             # Parse Signature-Agent
             agent_url = signature_agent.strip('"')
             
-            # Parse Signature-Input (Ed25519 only)
-            signature_input_pattern = r'sig1=\("([^"]+)"\);\s*nonce="([^"]+)";\s*created=(\d+);\s*expires=(\d+);\s*keyid="([^"]+)";\s*tag="([^"]+)"'
-            match = re.match(signature_input_pattern, signature_input.strip())
-            
-            if not match:
-                return None
-            
-            signature_params, nonce, created, expires, keyid, tag = match.groups()
-            
-            # Parse Signature (Base58 format)
-            signature_pattern = r'sig1=:([^:]+):'
-            sig_match = re.match(signature_pattern, signature.strip())
+            # Parse Signature-Input and Signature as RFC 8941 dictionaries (cached by raw value)
+            signature_inputs = parse_signature_input(signature_input)
+            signatures = parse_signature(signature)
             
-            if not sig_match:
+            if not signature_inputs or not signatures:
                 return None
             
-            signature_value = sig_match.group(1)
+            # Use the first label present in both headers that carries every TAP parameter
+            signature_values = dict(signatures)
+            for sig_input in signature_inputs:
+                signature_value = signature_values.get(sig_input.label)
+                if signature_value is None:
+                    continue
+                
+                params = sig_input.parameters
+                nonce = params.get("nonce")
+                created = params.get("created")
+                expires = params.get("expires")
+                keyid = params.get("keyid")
+                tag = params.get("tag")
+                
+                if not isinstance(nonce, str) or not isinstance(keyid, str) or not isinstance(tag, str):
+                    continue
+                if type(created) is not int or type(expires) is not int:
+                    continue
+                
+                return {
+                    "agent_url": agent_url,
+                    "label": sig_input.label,
+                    # Older agents send every component in one string: ("@authority @path")
+                    "signature_params": [name for component in sig_input.components for name in component.split()],
+                    "nonce": nonce,
+                    "created": created,
+                    "expires": expires,
+                    "keyid": keyid,
+                    "tag": tag,
+                    "alg": params.get("alg"),
+                    "signature": signature_value
+                }
             
-            return {
-                "agent_url": agent_url,
-                "signature_params": signature_params.split(" "),
-                "nonce": nonce,
-                "created": int(created),
-                "expires": int(expires),
-                "keyid": keyid,
-                "tag": tag,
-                "signature": signature_value
-            }
+            return None
         except Exception as e:
             print(f"Error parsing signature headers: {e}")
             return None
     
-    def verify_signature(self, parsed_data: Dict, request_data: Dict) -> Tuple[bool, str]:
-        """Verify the Ed25519 signature against the request data."""
+    def verify_signature(self, parsed_data: Dict, request_data: Dict, record_nonce: bool = True) -> Tuple[bool, str]:
+        """Verify the Ed25519 signature against the request data.
+        
+        With record_nonce=False the replay check is left to the caller (see record_nonce()).
+        """
+        return self.outcome(self._verify_signature(parsed_data, request_data, record_nonce))
+    
+    def outcome(self, result: Tuple[bool, str, str]) -> Tuple[bool, str]:
+        """Count an (is_valid, message, reason) result and drop the reason."""
+        is_valid, message, reason = result
+        if self.metrics is not None:
+            self.metrics.outcome(reason)
+        return is_valid, message
+    
+    def _verify_signature(self, parsed_data: Dict, request_data: Dict, record_nonce: bool) -> Tuple[bool, str, str]:
+        pending = self.prepare(parsed_data, request_data)
+        if not isinstance(pending, PendingSignature):
+            return pending
+        
+        result = pending.cached
+        if result is None:
+            try:
+                result = self._verify_ed25519(pending.public_key, pending.signature, pending.signature_base)
+            except Exception as e:
+                return False, f"{VERIFICATION_ERROR}: {str(e)}", reasons.ERROR
+        return self.complete(pending, result, record_nonce)
+    
+    def prepare(self, parsed_data: Dict, request_data: Dict) -> Union[PendingSignature, Tuple[bool, str, str]]:
+        """Run every check that needs verifier state ahead of the Ed25519 verify.
+        
+        Returns the (is_valid, message, reason) result when the signature is
+        settled without a verify, otherwise a PendingSignature for complete().
+        """
+        metrics = self.metrics
+        started = perf_counter_ns() if metrics is not None else 0
         try:
             agent_url = parsed_data["agent_url"]
             
             # Check if agent is trusted
-            if agent_url not in self.trusted_agents:
-                return False, f"Unknown agent: {agent_url}"
+            resolved = self._resolve_key(agent_url, parsed_data["keyid"])
+            if metrics is not None:
+                started = metrics.stage("lookup", started)
+            if resolved is None:
+                return False, f"Unknown agent: {agent_url}", reasons.UNKNOWN_AGENT
+            public_key, agent_name = resolved
             
             # Check timestamp validity
             current_time = int(time.time())
             if current_time < parsed_data["created"]:
-                return False, "Signature created in the future"
+                return False, "Signature created in the future", reasons.FUTURE
             
             if current_time > parsed_data["expires"]:
-                return False, "Signature expired"
+                return False, "Signature expired", reasons.EXPIRED
+            
+            # Nonces are remembered until the signature expires, so the window bounds replay-store memory
+            if parsed_data["expires"] - parsed_data["created"] > self.max_validity:
+                return False, f"Signature validity window exceeds {self.max_validity}s", reasons.VALIDITY_WINDOW
             
             # Build signature string
             signature_string = self._build_signature_string(
@@ -114,53 +257,85 @@ class SignatureVerifier:
                 parsed_data["created"],
                 parsed_data["expires"]
             )
+            signature_base = signature_string.encode('utf-8')
+            if metrics is not None:
+                started = metrics.stage("base", started)
             
-            # Verify Ed25519 signature
-            public_key = self.trusted_agents[agent_url]["public_key"]
+            # Retried requests carry the same signature over the same base: reuse the outcome
+            cache_key = None
+            cached = None
+            if self.result_cache is not None:
+                cache_key = self.result_cache.key(
+                    parsed_data["keyid"], public_key.public_bytes_raw(), parsed_data["signature"], signature_base
+                )
+                cached = self.result_cache.get(cache_key)
+                if metrics is not None:
+                    metrics.stage("cache", started)
+            
+            return PendingSignature(
+                public_key, agent_name, parsed_data["signature"], signature_base,
+                parsed_data["nonce"], parsed_data["expires"], cache_key, cached
+            )
+                
+        except Exception as e:
+            return False, f"{VERIFICATION_ERROR}: {str(e)}", reasons.ERROR
+    
+    def complete(self, pending: PendingSignature, result: Tuple[bool, str], record_nonce: bool = True) -> Tuple[bool, str, str]:
+        """Settle a prepared signature given its Ed25519 (is_valid, message) result.
+        
+        Stores fresh valid results in the result cache and consumes their
+        nonce unless record_nonce is False.
+        """
+        metrics = self.metrics
+        try:
+            # Failures are not cached: their keyid and signature are attacker-chosen,
+            # so a flood of forgeries would otherwise evict real entries
+            if pending.cached is None and pending.cache_key is not None and result[0]:
+                self.result_cache.put(pending.cache_key, pending.expires, *result)
             
-            # Decode Base58 signature to bytes
-            signature_bytes = base58.b58decode(parsed_data["signature"])
+            is_valid, message = result
+            if not is_valid:
+                if message == INVALID_SIGNATURE:
+                    return False, message, reasons.INVALID_SIGNATURE
+                if message.startswith(VERIFICATION_ERROR):
+                    return False, message, reasons.ERROR
+                return False, message, reasons.BAD_LENGTH
             
-            # Ed25519 signatures should be exactly 64 bytes
-            if len(signature_bytes) != 64:
-                return False, f"Ed25519 signature must be 64 bytes, got {len(signature_bytes)}"
+            # Only a verified signature may consume its nonce
+            if record_nonce:
+                started = perf_counter_ns() if metrics is not None else 0
+                fresh = self.record_nonce(pending.public_key.public_bytes_raw(), pending.nonce, pending.expires)
+                if metrics is not None:
+                    metrics.stage("replay", started)
+                if not fresh:
+                    return False, "Replay detected: nonce already used", reasons.REPLAY
             
-            try:
-                # Ed25519 verification (no hashing needed, pure signature)
-                public_key.verify(
-                    signature_bytes,
-                    signature_string.encode('utf-8')
-                )
-                return True, f"Verified agent: {self.trusted_agents[agent_url]['name']}"
-            except InvalidSignature:
-                return False, "Invalid Ed25519 signature"
+            return True, f"Verified agent: {pending.agent_name}", reasons.VERIFIED
                 
         except Exception as e:
-            return False, f"Verification error: {str(e)}"
+            return False, f"{VERIFICATION_ERROR}: {str(e)}", reasons.ERROR
+    
+    def _verify_ed25519(self, public_key: ed25519.Ed25519PublicKey, signature: str, signature_base: bytes) -> Tuple[bool, str]:
+        """Check a Base58 Ed25519 signature over the signature base."""
+        return verify_ed25519(public_key, signature, signature_base, self.metrics)
     
     def _build_signature_string(self, params: list, request_data: Dict, nonce: str, created: int, expires: int) -> str:
         """Build the signature string from the parameters."""
-        signature_parts = []
-        
-        for param in params:
-            if param == "@authority":
-                signature_parts.append(f'"@authority": "{request_data.get("authority", "")}"')
-            elif param == "@path":
-                signature_parts.append(f'"@path": "{request_data.get("path", "")}"')
-            elif param == "directory-agent":
-                signature_parts.append(f'"directory-agent": "{request_data.get("directory-agent", "")}"')
-            elif param == "query-param":
-                signature_parts.append(f'"query-param": "{request_data.get("query-param", "")}"')
-        
-        signature_parts.extend([
-            f'"nonce": "{nonce}"',
-            f'"created": {created}',
-            f'"expires": {expires}'
-        ])
+        return build_signature_base(params, request_data, nonce, created, expires)
+    
+    def record_nonce(self, public_key: bytes, nonce: str, expires: int) -> bool:
+        """Remember a nonce until its signature expires. Returns False for a replay.
         
-        return "\n".join(signature_parts)
+        Nonces are scoped by the raw public key that verified the signature,
+        not by keyid: keyid is not covered by the signature, so a replay
+        could otherwise dodge the check by changing it.
+        """
+        if self.nonce_store is None:
+            return True
+        return self.nonce_store.check_and_store(public_key.hex(), nonce, expires)
     
-    def is_trusted_agent(self, signature_agent: str, signature_input: str, signature: str, request_data: Dict) -> Tuple[bool, str]:
+    def is_trusted_agent(self, signature_agent: str, signature_input: str, signature: str, request_data: Dict,
+                         record_nonce: bool = True) -> Tuple[bool, str]:
         """Main method to verify if the request is from a trusted agent."""
         # Parse headers
         parsed_data = self.parse_signature_headers(signature_agent, signature_input, signature)
@@ -169,7 +344,9 @@ class SignatureVerifier:
             return False, "Invalid signature format"
         
         # Verify signature
-        return self.verify_signature(parsed_data, request_data)
+        return self.verify_signature(parsed_data, request_data, record_nonce)
 
 # Global instance
-signature_verifier = SignatureVerifier()
\ No newline at end of file
+signature_verifier = SignatureVerifier(
+    create_key_store(), create_nonce_store(), create_verification_cache(), create_verification_metrics()
+)
\ No newline at end of file
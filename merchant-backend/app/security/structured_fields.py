@@ -0,0 +1,143 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+RFC 8941 structured-field parsing for the RFC 9421 Signature-Input and
+Signature headers.
+
+Only the subset HTTP message signatures use is implemented: dictionaries
+whose members are inner lists of component identifiers (Signature-Input)
+or byte sequences (Signature), each followed by parameters with string,
+token, integer, decimal, boolean or byte-sequence values. Parameters may
+come in any order. Keys are matched case-insensitively so agents sending
+``keyId`` are accepted alongside ``keyid``.
+"""
+
+import os
+import re
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional, Tuple, Union
+
+BareItem = Union[str, int, float, bool]
+
+# Parsed headers are cached by their raw value; agents retry with identical headers
+PARSE_CACHE_SIZE = int(os.getenv("SIGNATURE_PARSE_CACHE_SIZE", "4096"))
+
+# Each dictionary member is validated in one pass by a single regex. Components
+# and parameters are then split out of the already-validated spans with the
+# cheaper _COMPONENT/_PARAM patterns and typed by their first character.
+# Strings use the unrolled-loop form, which avoids per-character alternation.
+_KEY = r"[A-Za-z*][A-Za-z0-9_\-.*]*"
+_STRING_BODY = r'[^"\\\x00-\x1f\x7f]*(?:\\["\\][^"\\\x00-\x1f\x7f]*)*'
+_BARE_ITEM = (
+    rf'"{_STRING_BODY}"'                          # string
+    r"|-?[0-9]{1,15}(?:\.[0-9]{1,3})?"            # integer / decimal
+    r"|:[^:]*:"                                   # byte sequence
+    r"|\?[01]"                                    # boolean
+    r"|[A-Za-z*][A-Za-z0-9!#$%&'*+\-.^_`|~:/]*"   # token
+)
+# Whitespace around ';' is tolerated, several agents emit "; " separators
+_PARAMS = rf"(?: *; *{_KEY}(?:=(?:{_BARE_ITEM}))?)*"
+
+_SIGNATURE_INPUT_MEMBER = re.compile(
+    rf'(?P<label>{_KEY})=\((?P<components>(?: *"{_STRING_BODY}"{_PARAMS}(?= |\)))* *)\)(?P<params>{_PARAMS})'
+)
+_SIGNATURE_MEMBER = re.compile(rf"(?P<label>{_KEY})=:(?P<value>[^:]*):(?P<params>{_PARAMS})")
+_MEMBER_SEPARATOR = re.compile(r"[ \t]*,[ \t]*")
+_COMPONENT = re.compile(rf' *"({_STRING_BODY})"{_PARAMS}')
+_PARAM = re.compile(rf' *; *({_KEY})(?:=("{_STRING_BODY}"|[^; ]*))?')
+_STRING_ESCAPE = re.compile(r'\\(["\\])')
+
+
+class SignatureInput(NamedTuple):
+    """One labelled member of a Signature-Input header."""
+    label: str
+    components: Tuple[str, ...]
+    # Shared through the parse cache: treat as read-only
+    parameters: Dict[str, BareItem]
+    # Serialized inner list and parameters as sent, i.e. the value of @signature-params
+    raw: str
+
+
+def _unescape(value: str) -> str:
+    return _STRING_ESCAPE.sub(r"\1", value) if "\\" in value else value
+
+
+def _bare_item(value: str) -> BareItem:
+    """Type a validated bare item by its first character ('' is a bare boolean key)."""
+    first = value[:1]
+    if first == '"':
+        return _unescape(value[1:-1])
+    if not first:
+        return True
+    if first == "?":
+        return value == "?1"
+    if first == ":":
+        # Returned undecoded: TAP agents put Base58 here rather than RFC 8941 Base64
+        return value[1:-1]
+    if first == "-" or first.isdigit():
+        return float(value) if "." in value else int(value)
+    return value
+
+
+def _parse_dictionary(header: str, member: "re.Pattern", name: str) -> Dict[str, "re.Match"]:
+    text = header.strip()
+    members = {}
+    pos = 0
+    while True:
+        m = member.match(text, pos)
+        if m is None:
+            raise ValueError(f"Malformed {name} member at offset {pos}")
+        members[m.group("label").lower()] = m
+        pos = m.end()
+        if pos == len(text):
+            return members
+        separator = _MEMBER_SEPARATOR.match(text, pos)
+        if separator is None or separator.end() == len(text):
+            raise ValueError(f"Expected another {name} member at offset {pos}")
+        pos = separator.end()
+
+
+def parse_signature_input_strict(header: str) -> Dict[str, SignatureInput]:
+    """Parse a Signature-Input header, raising ValueError on malformed input."""
+    parsed = {}
+    for label, m in _parse_dictionary(header, _SIGNATURE_INPUT_MEMBER, "Signature-Input").items():
+        parsed[label] = SignatureInput(
+            label,
+            # Component-level parameters (e.g. ;sf, ;key) are accepted but not used
+            tuple(_unescape(c) for c in _COMPONENT.findall(m.group("components"))),
+            {key.lower(): _bare_item(value) for key, value in _PARAM.findall(m.group("params"))},
+            m.string[m.start("components") - 1:m.end()],
+        )
+    return parsed
+
+
+def parse_signature_strict(header: str) -> Dict[str, str]:
+    """Parse a Signature header into label -> undecoded signature value."""
+    return {
+        label: m.group("value")
+        for label, m in _parse_dictionary(header, _SIGNATURE_MEMBER, "Signature").items()
+    }
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_signature_input(header: str) -> Optional[Tuple[SignatureInput, ...]]:
+    """Cached Signature-Input parse. Returns None for malformed headers."""
+    try:
+        return tuple(parse_signature_input_strict(header).values())
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_signature(header: str) -> Optional[Tuple[Tuple[str, str], ...]]:
+    """Cached Signature parse. Returns None for malformed headers."""
+    try:
+        return tuple(parse_signature_strict(header).items())
+    except ValueError:
+        return None
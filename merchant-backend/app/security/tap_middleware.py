@@ -0,0 +1,248 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+In-process TAP signature verification as ASGI middleware.
+
+Reads Signature-Agent, Signature-Input and Signature straight off the
+request, verifies them with SignatureVerifier and stores the outcome on
+``request.state.tap``, so a CDN proxy in front of the backend is optional.
+Requests may instead carry an ``X-TAP-Session`` token issued by
+``POST /api/auth/session``, which is checked with an HMAC rather than an
+Ed25519 verify.
+
+Bodies of requests carrying Content-Digest are rejected with 400 if they do
+not match it. When the signature covers ``content-digest`` the body is read
+and checked before the route runs; otherwise it is hashed as it streams in.
+A signature covering ``content-digest`` is refused outright when that header
+has no usable digest.
+Route policies decide which signature tags a route accepts and whether a
+route needs a signature at all; a request that fails its route's policy
+is answered with 403 before it reaches the router. Browse routes only
+report failed signatures on ``request.state.tap`` unless
+TAP_BROWSE_ENFORCE=true; payment routes always reject them.
+
+TAP_VERIFICATION_MODE=proxy turns the middleware into a pass-through for
+deployments where the CDN proxy still verifies and forwards trusted headers.
+Use it whenever the proxy sits in front of the backend: it rewrites Host,
+so signatures over @authority cannot be re-verified here.
+"""
+
+import os
+import re
+import json
+import logging
+from typing import FrozenSet, Iterable, List, NamedTuple, Optional
+
+from app.security.signature_verification import SignatureVerifier, signature_verifier
+from app.security.session_tokens import SessionTokenIssuer, session_issuer
+from app.security.content_digest import (
+    ContentDigestVerifier, parse_content_digest, read_verified_body, verifying_receive
+)
+
+logger = logging.getLogger(__name__)
+
+BROWSE_TAGS = frozenset({"agent-browser-auth"})
+PAYMENT_TAGS = frozenset({"agent-payer-auth", "agent-payment-auth"})
+
+
+class TAPResult(NamedTuple):
+    """Outcome of verifying a request's TAP signature headers."""
+    present: bool
+    verified: bool
+    message: str
+    agent_url: Optional[str] = None
+    agent_name: Optional[str] = None
+    keyid: Optional[str] = None
+    tag: Optional[str] = None
+    # Verified from an X-TAP-Session token rather than a request signature
+    session: bool = False
+    # The signature covers content-digest, so the body is checked before dispatch
+    covers_digest: bool = False
+
+
+UNSIGNED = TAPResult(present=False, verified=False, message="No signature headers")
+
+
+class RoutePolicy(NamedTuple):
+    """Signature requirements for requests whose method and path match."""
+    name: str
+    methods: FrozenSet[str]
+    path: "re.Pattern"
+    allowed_tags: FrozenSet[str]
+    # Unsigned requests (e.g. shoppers using the frontend) are let through unless this is set
+    require_signature: bool = False
+    # Reject signed requests that fail verification; off for routes that only report the result
+    reject_invalid: bool = True
+
+
+DEFAULT_POLICIES: List[RoutePolicy] = [
+    RoutePolicy("verification-report", frozenset({"GET"}), re.compile(r"^/api/auth/check-verification$"),
+                BROWSE_TAGS | PAYMENT_TAGS, reject_invalid=False),
+    RoutePolicy("payment", frozenset({"POST"}),
+                re.compile(r"^/api/cart/[^/]+/(checkout|finalize|fulfill|x402/checkout)$"), PAYMENT_TAGS),
+    # Report-only unless TAP_BROWSE_ENFORCE is set: behind the CDN proxy (changeOrigin) the Host
+    # header no longer matches the signed @authority, so enforcing would 403 every proxied request
+    RoutePolicy("browse", frozenset({"GET", "HEAD", "POST", "PUT", "DELETE", "PATCH"}), re.compile(r"^/"),
+                BROWSE_TAGS | PAYMENT_TAGS,
+                reject_invalid=os.getenv("TAP_BROWSE_ENFORCE", "false").lower() == "true"),
+]
+
+
+class TAPVerificationMiddleware:
+    """Pure ASGI middleware; avoids BaseHTTPMiddleware's per-request task and body wrapping."""
+
+    def __init__(self, app, verifier: SignatureVerifier = signature_verifier,
+                 policies: Optional[Iterable[RoutePolicy]] = None, mode: Optional[str] = None,
+                 sessions: Optional[SessionTokenIssuer] = session_issuer):
+        self.app = app
+        self.verifier = verifier
+        self.sessions = sessions
+        self.policies = list(policies if policies is not None else DEFAULT_POLICIES)
+        self.mode = (mode or os.getenv("TAP_VERIFICATION_MODE", "inprocess")).lower()
+
+    def policy_for(self, method: str, path: str) -> Optional[RoutePolicy]:
+        for policy in self.policies:
+            if method in policy.methods and policy.path.match(path):
+                return policy
+        return None
+
+    def verify(self, scope) -> TAPResult:
+        signature_agent = signature_input = signature = session_token = content_digest = forwarded_proto = None
+        authority = ""
+        extra = {}
+        for name, value in scope["headers"]:
+            if name == b"signature-input":
+                signature_input = value.decode("latin-1")
+            elif name == b"signature":
+                signature = value.decode("latin-1")
+            elif name == b"signature-agent":
+                signature_agent = value.decode("latin-1")
+            elif name == b"host":
+                authority = value.decode("latin-1")
+            elif name in (b"directory-agent", b"query-param"):
+                extra[name.decode("latin-1")] = value.decode("latin-1")
+            elif name == b"x-tap-session":
+                session_token = value.decode("latin-1")
+            elif name == b"content-digest":
+                content_digest = value.decode("latin-1")
+            elif name == b"x-forwarded-proto":
+                forwarded_proto = value.decode("latin-1").split(",", 1)[0].strip()
+
+        if not signature_input or not signature:
+            if session_token and self.sessions is not None:
+                return self.verify_session(session_token, authority)
+            return UNSIGNED
+
+        parsed = self.verifier.parse_signature_headers(signature_agent or "", signature_input, signature)
+        if parsed is None:
+            return TAPResult(present=True, verified=False, message="Invalid signature format")
+
+        covers_digest = "content-digest" in parsed["signature_params"]
+        if covers_digest and not parse_content_digest(content_digest or ""):
+            return TAPResult(present=True, verified=False, message="Signed Content-Digest is missing or unsupported",
+                             agent_url=parsed["agent_url"], keyid=parsed["keyid"], tag=parsed["tag"])
+
+        # @path covers the query string too, as the CDN proxy signs req.url
+        # (some servers leave the query string in raw_path, the ASGI spec keeps it out)
+        raw_path = scope.get("raw_path") or scope["path"].encode("utf-8")
+        path = raw_path.split(b"?", 1)[0].decode("latin-1")
+        query = scope.get("query_string", b"").decode("latin-1")
+        if query:
+            path = f"{path}?{query}"
+        request_data = {
+            "authority": authority,
+            "path": path,
+            "method": scope["method"],
+            "query": query,
+            # The scheme the client used, which a TLS-terminating proxy only passes on as X-Forwarded-Proto
+            "target-uri": f"{forwarded_proto or scope.get('scheme', 'http')}://{authority}{path}",
+            "content-digest": content_digest or "",
+            "directory-agent": extra.get("directory-agent", ""),
+            "query-param": extra.get("query-param", ""),
+        }
+
+        verified, message = self.verifier.verify_signature(parsed, request_data)
+        return TAPResult(
+            present=True,
+            verified=verified,
+            message=message,
+            agent_url=parsed["agent_url"],
+            agent_name=self.verifier.agent_name(parsed["agent_url"]) if verified else None,
+            keyid=parsed["keyid"],
+            tag=parsed["tag"],
+            covers_digest=covers_digest,
+        )
+
+    def verify_session(self, token: str, authority: str) -> TAPResult:
+        verified, message, claims = self.sessions.verify(token, authority)
+        if not verified:
+            return TAPResult(present=True, verified=False, message=message, session=True)
+        agent_name = self.verifier.agent_name(claims.agent_url)
+        return TAPResult(
+            present=True,
+            verified=True,
+            message=f"Verified session: {agent_name or claims.agent_url}",
+            agent_url=claims.agent_url,
+            agent_name=agent_name,
+            keyid=claims.keyid,
+            tag=claims.tag,
+            session=True,
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.mode == "proxy" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        result = self.verify(scope)
+        scope.setdefault("state", {})["tap"] = result
+
+        policy = self.policy_for(scope["method"], scope["path"])
+        denial = self._denial(policy, result) if policy is not None else None
+        if denial is not None:
+            logger.info(f"TAP policy '{policy.name}' rejected {scope['method']} {scope['path']}: {denial}")
+            await self._reply(send, 403, denial)
+            return
+
+        content_digest = next((value for name, value in scope["headers"] if name == b"content-digest"), None)
+        if content_digest is not None:
+            digests = parse_content_digest(content_digest.decode("latin-1"))
+            if digests is None:
+                await self._reply(send, 400, "Malformed Content-Digest")
+                return
+            # Unsupported algorithms alone are ignored (RFC 9530 section 3)
+            if digests and result.covers_digest:
+                matches, receive = await read_verified_body(receive, ContentDigestVerifier(digests))
+                if not matches:
+                    await self._reply(send, 400, "Request body does not match its signed Content-Digest")
+                    return
+            elif digests:
+                receive = verifying_receive(receive, ContentDigestVerifier(digests))
+
+        await self.app(scope, receive, send)
+
+    @staticmethod
+    def _denial(policy: RoutePolicy, result: TAPResult) -> Optional[str]:
+        if not result.present:
+            return "Signature required" if policy.require_signature else None
+        if not result.verified:
+            return result.message if policy.reject_invalid else None
+        if result.tag not in policy.allowed_tags:
+            return f"Signature tag '{result.tag}' is not accepted for {policy.name} requests"
+        return None
+
+    @staticmethod
+    async def _reply(send, status: int, detail: str):
+        body = json.dumps({"detail": detail}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
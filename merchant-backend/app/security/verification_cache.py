@@ -0,0 +1,110 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Cache of Ed25519 verification outcomes for repeated signatures.
+
+An agent retrying the same signed request sends the same signature over
+the same signature base, so the Base58 decode and Ed25519 verify can be
+skipped. Entries are keyed by (keyid, public key bytes, signature, SHA-256
+of the signature base) and expire at the signature's ``expires``. Including
+the public key bytes means a rotated key can never match an old entry;
+``invalidate_key`` additionally frees a rotated key's entries right away.
+
+Only the cryptographic outcome of valid signatures is cached. Timestamp
+checks and replay protection still run on every request, so a cache hit
+never lets a replayed nonce through. With replay protection on, a retry
+of a verified signature is itself a replay: the hit only makes rejecting
+it cheap. Verified outcomes are reused outright when the nonce store is
+off (``NONCE_STORE=none``) or the caller checks nonces itself
+(``verify_signature(..., record_nonce=False)``).
+"""
+
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# (keyid, public key bytes, signature as sent, signature base digest)
+CacheKey = Tuple[str, bytes, str, bytes]
+
+
+class VerificationCache:
+    """Bounded LRU of (is_valid, message) results that expire with their signature."""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[CacheKey, Tuple[int, bool, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(keyid: str, public_key_bytes: bytes, signature: str, signature_base: bytes) -> CacheKey:
+        return keyid, public_key_bytes, signature, hashlib.sha256(signature_base).digest()
+
+    def get(self, key: CacheKey) -> Optional[Tuple[bool, str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, is_valid, message = entry
+            if time.time() > expires:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return is_valid, message
+
+    def put(self, key: CacheKey, expires: int, is_valid: bool, message: str):
+        with self._lock:
+            self._entries[key] = (expires, is_valid, message)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_key(self, keyid: str):
+        """Drop every entry verified with keyid, e.g. after the key was rotated out."""
+        with self._lock:
+            stale = [key for key in self._entries if key[0] == keyid]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+def create_verification_cache() -> Optional[VerificationCache]:
+    """Build the cache sized by SIGNATURE_CACHE_SIZE (0 disables it)."""
+    max_entries = int(os.getenv("SIGNATURE_CACHE_SIZE", "10000"))
+    return VerificationCache(max_entries) if max_entries > 0 else None
@@ -0,0 +1,105 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Single-flight coalescing of identical concurrent reads.
+
+Sync routes run on Starlette's threadpool, so a burst of identical requests
+(an agent fleet starting up) would otherwise run the same SQL once per
+thread. The first caller for a key runs the read; callers arriving while it
+is in flight wait for it and share its result (or its exception). Nothing
+is kept once the call finishes: this is coalescing, not caching.
+
+Shared results are handed to several requests at once, so callers return
+plain data (records, response models) rather than session-bound ORM rows.
+"""
+
+import os
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from app.metrics import MetricsRegistry, metrics_enabled, metrics_registry
+
+LEADER = "leader"
+SHARED = "shared"
+
+
+class SingleFlightMetrics:
+    """Calls that ran the read versus calls that joined one in flight."""
+
+    def __init__(self, registry: MetricsRegistry = metrics_registry):
+        self.calls = registry.counter("singleflight_calls_total", "Coalesced reads by role", "role")
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Runs at most one read per key at a time and shares its outcome with concurrent callers."""
+
+    def __init__(self, enabled: bool = True, metrics: Optional[SingleFlightMetrics] = None):
+        self.enabled = enabled
+        self.metrics = metrics
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, read: Callable[[], Any]) -> Any:
+        """Result of read(), or of the identical read already in flight for `key`."""
+        if not self.enabled:
+            return read()
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.shared += 1
+        if self.metrics is not None:
+            self.metrics.calls.inc(LEADER if leader else SHARED)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = read()
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"in_flight": len(self._calls), "leaders": self.leaders, "shared": self.shared}
+
+
+def create_single_flight() -> SingleFlight:
+    """Build the coalescer; SINGLE_FLIGHT=false runs every read itself."""
+    return SingleFlight(
+        enabled=os.getenv("SINGLE_FLIGHT", "true").lower() == "true",
+        metrics=SingleFlightMetrics() if metrics_enabled() else None,
+    )
+
+
+# Global instance
+single_flight = create_single_flight()
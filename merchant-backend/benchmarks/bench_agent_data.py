@@ -0,0 +1,93 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Cost of handling X-Agent-Data in check_verification: the previous inline
+decode (base64, JSON, unverified JWT payload, print to stdout) against the
+cached decoder, which also verifies the JWT against a JWKS.
+
+    python -m benchmarks.bench_agent_data
+
+The JWKS is served by the stub registry. "miss" decodes and verifies a new
+blob every time; "hit" resends the same blob, as a hot agent does.
+"""
+
+import io
+import json
+import time
+import base64
+import contextlib
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+from app.security.agent_data import AgentDataDecoder, JWKSCache
+from benchmarks.common import report
+from benchmarks.stub_registry import StubRegistry
+
+REQUESTS = 2_000
+
+
+def legacy_decode(agent_data: str):
+    """check_verification's decode before the decoder existed"""
+    decoded_agent_data = base64.b64decode(agent_data).decode("utf-8")
+    print(f"Decoded agent data: {decoded_agent_data}")
+    data_json = json.loads(decoded_agent_data)
+    access_url = data_json.get("accessUrl")
+    parts = data_json["token"].split(".")
+    payload_b64 = parts[1] + "=" * (-len(parts[1]) % 4)
+    jwt_body = json.loads(base64.urlsafe_b64decode(payload_b64).decode("utf-8"))
+    print(f"JWT body: {jwt_body}")
+    return access_url, jwt_body
+
+
+def main():
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                    serialization.NoEncryption())
+    public_pem = private_key.public_key().public_bytes(serialization.Encoding.PEM,
+                                                        serialization.PublicFormat.SubjectPublicKeyInfo)
+    registry = StubRegistry().start()
+    registry.jwks["keys"].append({**jwk.construct(public_pem, "RS256").to_dict(), "kid": "bench"})
+
+    def blob(i: int) -> str:
+        token = jwt.encode({"sub": f"agent-{i}", "exp": int(time.time()) + 600}, pem,
+                           algorithm="RS256", headers={"kid": "bench"})
+        data = {"accessUrl": f"https://merchant.example.com/products/{i}", "token": token}
+        return base64.b64encode(json.dumps(data).encode("utf-8")).decode("ascii")
+
+    blobs = [blob(i) for i in range(REQUESTS)]
+    decoder = AgentDataDecoder(JWKSCache(f"{registry.url}/.well-known/jwks.json"), max_entries=REQUESTS)
+    assert decoder.decode(blob(-1)).token_verified
+
+    # stdout goes to a buffer so terminal speed does not dominate the legacy numbers
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for raw in blobs:
+            legacy_decode(raw)
+        elapsed = time.perf_counter() - start
+    report("legacy: decode + print, no JWT verify", elapsed, REQUESTS)
+
+    start = time.perf_counter()
+    for raw in blobs:
+        assert decoder.decode(raw).token_verified
+    report("decoder miss: decode + RS256 verify", time.perf_counter() - start, REQUESTS)
+
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        for raw in blobs[:10]:
+            decoder.decode(raw)
+    report("decoder hit: same blob resent", time.perf_counter() - start, REQUESTS * 10)
+
+    print(f"\nDecoder stats: {decoder.stats()}, JWKS fetches: {registry.requests}")
+    registry.stop()
+
+
+if __name__ == "__main__":
+    main()
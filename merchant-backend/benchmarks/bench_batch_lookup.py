@@ -0,0 +1,93 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Re-pricing a 30-item cart on a 100k-product catalog: 30 calls to
+GET /api/products/{id} against one POST /api/products/batch, with and
+without a `fields` projection that leaves out the description column.
+
+    python -m benchmarks.bench_batch_lookup [rows]
+
+Runs through the ASGI app with TestClient (TAP middleware in proxy mode).
+The uncached runs use a zero-sized product cache, so every product is read
+from the database; the cached runs start warm.
+"""
+
+import os
+import sys
+import time
+import random
+import logging
+
+os.environ.setdefault("TAP_VERIFICATION_MODE", "proxy")
+os.environ.setdefault("SEARCH_INDEX_WARM", "false")
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from app.catalog.product_cache import ProductCache
+from app.database.database import get_db
+from app.main import app
+from app.routes import cart, products
+from benchmarks.catalog_data import catalog_engine
+from benchmarks.common import report
+
+CART_SIZE = 30
+CARTS = 200
+
+
+def use_cache(cache):
+    products.product_cache = cache
+    cart.product_cache = cache
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    logging.disable(logging.INFO)
+    Session = sessionmaker(bind=catalog_engine(rows))
+    rng = random.Random(7)
+    carts = [rng.sample(range(1, rows + 1), CART_SIZE) for _ in range(CARTS)]
+
+    def override():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    def one_by_one(client, ids):
+        for product_id in ids:
+            assert client.get(f"/api/products/{product_id}").status_code == 200
+
+    def batch(client, ids, fields=None):
+        response = client.post("/api/products/batch", json={"ids": ids, "fields": fields})
+        assert response.status_code == 200 and all(entry["found"] for entry in response.json()["products"])
+
+    runs = (
+        ("30 x GET", one_by_one),
+        ("batch", batch),
+        ("batch, price+stock", lambda client, ids: batch(client, ids, ["price", "stock_quantity"])),
+    )
+    print(f"{rows:,} products, {CARTS} carts of {CART_SIZE} items (carts/s)")
+    app.dependency_overrides[get_db] = override
+    with TestClient(app) as client:
+        for cached in (False, True):
+            for label, run in runs:
+                use_cache(ProductCache(max_entries=10_000 if cached else 0, check_interval=1.0))
+                if cached:
+                    for ids in carts:
+                        batch(client, ids)
+                start = time.perf_counter()
+                for ids in carts:
+                    run(client, ids)
+                report(f"{label}, {'cached' if cached else 'uncached'}", time.perf_counter() - start, len(carts))
+    app.dependency_overrides.clear()
+
+
+if __name__ == "__main__":
+    main()
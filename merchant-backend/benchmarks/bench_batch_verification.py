@@ -0,0 +1,71 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Batch vs. single-call signature verification throughput.
+
+    python -m benchmarks.bench_batch_verification [batch_size]
+
+Compares verifying N signatures one call at a time against one call to the
+batch verifier, both in-process and through the HTTP endpoints.
+"""
+
+import logging
+import sys
+
+from fastapi.testclient import TestClient
+
+from app.security.signature_verification import signature_verifier
+from app.security.batch_verification import batch_signature_verifier
+from benchmarks.common import install_benchmark_key, signed_requests, timeit, report
+
+
+def _payload(item):
+    agent, sig_input, sig, request_data = item
+    return {
+        "signature_agent": agent,
+        "signature_input": sig_input,
+        "signature": sig,
+        "authority": request_data["authority"],
+        "path": request_data["path"],
+    }
+
+
+def main(batch_size: int = 500):
+    logging.disable(logging.INFO)
+    private_key = install_benchmark_key(signature_verifier)
+    # The same signatures are verified on every repetition, which replay protection would
+    # reject and the result cache would short-circuit
+    signature_verifier.nonce_store = None
+    signature_verifier.result_cache = None
+    items = signed_requests(signature_verifier, private_key, batch_size)
+
+    print(f"Verifying {batch_size} signatures, {batch_signature_verifier.max_workers} worker process(es)\n")
+
+    # Warm the pool so process start-up is not billed to the first run
+    batch_signature_verifier.verify(items)
+
+    single = timeit(lambda: [signature_verifier.is_trusted_agent(*item) for item in items])
+    report("in-process: single-call loop", single, batch_size)
+    batch = timeit(lambda: batch_signature_verifier.verify(items))
+    report("in-process: batch", batch, batch_size)
+
+    from app.main import app
+    payloads = [_payload(item) for item in items]
+    with TestClient(app) as client:
+        http_single = timeit(lambda: [client.post("/api/auth/verify-signature", json=p) for p in payloads], repeat=1)
+        report("HTTP: POST /verify-signature x N", http_single, batch_size)
+        http_batch = timeit(lambda: client.post("/api/auth/verify-signature/batch", json={"items": payloads}))
+        report("HTTP: POST /verify-signature/batch", http_batch, batch_size)
+
+    print(f"\nSpeed-up in-process: {single / batch:.2f}x, over HTTP: {http_single / http_batch:.2f}x")
+    batch_signature_verifier.shutdown()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
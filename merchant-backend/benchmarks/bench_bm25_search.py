@@ -0,0 +1,88 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Premium search ranking: the in-memory BM25 index against the SQL it
+replaced (FTS5 match, bm25() order, count, page) at 100k and 1M products.
+
+    python -m benchmarks.bench_bm25_search [rows ...]
+
+Reports the one-off index build, per-query latency for a 20-row page
+including the row fetch, and the cost of indexing a new product.
+"""
+
+import sys
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from app.catalog.fulltext import fulltext_index
+from app.catalog.ranking import BM25Index
+from app.models.models import Product as ProductModel
+from app.routes.products import _ranking_rows
+from benchmarks.catalog_data import catalog_engine
+
+QUERIES = ["headphones", "wireless speaker", "organic cotton", "dishwasher safe", "head", "zzzqx"]
+REPEAT = 3
+LIMIT = 20
+
+
+def fts_page(db, query):
+    query_obj = fulltext_index.filter(db.query(ProductModel), ProductModel, query)
+    total = query_obj.count()
+    query_obj = fulltext_index.order_by_rank(query_obj)
+    return total, query_obj.limit(LIMIT).all()
+
+
+def bm25_page(db, index, query):
+    ids, scores = index.search(query)
+    page = ids[:LIMIT].tolist()
+    rows = {p.id: p for p in db.query(ProductModel).filter(ProductModel.id.in_(page))} if page else {}
+    return len(ids), [rows[product_id] for product_id in page]
+
+
+def best_of(fn, *args):
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000]
+    for rows in sizes:
+        engine = catalog_engine(rows)
+        db = sessionmaker(bind=engine)()
+        index = BM25Index()
+        start = time.perf_counter()
+        index.load(lambda: _ranking_rows(db))
+        build = time.perf_counter() - start
+        stats = index.stats()
+        print(f"\n{rows:,} products: index built in {build:.1f}s "
+              f"({stats['terms']:,} terms, {stats['postings']:,} postings)")
+
+        print(f"  {'query':<18} {'fts5 + bm25()':>14} {'numpy bm25':>11} {'speedup':>8}  matches")
+        for query in QUERIES:
+            fts, (fts_total, _) = best_of(fts_page, db, query)
+            bm25, (bm25_total, _) = best_of(bm25_page, db, index, query)
+            print(f"  {query:<18} {fts * 1000:12.1f}ms {bm25 * 1000:9.1f}ms {fts / bm25:7.1f}x  "
+                  f"{fts_total:,} all words / {bm25_total:,} any word")
+
+        count = 1000
+        start = time.perf_counter()
+        for n in range(count):
+            index.add(rows + n + 1, f"Wireless Widget {n}", "Electronics", "A new product, built to last")
+        per_add = (time.perf_counter() - start) / count
+        print(f"  incremental add: {per_add * 1e6:.0f}µs per product")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Loading a supplier feed: one ORM insert and commit per product (what
+create_sample_data.py and POST /api/products/ do) against the chunked bulk
+importer, then re-importing the feed with 10% of the prices changed, which
+exercises upsert by SKU.
+
+    python -m benchmarks.bench_bulk_import [rows]
+
+The feed is generated as NDJSON lines on the fly, and peak RSS is printed
+after each run: it stays flat as the feed grows, because nothing but the
+current chunk is held in memory.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import resource
+import tempfile
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.catalog.bulk_import import NDJSON, BulkImporter
+from app.database.database import create_schema
+from app.models.models import Product as ProductModel
+from benchmarks.catalog_data import product_rows
+
+ORM_ROWS = 2_000
+
+
+def feed(rows, changed=0.0, seed=5):
+    """NDJSON lines of the benchmark catalog, each product with a SKU; `changed` of the prices moved."""
+    rng = random.Random(seed)
+    for serial, (name, description, price, category, image_url, stock, _) in enumerate(product_rows(rows)):
+        if changed and rng.random() < changed:
+            price = round(price * 1.1, 2)
+        yield json.dumps({"sku": f"SKU-{serial}", "name": name, "description": description, "price": price,
+                          "category": category, "image_url": image_url, "stock_quantity": stock})
+
+
+def fresh_engine(path):
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    create_schema(engine)
+    return engine
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    path = os.path.join(tempfile.gettempdir(), "merchant-bench-import.db")
+
+    engine = fresh_engine(path)
+    db = sessionmaker(bind=engine)()
+    start = time.perf_counter()
+    for line in feed(ORM_ROWS):
+        db.add(ProductModel(**json.loads(line)))
+        db.commit()
+    seconds = time.perf_counter() - start
+    db.close()
+    rate = ORM_ROWS / seconds
+    print(f"ORM, one commit per product: {ORM_ROWS:,} rows in {seconds:.1f}s, {rate:,.0f} rows/s "
+          f"({rows / rate / 60:.0f} min for {rows:,})")
+
+    engine = fresh_engine(path)
+    importer = BulkImporter()
+    for label, changed in (("bulk import", 0.0), ("re-import, 10% changed", 0.1)):
+        report = importer.run(engine, feed(rows, changed), NDJSON)
+        print(f"{label}: {report.rows:,} rows in {report.seconds:.1f}s, {report.rows / report.seconds:,.0f} rows/s "
+              f"({report.inserted:,} inserted, {report.updated:,} updated, {report.unchanged:,} unchanged), "
+              f"peak RSS {peak_rss_mb():.0f} MB")
+    engine.dispose()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
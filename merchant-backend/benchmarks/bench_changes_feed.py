@@ -0,0 +1,84 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+What an agent pays to stay in sync with a 1M-product catalog: re-crawling
+it through cursor-paged listings, versus polling /changes for the writes
+since its last poll, versus one gzip NDJSON snapshot for a cold start.
+
+    python -m benchmarks.bench_changes_feed [rows] [changed]
+
+The changed products are written in a transaction that is rolled back at
+the end, so the cached benchmark catalog is left as it was.
+"""
+
+import sys
+import time
+import random
+
+from sqlalchemy.orm import sessionmaker
+
+from app.catalog.changes import SNAPSHOT_COLUMNS, snapshot_lines
+from app.models.models import Product as ProductModel
+from app.routes.products import _page_json, list_products, product_changes
+from benchmarks.catalog_data import catalog_engine
+
+PAGE = 100
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    changed = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000
+    db = sessionmaker(bind=catalog_engine(rows))()
+    print(f"{rows:,} products, {changed:,} changed since the last poll")
+
+    # Full re-crawl, 100 products per page (sort=newest pages by cursor, not offset)
+    start = time.perf_counter()
+    cursor, pages, size = None, 0, 0
+    while True:
+        page = list_products(query=None, category=None, min_price=None, max_price=None, limit=PAGE, offset=0,
+                             sort="newest", cursor=cursor, total_mode="none", db=db)
+        pages += 1
+        size += len(_page_json(page))
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    crawl = time.perf_counter() - start
+    print(f"  re-crawl      {crawl:8.2f}s  {pages:,} requests  {size / 1e6:8.1f} MB")
+
+    start = time.perf_counter()
+    size = sum(len(chunk) for chunk in snapshot_lines(
+        db.query(*(getattr(ProductModel, column) for column in SNAPSHOT_COLUMNS)).yield_per(10000)
+    ))
+    print(f"  snapshot      {time.perf_counter() - start:8.2f}s  1 request  {size / 1e6:10.1f} MB gzip")
+
+    since = db.query(ProductModel.version).order_by(ProductModel.version.desc()).limit(1).scalar() or 0
+    rng = random.Random(3)
+    for product in db.query(ProductModel).filter(ProductModel.id.in_(rng.sample(range(1, rows + 1), changed))):
+        product.price = round(product.price * 0.9, 2)
+    db.flush()
+
+    start = time.perf_counter()
+    requests, size, seen = 0, 0, 0
+    while True:
+        feed = product_changes(since=since, limit=500, db=db)
+        requests += 1
+        size += len(feed.model_dump_json())
+        seen += len(feed.changes)
+        since = feed.next_since
+        if not feed.more:
+            break
+    poll = time.perf_counter() - start
+    print(f"  changes poll  {poll * 1000:7.1f}ms  {requests:,} requests  {size / 1e6:8.2f} MB  "
+          f"({seen:,} changes, {crawl / poll:,.0f}x faster than re-crawling)")
+    db.rollback()
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Content-Digest checking for request bodies from 1 KB to 10 MB, streamed
+through the ASGI receive wrapper in 64 KB chunks (uvicorn's read size),
+against buffering the whole body first and hashing the copy. Also times
+signature base construction through the component registry.
+
+    python -m benchmarks.bench_content_digest
+
+Peak memory is the extra allocation tracemalloc sees while the body is
+checked, on top of the chunks themselves.
+"""
+
+import asyncio
+import base64
+import hashlib
+import time
+import tracemalloc
+
+from app.security.content_digest import ContentDigestVerifier, DIGEST_ALGORITHMS, verifying_receive
+from app.security.signature_base import build_signature_base
+from benchmarks.common import report
+
+CHUNK = 64 * 1024
+SIZES = [1024, 64 * 1024, 1024 * 1024, 10 * 1024 * 1024]
+
+
+def _chunks(size: int):
+    body = bytes(range(256)) * (size // 256)
+    return [body[i:i + CHUNK] for i in range(0, size, CHUNK)]
+
+
+async def streamed(chunks, algorithm: str, expected: bytes):
+    messages = iter([{"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+                     for i, chunk in enumerate(chunks)])
+
+    async def receive():
+        return next(messages)
+
+    receive = verifying_receive(receive, ContentDigestVerifier({algorithm: expected}))
+    for _ in chunks:
+        await receive()
+
+
+def buffered(chunks, algorithm: str, expected: bytes):
+    body = b"".join(chunks)
+    assert DIGEST_ALGORITHMS[algorithm](body).digest() == expected
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    loop = asyncio.new_event_loop()
+    for size in SIZES:
+        chunks = _chunks(size)
+        for algorithm in ("sha-256", "sha-512"):
+            expected = DIGEST_ALGORITHMS[algorithm](b"".join(chunks)).digest()
+            for label, fn in (
+                ("streamed", lambda: loop.run_until_complete(streamed(chunks, algorithm, expected))),
+                ("buffered", lambda: buffered(chunks, algorithm, expected)),
+            ):
+                fn()
+                elapsed, peak = measure(fn)
+                print(f"{size // 1024:>6} KB {algorithm} {label:<9} {elapsed * 1000:9.2f} ms "
+                      f"{size / elapsed / 1e6:9.1f} MB/s  peak +{peak / 1024:8.1f} KB")
+        print()
+    loop.close()
+
+    request_data = {"method": "POST", "authority": "merchant.example.com", "path": "/api/cart/s/checkout",
+                    "content-digest": "sha-256=:" + base64.b64encode(hashlib.sha256(b"").digest()).decode() + ":"}
+    components = ["@method", "@authority", "@path", "content-digest"]
+    start = time.perf_counter()
+    for i in range(100_000):
+        build_signature_base(components, request_data, "nonce", i, i + 60)
+    report("signature base: 4 components via registry", time.perf_counter() - start, 100_000)
+
+
+if __name__ == "__main__":
+    main()
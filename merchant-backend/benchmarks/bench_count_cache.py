@@ -0,0 +1,69 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+search_products at 1M products with the total count: uncached exact
+(the previous behaviour), cached exact (later pages of the same filter),
+an estimate and no total.
+
+    python -m benchmarks.bench_count_cache [rows]
+"""
+
+import sys
+
+from sqlalchemy.orm import sessionmaker
+
+from app.counts import CountCache
+from app.routes import products
+from app.routes.products import list_products
+from benchmarks.catalog_data import catalog_engine
+from benchmarks.common import timed
+
+FILTERS = [
+    {"label": "no filter"},
+    {"label": "price 10-50", "min_price": 10.0, "max_price": 50.0},
+    {"label": "category", "category": "Kitchen"},
+    {"label": "fts 'wireless'", "query": "wireless"},
+    {"label": "fts 'dishwasher safe'", "query": "dishwasher safe"},
+]
+REPEAT = 3
+
+
+def page(db, mode, **filters):
+    params = dict(query=None, category=None, min_price=None, max_price=None)
+    params.update(filters)
+    return list_products(limit=20, offset=0, sort=None, cursor=None, total_mode=mode, db=db, **params)
+
+
+def fresh_counts():
+    products.count_cache = CountCache()
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    db = sessionmaker(bind=catalog_engine(rows))()
+    print(f"{rows:,} products, one 20-row page including its total")
+    print(f"  {'filter':<22} {'exact':>9} {'cached':>9} {'estimate':>9} {'none':>9}  total (estimate)")
+    for spec in FILTERS:
+        filters = {key: value for key, value in spec.items() if key != "label"}
+        exact = timed(lambda: page(db, "exact", **filters), REPEAT, setup=fresh_counts)
+        fresh_counts()
+        page(db, "exact", **filters)
+        cached = timed(lambda: page(db, "exact", **filters), REPEAT)
+        estimate = timed(lambda: page(db, "estimate", **filters), REPEAT, setup=fresh_counts)
+        none = timed(lambda: page(db, "none", **filters), REPEAT, setup=fresh_counts)
+        exact_result, estimate_result = exact.result, estimate.result
+        error = abs(estimate_result.total - exact_result.total) / max(exact_result.total, 1)
+        print(f"  {spec['label']:<22} {exact.best * 1000:7.1f}ms {cached.best * 1000:7.1f}ms "
+              f"{estimate.best * 1000:7.1f}ms {none.best * 1000:7.1f}ms  {exact_result.total:,} ({estimate_result.total:,}, "
+              f"{estimate_result.total_mode}, {error:.1%} off)")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Category and price facets at 1M products: the incrementally maintained
+counters against the GROUP BY aggregate they replace, the query-narrowed
+facets (aggregated over full-text matches only), and what keeping the
+counters current costs per product change.
+
+    python -m benchmarks.bench_facets [rows]
+"""
+
+import sys
+import time
+from itertools import chain
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import sessionmaker
+
+from app.catalog.events import INSERT, UPDATE, ProductChange
+from app.catalog.facets import FacetIndex
+from app.models.models import Product as ProductModel
+from app.routes.products import _query_facets
+from benchmarks.catalog_data import catalog_engine
+from benchmarks.common import timed
+
+QUERIES = ["headphones", "wireless speaker", "organic cotton", "zzz-no-match"]
+REPEAT = 200
+
+
+def sql_facets(db, edges):
+    """The equivalent aggregate: one GROUP BY over the whole table."""
+    bucket = case(*[(ProductModel.price < edge, index) for index, edge in enumerate(edges)], else_=len(edges))
+    facets = {}
+    for category, index, count, in_stock in db.query(
+        ProductModel.category, bucket, func.count(), func.sum(case((ProductModel.stock_quantity > 0, 1), else_=0))
+    ).group_by(ProductModel.category, bucket):
+        facet = facets.setdefault(category, [category, 0, 0, [0] * (len(edges) + 1)])
+        facet[1] += count
+        facet[2] += in_stock
+        facet[3][index] += count
+    return sorted(facets.values(), key=lambda facet: (-facet[1], facet[0] or ""))
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    db = sessionmaker(bind=catalog_engine(rows))()
+
+    index = FacetIndex()
+    start = time.perf_counter()
+    index.load(lambda: chain([0], db.query(
+        ProductModel.category, ProductModel.price, ProductModel.stock_quantity
+    ).yield_per(10000)))
+    print(f"{rows:,} products: counters built in {time.perf_counter() - start:.1f}s "
+          f"({index.stats()['categories']} categories, {len(index.edges) + 1} price buckets)")
+
+    sql = timed(lambda: sql_facets(db, index.edges))
+    counters = timed(index.counts, REPEAT)
+    assert [list(facet) for facet in counters.result] == sql.result
+    print(f"  all products     GROUP BY {sql.median * 1000:8.1f}ms   counters {counters.median * 1e6:6.0f}us   "
+          f"{sql.median / counters.median:,.0f}x")
+
+    for query in QUERIES:
+        narrowed = timed(lambda: _query_facets(db, query))
+        print(f"  {query!r:<18} over full-text matches {narrowed.median * 1000:7.1f}ms   "
+              f"{sum(facet[1] for facet in narrowed.result):,} products")
+
+    start = time.perf_counter()
+    for serial in range(10_000):
+        values = {"category": "Electronics", "price": 49.99, "stock_quantity": 5}
+        index.apply([ProductChange(INSERT, rows + serial + 1, values, frozenset(values))])
+    inserts = time.perf_counter() - start
+    start = time.perf_counter()
+    for serial in range(10_000):
+        values = {"category": "Electronics", "price": 49.99, "stock_quantity": serial % 2}
+        index.apply([ProductChange(UPDATE, rows + serial + 1, values, frozenset({"stock_quantity"}),
+                                   {"stock_quantity": 5})])
+    updates = time.perf_counter() - start
+    print(f"  10,000 creates: {inserts * 1000:.0f}ms   10,000 stock changes: {updates * 1000:.0f}ms")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+search_products with the FTS5 index against the previous ilike('%q%')
+scans, at 100k and 1M products. premium_search_products runs the same
+filters over one more column.
+
+    python -m benchmarks.bench_fulltext_search [rows ...]
+
+Each query includes the total count, as the endpoints do. The catalog
+files are generated on first use (see catalog_data.py); 1M rows take a
+minute or two to build.
+"""
+
+import sys
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from app.catalog.fulltext import fulltext_index
+from app.routes.products import list_products
+from benchmarks.catalog_data import catalog_engine
+
+QUERIES = ["headphones", "wireless speaker", "organic cotton", "dishwasher safe", "zzz-no-match"]
+REPEAT = 3
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000]
+    for rows in sizes:
+        engine = catalog_engine(rows)
+        db = sessionmaker(bind=engine)()
+        print(f"\n{rows:,} products")
+        print(f"  {'query':<18} {'ilike scan':>12} {'fts5':>10} {'speedup':>8}  matches")
+        for query in QUERIES:
+            timings = {}
+            for label, available in (("ilike", False), ("fts", True)):
+                fulltext_index.available = available
+                best = float("inf")
+                for _ in range(REPEAT if available else 1):
+                    start = time.perf_counter()
+                    result = list_products(query=query, category=None, min_price=None, max_price=None,
+                                           limit=20, offset=0, sort=None, cursor=None, total_mode="exact", db=db)
+                    best = min(best, time.perf_counter() - start)
+                timings[label] = (best, result.total)
+            (ilike, ilike_total), (fts, fts_total) = timings["ilike"], timings["fts"]
+            print(f"  {query:<18} {ilike * 1000:10.1f}ms {fts * 1000:8.2f}ms {ilike / fts:7.0f}x  "
+                  f"{ilike_total:,} substring / {fts_total:,} word-prefix")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
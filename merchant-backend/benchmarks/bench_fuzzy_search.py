@@ -0,0 +1,103 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Typo-tolerant search: recall on a set of misspelled queries and latency
+as the catalog grows, for the trigram index behind premium search.
+
+    python -m benchmarks.bench_fuzzy_search [rows ...]
+
+For each misspelling the intended word is known, so the expected results
+are the products whose name or category contains that word. Recall is the
+share of them the fuzzy search returns; precision@20 is the share of the
+first page that is expected. The BM25 column shows what premium search
+found for the same query before the trigram fallback (words the index
+does not know only match by prefix).
+"""
+
+import sys
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from app.catalog.fuzzy import TrigramIndex, stem
+from app.catalog.ranking import BM25Index, tokenize
+from app.routes.products import _ranking_rows
+from benchmarks.catalog_data import catalog_engine
+
+# (query as typed, intended words)
+RECALL_SET = [
+    ("hedphones", ["headphones"]),
+    ("headphone", ["headphones"]),
+    ("keybord", ["keyboard"]),
+    ("smartphon", ["smartphone"]),
+    ("blendr", ["blender"]),
+    ("cofee maker", ["coffee", "maker"]),
+    ("sneekers", ["sneakers"]),
+    ("hiking backpak", ["hiking", "backpack"]),
+    ("elctronics", ["electronics"]),
+    ("wireles charger", ["wireless", "charger"]),
+    ("bookshelfs", ["bookshelf"]),
+    ("leathr jacket", ["leather", "jacket"]),
+    ("watter bottle", ["water", "bottle"]),
+    ("camra", ["camera"]),
+    ("sunscren", ["sunscreen"]),
+    ("aquarium filters", ["aquarium", "filter"]),
+]
+PAGE = 20
+
+
+def expected_products(rows, words):
+    stems = [stem(word) for word in words]
+    expected = set()
+    for product_id, name, category, _ in rows:
+        product_words = {stem(token) for token in tokenize(name) + tokenize(category)}
+        if all(word in product_words for word in stems):
+            expected.add(product_id)
+    return expected
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000]
+    for rows in sizes:
+        db = sessionmaker(bind=catalog_engine(rows))()
+        generation, *catalog = _ranking_rows(db)
+        db.close()
+
+        index = TrigramIndex()
+        start = time.perf_counter()
+        index.load(lambda: [generation, *catalog])
+        build = time.perf_counter() - start
+        ranker = BM25Index()
+        ranker.load(lambda: [generation, *catalog])
+        print(f"\n{rows:,} products: trigram index built in {build:.1f}s ({index.stats()['words']:,} words)")
+        print(f"  {'query':<18} {'bm25 hits':>10} {'fuzzy hits':>11} {'recall':>7} {'p@20':>6} {'latency':>9}")
+
+        recalls, precisions = [], []
+        for query, intended in RECALL_SET:
+            expected = expected_products(catalog, intended)
+            best = float("inf")
+            for _ in range(3):
+                start = time.perf_counter()
+                ids, _ = index.search(query)
+                best = min(best, time.perf_counter() - start)
+            found = set(ids.tolist())
+            recall = len(found & expected) / len(expected) if expected else 1.0
+            page = ids[:PAGE].tolist()
+            precision = sum(product_id in expected for product_id in page) / len(page) if page else 0.0
+            recalls.append(recall)
+            precisions.append(precision)
+            bm25_hits = len(ranker.search(query)[0])
+            print(f"  {query:<18} {bm25_hits:>10,} {len(ids):>11,} {recall:>7.0%} {precision:>6.0%} "
+                  f"{best * 1000:7.1f}ms")
+        print(f"  mean recall {sum(recalls) / len(recalls):.1%}, mean precision@{PAGE} "
+              f"{sum(precisions) / len(precisions):.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Agent key store behaviour and hot-path lookup cost against a stub registry.
+
+    python -m benchmarks.bench_key_store
+
+Shows that lookups never wait on the registry: unknown keyids return
+immediately and are fetched in the background, keys are still served
+while the registry is down, and removed keys are rotated out.
+"""
+
+import logging
+import time
+
+import base58
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+
+from app.security.key_store import AgentKeyStore
+from benchmarks.common import report
+from benchmarks.stub_registry import StubRegistry
+
+LOOKUPS = 1_000_000
+
+
+def _public_key_base58() -> str:
+    raw = ed25519.Ed25519PrivateKey.generate().public_key().public_bytes(
+        serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+    return base58.b58encode(raw).decode("ascii")
+
+
+def _wait_for(predicate, timeout: float = 5.0) -> float:
+    start = time.perf_counter()
+    while not predicate():
+        if time.perf_counter() - start > timeout:
+            raise TimeoutError("condition not met")
+        time.sleep(0.005)
+    return time.perf_counter() - start
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+    registry = StubRegistry()
+    for i in range(100):
+        registry.add_key(f"key-{i}", _public_key_base58())
+    registry.start()
+
+    store = AgentKeyStore(registry.url, ttl=1.0, retry_interval=0.2)
+    store.start()
+    elapsed = _wait_for(lambda: len(store.keys()) == 100)
+    print(f"Preloaded {len(store.keys())} keys in {elapsed * 1000:.1f} ms")
+
+    start = time.perf_counter()
+    for i in range(LOOKUPS):
+        store.get("key-7")
+    report("hot-path get() on a cached key", time.perf_counter() - start, LOOKUPS)
+
+    registry.add_key("key-new", _public_key_base58())
+    start = time.perf_counter()
+    first = store.get("key-new")
+    print(f"\nUnknown keyid: get() returned {first} in {(time.perf_counter() - start) * 1e6:.1f} us, "
+          f"available after {_wait_for(lambda: store.get('key-new') is not None) * 1000:.1f} ms")
+
+    registry.stop()
+    time.sleep(1.5)
+    start = time.perf_counter()
+    stale = store.get("key-7")
+    print(f"Registry down, past TTL: get() served stale key={stale is not None} "
+          f"in {(time.perf_counter() - start) * 1e6:.1f} us")
+
+    registry.start()
+    store.registry_url = registry.url
+    del registry.keys["key-7"]
+    removed = []
+    store.on_remove(removed.append)
+    print(f"Key removed in registry: rotated out after {_wait_for(lambda: removed == ['key-7']) * 1000:.1f} ms")
+
+    store.stop()
+    registry.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Page-N latency on 1M products: OFFSET pagination against keyset cursors,
+for the product sort orders backed by composite indexes.
+
+    python -m benchmarks.bench_keyset_pagination [rows]
+
+Times fetching one 20-row page (without the total count, which both
+approaches share). The cursor for page N is taken from the row just
+before it, untimed, as a crawler would have it from page N-1.
+"""
+
+import sys
+import time
+
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from app.models.models import Product as ProductModel
+from app.pagination import encode_cursor, keyset_page
+from app.routes.products import PRODUCT_SORT_ORDERS
+from benchmarks.catalog_data import catalog_engine
+
+LIMIT = 20
+PAGES = [1, 100, 1_000, 10_000, 49_999]
+REPEAT = 3
+
+
+def best_of(fn):
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        rows = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, rows
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    engine = catalog_engine(rows)
+    db = sessionmaker(bind=engine)()
+    with engine.connect() as connection:
+        connection.execute(text("ANALYZE"))
+    print(f"{rows:,} products, {LIMIT} per page")
+    print(f"  {'sort':<11} {'page':>7} {'offset':>10} {'cursor':>9} {'speedup':>8}")
+    for sort in PRODUCT_SORT_ORDERS:
+        if sort.name == "oldest":
+            continue
+        query = db.query(ProductModel)
+        for page in PAGES:
+            offset = (page - 1) * LIMIT
+            if offset >= rows:
+                continue
+            cursor = None
+            if offset:
+                before = query.order_by(*sort.order_by()).offset(offset - 1).limit(1).one()
+                cursor = encode_cursor(sort, before)
+            offset_time, by_offset = best_of(lambda: keyset_page(query, sort, LIMIT, None, offset)[0])
+            cursor_time, by_cursor = best_of(lambda: keyset_page(query, sort, LIMIT, cursor)[0])
+            assert [p.id for p in by_offset] == [p.id for p in by_cursor]
+            print(f"  {sort.name:<11} {page:>7,} {offset_time * 1000:8.2f}ms {cursor_time * 1000:7.2f}ms "
+                  f"{offset_time / cursor_time:7.0f}x")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Nonce store insert throughput and memory under 50k req/s-scale churn.
+
+    python -m benchmarks.bench_nonce_store [simulated_seconds]
+
+A simulated clock advances 1/50,000 s per request, each request carrying a
+fresh nonce whose signature expires VALIDITY seconds later. The live entry
+count should plateau near rate x validity instead of growing with traffic.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from app.security.nonce_store import NonceStore, SQLiteNonceStore
+from app.security.signature_verification import SignatureVerifier
+from benchmarks.common import install_benchmark_key, report, signed_request
+
+RATE = 50_000
+VALIDITY = 30
+
+
+class SimulatedClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def run(label: str, store, clock: SimulatedClock, seconds: int):
+    total = RATE * seconds
+    step = 1.0 / RATE
+    peak = 0
+    start = time.perf_counter()
+    for i in range(total):
+        clock.now += step
+        store.check_and_store("key-1", f"nonce-{i}", int(clock.now) + VALIDITY)
+        if i % (RATE * 5) == 0:
+            peak = max(peak, len(store))
+    elapsed = time.perf_counter() - start
+    report(label, elapsed, total)
+    bound = RATE * (VALIDITY + store.bucket_seconds)
+    print(f"    {total:,} nonces over {seconds}s simulated; peak live entries {peak:,} "
+          f"(bound: rate x (validity + bucket) = {bound:,}); {store.bucket_count()} live buckets")
+
+    assert not store.check_and_store("key-1", f"nonce-{total - 1}", int(clock.now) + VALIDITY), \
+        "replay was accepted"
+
+
+def check_keyid_replay():
+    """keyid is not signed: a replay must be caught even when it names another key."""
+    verifier = SignatureVerifier(nonce_store=NonceStore())
+    private_key = install_benchmark_key(verifier)
+    agent, signature_input, signature, request_data = signed_request(verifier, private_key)
+    assert verifier.is_trusted_agent(agent, signature_input, signature, request_data)[0], "signature rejected"
+    assert not verifier.is_trusted_agent(agent, signature_input, signature, request_data)[0], "replay was accepted"
+    renamed = signature_input.replace('keyid="bench-key"', 'keyid="other"')
+    assert not verifier.is_trusted_agent(agent, renamed, signature, request_data)[0], \
+        "replay with a different keyid was accepted"
+    print("replay with a different keyid: rejected")
+
+
+def main(seconds: int = 60):
+    check_keyid_replay()
+    clock = SimulatedClock()
+    run("memory: check_and_store", NonceStore(clock=clock), clock, seconds)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        clock = SimulatedClock()
+        store = SQLiteNonceStore(os.path.join(tmp, "nonces.db"), clock=clock)
+        run("sqlite: check_and_store", store, clock, seconds)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 60)
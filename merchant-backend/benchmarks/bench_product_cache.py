@@ -0,0 +1,101 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+GET /api/products/{id} throughput with and without the product cache, on
+a 100k-product catalog where agents keep asking for a hot set of items.
+
+    python -m benchmarks.bench_product_cache [rows]
+
+Measured twice: calling the route function directly (database work only)
+and through the ASGI app with TestClient (full request handling, TAP
+middleware in proxy mode). The uncached runs use a zero-sized cache, which
+loads every product from the database.
+"""
+
+import os
+import sys
+import time
+import random
+import logging
+
+os.environ.setdefault("TAP_VERIFICATION_MODE", "proxy")
+os.environ.setdefault("SEARCH_INDEX_WARM", "false")
+
+from fastapi import Request
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from app.catalog.product_cache import ProductCache
+from app.database.database import get_db
+from app.main import app
+from app.routes import cart, products
+from benchmarks.catalog_data import catalog_engine
+from benchmarks.common import report
+
+HOT_PRODUCTS = 500
+REQUESTS = 20_000
+HTTP_REQUESTS = 3_000
+# A plain GET without If-None-Match, for calling the route function directly
+GET = Request({"type": "http", "method": "GET", "path": "/", "headers": []})
+
+
+def workload(rows, count, seed=7):
+    rng = random.Random(seed)
+    hot = rng.sample(range(1, rows + 1), HOT_PRODUCTS)
+    # 90% of reads go to the hot set
+    return [rng.choice(hot) if rng.random() < 0.9 else rng.randint(1, rows) for _ in range(count)]
+
+
+def use_cache(cache):
+    products.product_cache = cache
+    cart.product_cache = cache
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    logging.disable(logging.INFO)
+    Session = sessionmaker(bind=catalog_engine(rows))
+    ids = workload(rows, REQUESTS)
+
+    print(f"{rows:,} products, {HOT_PRODUCTS} hot (90% of reads)")
+    db = Session()
+    for label, cache in (("route, uncached", ProductCache(max_entries=0, check_interval=1.0)),
+                         ("route, cached", ProductCache(max_entries=10_000, check_interval=1.0))):
+        use_cache(cache)
+        start = time.perf_counter()
+        for product_id in ids:
+            products.get_product(product_id, GET, db=db)
+        report(label, time.perf_counter() - start, len(ids))
+        if cache.max_entries:
+            print(f"  {cache.stats()}")
+    db.close()
+
+    def override():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override
+    paths = [f"/api/products/{product_id}" for product_id in ids[:HTTP_REQUESTS]]
+    # One client for the whole run: without the context manager every request starts an event loop thread
+    with TestClient(app) as client:
+        for label, cache in (("http, uncached", ProductCache(max_entries=0, check_interval=1.0)),
+                             ("http, cached", ProductCache(max_entries=10_000, check_interval=1.0))):
+            use_cache(cache)
+            start = time.perf_counter()
+            for path in paths:
+                assert client.get(path).status_code == 200
+            report(label, time.perf_counter() - start, len(paths))
+    app.dependency_overrides.clear()
+
+
+if __name__ == "__main__":
+    main()
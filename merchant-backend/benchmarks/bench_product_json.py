@@ -0,0 +1,117 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Serving products from pre-serialized JSON on a 100k-product catalog:
+
+- building 100-product listing bodies through pydantic (ProductList
+  validation and encoding) against joining each product's cached bytes;
+- building one product response the way `response_model` does against
+  the cached bytes with an ETag;
+- GET /api/products/{id} end to end through TestClient: a route returning
+  the record for `response_model` (as before), the cached bytes, and
+  revalidation with If-None-Match (304, no body).
+
+    python -m benchmarks.bench_product_json [rows]
+"""
+
+import os
+import sys
+import time
+import random
+import logging
+
+os.environ.setdefault("TAP_VERIFICATION_MODE", "proxy")
+os.environ.setdefault("SEARCH_INDEX_WARM", "false")
+
+from fastapi import Depends
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from app.catalog.product_cache import ProductCache
+from app.database.database import get_db
+from app.main import app
+from app.routes import cart, products
+from app.schemas import Product, ProductList
+from benchmarks.catalog_data import catalog_engine
+from benchmarks.common import report
+
+PAGES = 500
+PAGE_SIZE = 100
+REQUESTS = 3_000
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    logging.disable(logging.INFO)
+    Session = sessionmaker(bind=catalog_engine(rows))
+    cache = ProductCache(max_entries=100_000, check_interval=1.0)
+    products.product_cache = cart.product_cache = cache
+    rng = random.Random(7)
+    db = Session()
+
+    pages = []
+    for _ in range(PAGES):
+        records = cache.get_many(db, rng.sample(range(1, rows + 1), PAGE_SIZE))
+        pages.append(ProductList.model_construct(products=list(records.values()), total=rows, limit=PAGE_SIZE,
+                                                 offset=0, next_cursor=None, total_mode="exact"))
+    for page in pages:
+        products._page_json(page)
+    start = time.perf_counter()
+    for page in pages:
+        ProductList(**dict(page)).model_dump_json().encode()
+    report("listing, pydantic", time.perf_counter() - start, PAGES)
+    start = time.perf_counter()
+    for page in pages:
+        products._page_json(page)
+    report("listing, cached product bytes", time.perf_counter() - start, PAGES)
+
+    # What FastAPI does with a response_model: validate, convert to JSON-able data, encode
+    records = [record for page in pages for record in page.products]
+    start = time.perf_counter()
+    for record in records:
+        JSONResponse(jsonable_encoder(Product.model_validate(record)))
+    report("product response, response_model", time.perf_counter() - start, len(records))
+    start = time.perf_counter()
+    for record in records:
+        Response(content=record.json(), media_type="application/json", headers={"ETag": record.etag()})
+    report("product response, cached bytes + ETag", time.perf_counter() - start, len(records))
+    db.close()
+
+    def override():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    @app.get("/bench/products/{product_id}", response_model=Product)
+    def get_product_model(product_id: int, db=Depends(get_db)):
+        return cache.get(db, product_id)
+
+    app.dependency_overrides[get_db] = override
+    ids = [rng.randint(1, rows) for _ in range(REQUESTS)]
+    with TestClient(app) as client:
+        tags = {}
+        for product_id in set(ids):
+            tags[product_id] = client.get(f"/api/products/{product_id}").headers["etag"]
+        for label, path, conditional in (("GET, response_model", "/bench/products/{}", False),
+                                         ("GET, cached bytes + ETag", "/api/products/{}", False),
+                                         ("GET, If-None-Match -> 304", "/api/products/{}", True)):
+            start = time.perf_counter()
+            for product_id in ids:
+                headers = {"If-None-Match": tags[product_id]} if conditional else None
+                assert client.get(path.format(product_id), headers=headers).status_code == (304 if conditional else 200)
+            report(label, time.perf_counter() - start, len(ids))
+    app.dependency_overrides.clear()
+
+
+if __name__ == "__main__":
+    main()
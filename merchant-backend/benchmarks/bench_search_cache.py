@@ -0,0 +1,99 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+GET /api/products/ under agent-like traffic: a few hundred distinct
+listings, a handful of them very popular, repeated thousands of times.
+Compares the listing cache off and on through the ASGI app (full request
+handling, TAP middleware in proxy mode) on a 100k-product catalog.
+
+    python -m benchmarks.bench_search_cache [rows]
+"""
+
+import os
+import sys
+import time
+import random
+import logging
+
+os.environ.setdefault("TAP_VERIFICATION_MODE", "proxy")
+os.environ.setdefault("SEARCH_INDEX_WARM", "false")
+os.environ.setdefault("COLUMNAR_SNAPSHOT", "false")
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from app.catalog.search_cache import SearchResultCache
+from app.counts import CountCache
+from app.database.database import get_db
+from app.main import app
+from app.routes import products
+from benchmarks.catalog_data import catalog_engine
+from benchmarks.common import report
+
+CATEGORIES = ["Kitchen", "Garden", "Toys", "Books", "Electronics", "Sports"]
+QUERIES = ["wireless", "organic cotton", "steel", "headphones", None]
+DISTINCT = 300
+REQUESTS = 5_000
+
+
+def listings(seed=11):
+    rng = random.Random(seed)
+    paths = set()
+    while len(paths) < DISTINCT:
+        params = {"category": rng.choice(CATEGORIES), "limit": rng.choice([10, 20])}
+        query = rng.choice(QUERIES)
+        if query:
+            params["query"] = query
+        if rng.random() < 0.5:
+            low = rng.choice([5, 10, 20, 50])
+            params.update(min_price=low, max_price=low * rng.choice([2, 4]))
+        if rng.random() < 0.3:
+            params["sort"] = rng.choice(["price_asc", "price_desc", "newest"])
+        paths.add("/api/products/?" + "&".join(f"{key}={value}" for key, value in sorted(params.items())))
+    return sorted(paths)
+
+
+def workload(paths, count, seed=5):
+    rng = random.Random(seed)
+    # Zipf-like popularity: a few listings dominate
+    weights = [1 / (rank + 1) for rank in range(len(paths))]
+    return rng.choices(paths, weights=weights, k=count)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    logging.disable(logging.INFO)
+    Session = sessionmaker(bind=catalog_engine(rows))
+
+    def override():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override
+    requests = workload(listings(), REQUESTS)
+    print(f"{rows:,} products, {REQUESTS:,} requests over {DISTINCT} distinct listings")
+    with TestClient(app) as client:
+        for label, cache in (("listing cache off", SearchResultCache(max_bytes=0)),
+                             ("listing cache on", SearchResultCache())):
+            products.search_cache = cache
+            products.count_cache = CountCache()
+            start = time.perf_counter()
+            for path in requests:
+                assert client.get(path).status_code == 200
+            report(label, time.perf_counter() - start, len(requests))
+            if cache.max_bytes:
+                print(f"  {cache.stats()}")
+    app.dependency_overrides.clear()
+
+
+if __name__ == "__main__":
+    main()
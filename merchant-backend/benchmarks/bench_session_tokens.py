@@ -0,0 +1,72 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Per-request verify cost of a TAP request signature against an HMAC session
+token issued for the same agent.
+
+    python -m benchmarks.bench_session_tokens
+
+Each signed request is freshly signed (distinct nonce), as an agent would
+send them, with the result cache and replay store off so only parsing and
+Ed25519 are timed. The session path checks one token over and over.
+"""
+
+import os
+import time
+import tempfile
+
+from app.security.signature_verification import signature_verifier
+from app.security.session_tokens import SessionTokenIssuer, SQLiteRevocationList
+from benchmarks.common import AGENT_URL, install_benchmark_key, signed_requests, report
+
+REQUESTS = 5_000
+AUTHORITY = "merchant.example.com"
+
+
+def main():
+    private_key = install_benchmark_key(signature_verifier)
+    signature_verifier.nonce_store = None
+    signature_verifier.result_cache = None
+    requests = signed_requests(signature_verifier, private_key, REQUESTS)
+
+    start = time.perf_counter()
+    for request in requests:
+        assert signature_verifier.is_trusted_agent(*request)[0]
+    report("signature: parse + Ed25519 verify", time.perf_counter() - start, REQUESTS)
+
+    issuer = SessionTokenIssuer(b"s" * 32)
+    token, claims = issuer.issue(AGENT_URL, "bench-key", AUTHORITY, "agent-browser-auth")
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        assert issuer.verify(token, AUTHORITY)[0]
+    report("session token: HMAC-SHA256 verify", time.perf_counter() - start, REQUESTS)
+
+    # Revocation checks are dictionary lookups, so a long list costs nothing per request
+    for i in range(10_000):
+        issuer.revoke(claims._replace(token_id=f"revoked-{i}"))
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        assert issuer.verify(token, AUTHORITY)[0]
+    report("session token: with 10k revoked tokens", time.perf_counter() - start, REQUESTS)
+
+    # Shared across workers: one SQLite primary-key probe per request
+    with tempfile.TemporaryDirectory() as directory:
+        shared = SessionTokenIssuer(b"s" * 32, revocations=SQLiteRevocationList(os.path.join(directory, "sessions.db")))
+        for i in range(10_000):
+            shared.revoke(claims._replace(token_id=f"revoked-{i}"))
+        start = time.perf_counter()
+        for _ in range(REQUESTS):
+            assert shared.verify(token, AUTHORITY)[0]
+        report("session token: 10k revoked, shared SQLite list", time.perf_counter() - start, REQUESTS)
+
+    print(f"\nToken length: {len(token)} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Per-call cost of parsing the Signature-Input / Signature headers.
+
+    python -m benchmarks.bench_signature_parsing
+
+"before" is the original fixed-order regex parser; "after" is the
+structured-field parser, both uncached (unique headers) and cached
+(repeated headers, as seen on agent retries).
+"""
+
+import re
+import time
+
+from app.security.signature_verification import signature_verifier
+from app.security.structured_fields import parse_signature_input, parse_signature
+from benchmarks.common import report
+
+ITERATIONS = 100_000
+
+
+def legacy_parse(signature_agent: str, signature_input: str, signature: str):
+    """The regex parser parse_signature_headers used before the structured-field parser."""
+    agent_url = signature_agent.strip('"')
+    signature_input_pattern = r'sig1=\("([^"]+)"\);\s*nonce="([^"]+)";\s*created=(\d+);\s*expires=(\d+);\s*keyid="([^"]+)";\s*tag="([^"]+)"'
+    match = re.match(signature_input_pattern, signature_input.strip())
+    if not match:
+        return None
+    signature_params, nonce, created, expires, keyid, tag = match.groups()
+    sig_match = re.match(r'sig1=:([^:]+):', signature.strip())
+    if not sig_match:
+        return None
+    return {
+        "agent_url": agent_url, "signature_params": signature_params.split(" "), "nonce": nonce,
+        "created": int(created), "expires": int(expires), "keyid": keyid, "tag": tag,
+        "signature": sig_match.group(1),
+    }
+
+
+def _headers(i: int):
+    now = int(time.time())
+    return (
+        '"https://directory.example.com"',
+        f'sig1=("@authority" "@path"); nonce="nonce-{i}"; created={now}; expires={now + 300}; '
+        f'keyid="key-1"; tag="agent-browser-auth"',
+        "sig1=:5VqFaPzkfCQ8MzNSEHdmkLe4Pf1RMyN7q8kvgHXbyGqV6gRDSGYDAxyDodkxAsUB1bKFgrj6wbbV2YhMHBPuCbYx:",
+    )
+
+
+def _run(label, parse, headers):
+    start = time.perf_counter()
+    for h in headers:
+        parse(*h)
+    report(label, time.perf_counter() - start, len(headers))
+
+
+def main():
+    unique = [_headers(i) for i in range(ITERATIONS)]
+    repeated = [_headers(0)] * ITERATIONS
+
+    _run("before: regex parser", legacy_parse, unique)
+
+    parse_signature_input.cache_clear()
+    parse_signature.cache_clear()
+    _run("after: structured-field parser, cache miss", signature_verifier.parse_signature_headers, unique)
+    _run("after: structured-field parser, cache hit", signature_verifier.parse_signature_headers, repeated)
+
+    # Same parameters, different order: valid RFC 9421 that the regex rejected
+    now = int(time.time())
+    reordered = (
+        '"https://directory.example.com"',
+        f'sig2=("@authority" "@path");keyid="key-1";tag="agent-browser-auth";created={now};'
+        f'expires={now + 300};nonce="n"',
+        "sig2=:abc:",
+    )
+    print(f"\nReordered sig2 header accepted: before={legacy_parse(*reordered) is not None} "
+          f"after={signature_verifier.parse_signature_headers(*reordered) is not None}")
+
+    info = parse_signature_input.cache_info()
+    print(f"Signature-Input cache: hits={info.hits} misses={info.misses} size={info.currsize}/{info.maxsize}")
+
+
+if __name__ == "__main__":
+    main()
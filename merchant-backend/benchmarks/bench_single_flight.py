@@ -0,0 +1,114 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Bursts of identical catalog reads, as when an agent fleet starts up: many
+concurrent requests for the same listing or the same product, sent through
+the ASGI app so they run on the threadpool like production traffic.
+Reports the SQL statements against the products table and the wall time
+with single-flight coalescing off and on.
+
+    python -m benchmarks.bench_single_flight [rows]
+
+The product and listing caches are sized to zero and the count cache is
+emptied before every burst, so each request that runs its read really goes
+to SQLite.
+"""
+
+import os
+import sys
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("TAP_VERIFICATION_MODE", "proxy")
+os.environ.setdefault("SEARCH_INDEX_WARM", "false")
+os.environ.setdefault("COLUMNAR_SNAPSHOT", "false")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app.catalog.product_cache import ProductCache
+from app.catalog.search_cache import SearchResultCache
+from app.counts import CountCache
+from app.database.database import get_db
+from app.main import app
+from app.routes import products
+from benchmarks.catalog_data import catalog_engine
+
+CLIENTS = 40
+BURSTS = [
+    ("search, 1 listing", ["/api/products/?category=Kitchen&min_price=10&max_price=50"]),
+    ("search, 4 listings", [f"/api/products/?category={category}" for category in ("Kitchen", "Garden", "Toys", "Books")]),
+    ("product, 1 id", ["/api/products/4242"]),
+]
+
+
+class StatementCounter:
+    def __init__(self, engine):
+        self.count = 0
+        self._lock = threading.Lock()
+        event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, conn, cursor, statement, parameters, context, executemany):
+        if "products" in statement:
+            with self._lock:
+                self.count += 1
+
+
+def burst(client, paths, clients):
+    barrier = threading.Barrier(clients)
+
+    def one(index):
+        barrier.wait()
+        return client.get(paths[index % len(paths)]).status_code
+
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        statuses = list(pool.map(one, range(clients)))
+    assert all(status == 200 for status in statuses), statuses
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    logging.disable(logging.INFO)
+    engine = catalog_engine(rows)
+    Session = sessionmaker(bind=engine)
+    statements = StatementCounter(engine)
+
+    def override():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override
+    products.product_cache = ProductCache(max_entries=0)
+    products.search_cache = SearchResultCache(max_bytes=0)
+    print(f"{rows:,} products, bursts of {CLIENTS} concurrent requests")
+    print(f"  {'burst':<20} {'off: queries':>13} {'time':>9} {'on: queries':>12} {'time':>9}")
+    with TestClient(app) as client:
+        for label, paths in BURSTS:
+            results = []
+            for enabled in (False, True):
+                products.single_flight.enabled = enabled
+                products.count_cache = CountCache()
+                before = statements.count
+                start = time.perf_counter()
+                burst(client, paths, CLIENTS)
+                results.append((statements.count - before, time.perf_counter() - start))
+            (off_queries, off_time), (on_queries, on_time) = results
+            print(f"  {label:<20} {off_queries:>13} {off_time * 1000:7.0f}ms {on_queries:>12} {on_time * 1000:7.0f}ms")
+        print(f"  {products.single_flight.stats()}")
+    app.dependency_overrides.clear()
+
+
+if __name__ == "__main__":
+    main()
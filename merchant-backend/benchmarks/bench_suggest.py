@@ -0,0 +1,99 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Prefix suggestions at 1M products: the suggest index against the SQL it
+replaces (LIKE on name, grouped and ordered by stock), for prefixes from
+one letter to a couple of words. A second run gives every product its own
+name, the worst case for the index's memory and width of prefix ranges.
+
+    python -m benchmarks.bench_suggest [rows]
+"""
+
+import sys
+import time
+import random
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import sessionmaker
+
+from app.catalog.events import INSERT, ProductChange
+from app.catalog.suggest import SuggestIndex
+from app.models.models import Product as ProductModel
+from benchmarks.catalog_data import catalog_engine
+from benchmarks.common import timed
+
+PREFIXES = ["w", "ha", "pre", "wirel", "hair d", "premium steel st", "zz"]
+REPEAT = 200
+
+
+def sql_suggest(db, prefix, limit=10):
+    pattern = f"{prefix}%"
+    word = f"% {prefix}%"
+    return db.query(ProductModel.name, func.sum(ProductModel.stock_quantity).label("weight")).filter(
+        or_(ProductModel.name.ilike(pattern), ProductModel.name.ilike(word))
+    ).group_by(ProductModel.name).order_by(func.sum(ProductModel.stock_quantity).desc()).limit(limit).all()
+
+
+def footprint(index):
+    """Bytes held by the index: phrase texts, per-phrase arrays and the entry arrays."""
+    texts = sys.getsizeof(index._texts) + sum(sys.getsizeof(text) for text in index._texts)
+    arrays = sum(sys.getsizeof(column) for column in (
+        index._kinds, index._weights, index._counts, index._entry_phrases, index._entry_offsets
+    ))
+    return texts + arrays
+
+
+def build(rows_factory):
+    index = SuggestIndex()
+    start = time.perf_counter()
+    index.load(rows_factory)
+    return index, time.perf_counter() - start, footprint(index)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    Session = sessionmaker(bind=catalog_engine(rows))
+    db = Session()
+    catalog = db.query(ProductModel.name, ProductModel.category, ProductModel.stock_quantity).all()
+
+    index, seconds, memory = build(lambda: iter([0] + catalog))
+    stats = index.stats()
+    print(f"{rows:,} products: {stats['phrases']:,} phrases, {stats['entries']:,} entries, "
+          f"built in {seconds:.1f}s, {memory / 1e6:.0f} MB")
+    print(f"  {'prefix':<18} {'sqlite':>9} {'index p50':>10} {'p99':>8}  top suggestion")
+    for prefix in PREFIXES:
+        sql = timed(lambda: sql_suggest(db, prefix))
+        suggested = timed(lambda: index.suggest(prefix, 10), REPEAT)
+        result = suggested.result
+        top = f"{result[0][0]} ({result[0][2]:,})" if result else "-"
+        print(f"  {prefix!r:<18} {sql.median * 1000:7.1f}ms {suggested.median * 1e6:8.0f}us "
+              f"{suggested.p99 * 1e6:6.0f}us  {top}")
+
+    # Every product named differently: one phrase (and 3-5 entries) per product
+    rng = random.Random(1)
+    unique = [(f"{name} {rng.randrange(36 ** 6):06x}", category, stock) for name, category, stock in catalog]
+    index, seconds, memory = build(lambda: iter([0] + unique))
+    stats = index.stats()
+    print(f"unique names: {stats['phrases']:,} phrases, {stats['entries']:,} entries, "
+          f"built in {seconds:.1f}s, {memory / 1e6:.0f} MB")
+    for prefix in PREFIXES:
+        suggested = timed(lambda: index.suggest(prefix, 10), REPEAT)
+        print(f"  {prefix!r:<18} {suggested.median * 1e6:8.0f}us {suggested.p99 * 1e6:6.0f}us")
+
+    start = time.perf_counter()
+    for serial in range(10_000):
+        values = {"name": f"Brand New Gadget {serial}", "category": "Electronics", "stock_quantity": 5}
+        index.apply([ProductChange(INSERT, rows + serial + 1, values, frozenset(values))])
+    print(f"  10,000 new products (new phrases): {(time.perf_counter() - start) * 1000:.0f}ms, "
+          f"{index.stats()['delta']:,} entries still in the delta")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Latency of an agent request verified through the proxy path (a call to
+/api/auth/verify-signature, then the request with the forwarded
+x-signature-* headers) against the same request verified in-process by
+TAPVerificationMiddleware.
+
+    python -m benchmarks.bench_tap_middleware
+
+Both paths run through Starlette's TestClient, so the numbers leave out the
+real network hop the proxy adds; the in-process saving is a lower bound.
+"""
+
+import io
+import time
+import logging
+import contextlib
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.security.signature_verification import signature_verifier
+from app.security.tap_middleware import TAPVerificationMiddleware
+from benchmarks.common import install_benchmark_key, signed_request, report
+
+REQUESTS = 500
+AUTHORITY = "testserver"
+PATH = "/api/auth/check-verification"
+
+
+def _tap_middleware(client: TestClient) -> TAPVerificationMiddleware:
+    client.get("/health")
+    layer = app.middleware_stack
+    while not isinstance(layer, TAPVerificationMiddleware):
+        layer = layer.app
+    return layer
+
+
+def proxy_path(client: TestClient, requests):
+    for signature_agent, signature_input, signature, request_data in requests:
+        verdict = client.post("/api/auth/verify-signature", json={
+            "signature_agent": signature_agent,
+            "signature_input": signature_input,
+            "signature": signature,
+            "authority": request_data["authority"],
+            "path": request_data["path"],
+        }).json()
+        response = client.get(PATH, headers={
+            "x-signature-verified": "true" if verdict["is_trusted"] else "false",
+            "x-agent-name": "Example Directory",
+            "x-verified-by": "cdn-proxy",
+        })
+        assert response.json()["verified"], response.text
+
+
+def inprocess_path(client: TestClient, requests):
+    for signature_agent, signature_input, signature, _ in requests:
+        response = client.get(PATH, headers={
+            "signature-agent": signature_agent,
+            "signature-input": signature_input,
+            "signature": signature,
+        })
+        assert response.json()["verified"], response.text
+
+
+def main():
+    logging.disable(logging.INFO)
+    private_key = install_benchmark_key(signature_verifier)
+    # Every request below is freshly signed; keep the timings free of replay and cache bookkeeping
+    signature_verifier.nonce_store = None
+    signature_verifier.result_cache = None
+
+    def fresh_requests():
+        return [signed_request(signature_verifier, private_key, path=PATH, authority=AUTHORITY)
+                for _ in range(REQUESTS)]
+
+    with TestClient(app) as client:
+        middleware = _tap_middleware(client)
+        for mode, run in (("proxy", proxy_path), ("inprocess", inprocess_path)):
+            middleware.mode = mode
+            requests = fresh_requests()
+            # check_verification and the request logger are chatty; keep them out of the timings
+            with contextlib.redirect_stdout(io.StringIO()):
+                run(client, requests[:20])
+                start = time.perf_counter()
+                run(client, requests)
+                elapsed = time.perf_counter() - start
+            report(f"{mode}: verify + request", elapsed, REQUESTS)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Cost of re-verifying an identical signed request with and without the
+verified-signature result cache.
+
+    python -m benchmarks.bench_verification_cache
+
+The first runs switch replay protection off, since every repetition
+reuses the same nonce. With it on, each retry is rejected as a replay and
+the cache only saves the Ed25519 verify behind that rejection. The last
+runs check that forged signatures are not cached, so they cannot evict
+real entries.
+"""
+
+import os
+import time
+
+import base58
+
+from app.security.signature_verification import signature_verifier
+from app.security.nonce_store import NonceStore
+from app.security.verification_cache import VerificationCache
+from benchmarks.common import install_benchmark_key, signed_request, report
+
+RETRIES = 20_000
+
+
+def main():
+    private_key = install_benchmark_key(signature_verifier)
+    request = signed_request(signature_verifier, private_key)
+    signature_verifier.nonce_store = None
+
+    for label, cache in (("no cache", None), ("with result cache", VerificationCache())):
+        signature_verifier.result_cache = cache
+        start = time.perf_counter()
+        for _ in range(RETRIES):
+            assert signature_verifier.is_trusted_agent(*request)[0]
+        report(f"retry verify: {label}", time.perf_counter() - start, RETRIES)
+    print(f"\nCache stats: {signature_verifier.result_cache.stats()}")
+
+    signature_verifier.nonce_store = NonceStore()
+    for label, cache in (("no cache", None), ("with result cache", VerificationCache())):
+        signature_verifier.result_cache = cache
+        replayed = signed_request(signature_verifier, private_key, path="/api/products/2")
+        assert signature_verifier.is_trusted_agent(*replayed)[0]
+        start = time.perf_counter()
+        for _ in range(RETRIES):
+            assert not signature_verifier.is_trusted_agent(*replayed)[0]
+        report(f"replayed retry rejected: {label}", time.perf_counter() - start, RETRIES)
+
+    fresh = signed_request(signature_verifier, private_key, path="/api/products/3")
+    print(f"\nWith replay protection: first={signature_verifier.is_trusted_agent(*fresh)}, "
+          f"retry={signature_verifier.is_trusted_agent(*fresh)}")
+
+    # Forgeries with made-up signatures leave the cached entries alone
+    cache = signature_verifier.result_cache = VerificationCache(max_entries=100)
+    signature_verifier.is_trusted_agent(*signed_request(signature_verifier, private_key, path="/api/products/4"))
+    agent, signature_input, _, request_data = signed_request(signature_verifier, private_key)
+    forged_signature = base58.b58encode(os.urandom(64)).decode("ascii")
+    for _ in range(1000):
+        signature_verifier.is_trusted_agent(agent, signature_input, f"sig1=:{forged_signature}:", request_data)
+        forged_signature = forged_signature[1:] + forged_signature[0]
+    print(f"After 1000 forged signatures: {cache.stats()['size']} cached entry, {cache.evictions} evictions")
+
+    # Rotating the agent key makes old entries unreachable
+    install_benchmark_key(signature_verifier)
+    signature_verifier.nonce_store = None
+    print(f"After key rotation: {signature_verifier.is_trusted_agent(*request)}")
+
+
+if __name__ == "__main__":
+    main()
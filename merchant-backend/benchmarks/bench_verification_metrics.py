@@ -0,0 +1,70 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Overhead of per-stage verification metrics, and the stage breakdown they
+produce.
+
+    python -m benchmarks.bench_verification_metrics
+
+Freshly signed requests are verified with metrics off and on (result cache
+and replay store off, so every request does the full Ed25519 work). The
+run fails if metrics add more than OVERHEAD_BUDGET to a verification.
+"""
+
+import sys
+import time
+
+from app.metrics import MetricsRegistry
+from app.security.signature_verification import signature_verifier
+from app.security.verification_metrics import VerificationMetrics
+from benchmarks.common import install_benchmark_key, signed_requests, report
+
+REQUESTS = 5_000
+ROUNDS = 5
+OVERHEAD_BUDGET = 0.03
+
+
+def run(requests) -> float:
+    start = time.perf_counter()
+    for request in requests:
+        signature_verifier.is_trusted_agent(*request)
+    return time.perf_counter() - start
+
+
+def main():
+    private_key = install_benchmark_key(signature_verifier)
+    signature_verifier.nonce_store = None
+    signature_verifier.result_cache = None
+    requests = signed_requests(signature_verifier, private_key, REQUESTS)
+    registry = MetricsRegistry()
+    metrics = VerificationMetrics(registry)
+
+    # Interleave rounds so CPU frequency drift hits both sides alike
+    timings = {"off": [], "on": []}
+    for _ in range(ROUNDS):
+        for label, value in (("off", None), ("on", metrics)):
+            signature_verifier.metrics = value
+            timings[label].append(run(requests))
+    off, on = min(timings["off"]), min(timings["on"])
+    report("verify, metrics off", off, REQUESTS)
+    report("verify, metrics on", on, REQUESTS)
+    overhead = on / off - 1
+    print(f"\nOverhead: {overhead:+.2%} ({(on - off) / REQUESTS * 1e9:.0f} ns/verify), budget {OVERHEAD_BUDGET:.0%}")
+
+    print("\nStage breakdown:")
+    for stage, stats in sorted(registry.snapshot()["tap_signature_stage_seconds"].items()):
+        print(f"  {stage:<8} {stats['mean_us']:8.2f} us  ({stats['count']:,} samples)")
+    print(f"Outcomes: {registry.snapshot()['tap_signature_verifications_total']}")
+
+    if overhead > OVERHEAD_BUDGET:
+        sys.exit(f"Metrics overhead {overhead:.2%} exceeds budget {OVERHEAD_BUDGET:.0%}")
+
+
+if __name__ == "__main__":
+    main()
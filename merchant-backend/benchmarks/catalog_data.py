@@ -0,0 +1,114 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Synthetic product catalogs for the catalog benchmarks.
+
+    engine = catalog_engine(1_000_000)
+
+Builds (once) and reuses a SQLite file with the app's schema and the given
+number of products, under BENCH_DATA_DIR (default: the system temp dir).
+Products are deterministic: the same row count always yields the same
+catalog. The file name includes a hash of the schema, so model changes
+produce a fresh file instead of a stale one.
+"""
+
+import os
+import random
+import hashlib
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Iterator, Tuple
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateTable
+
+from app.models.models import Base, Product
+from app.database.database import create_schema
+
+CATEGORIES = {
+    "Electronics": ["Headphones", "Speaker", "Charger", "Keyboard", "Monitor", "Smartphone", "Laptop", "Camera"],
+    "Sports": ["Running Shoes", "Yoga Mat", "Dumbbells", "Tennis Racket", "Bicycle Helmet", "Water Bottle"],
+    "Kitchen": ["Coffee Maker", "Blender", "Knife Set", "Frying Pan", "Toaster", "Kettle"],
+    "Home": ["Desk Lamp", "Throw Pillow", "Bookshelf", "Area Rug", "Wall Clock", "Candle"],
+    "Clothing": ["T-Shirt", "Hoodie", "Jeans", "Rain Jacket", "Wool Socks", "Sneakers"],
+    "Beauty": ["Face Serum", "Shampoo", "Lip Balm", "Hair Dryer", "Sunscreen"],
+    "Toys": ["Building Blocks", "Puzzle", "Plush Bear", "Remote Car", "Board Game"],
+    "Garden": ["Garden Hose", "Pruning Shears", "Planter", "Bird Feeder", "Seed Kit"],
+    "Office": ["Notebook", "Fountain Pen", "Desk Organizer", "Office Chair", "Stapler"],
+    "Outdoors": ["Tent", "Sleeping Bag", "Hiking Backpack", "Camping Stove", "Headlamp"],
+    "Books": ["Cookbook", "Novel", "Travel Guide", "Children's Book", "Atlas"],
+    "Pets": ["Dog Leash", "Cat Tree", "Pet Bed", "Chew Toy", "Aquarium Filter"],
+}
+ADJECTIVES = ["Wireless", "Portable", "Premium", "Compact", "Ergonomic", "Organic", "Vintage", "Smart",
+              "Classic", "Deluxe", "Lightweight", "Waterproof", "Heavy-Duty", "Eco", "Pro", "Mini"]
+MATERIALS = ["Bamboo", "Steel", "Cotton", "Leather", "Ceramic", "Aluminum", "Wool", "Glass", "Oak", "Silicone"]
+PHRASES = ["built to last", "with a two-year warranty", "perfect for daily use", "great gift idea",
+           "noise cancellation", "fast charging", "dishwasher safe", "machine washable", "easy to assemble",
+           "long battery life", "for work and travel", "sustainably sourced", "award-winning design",
+           "high performance", "made for beginners and experts alike", "ultra quiet operation"]
+
+
+def product_rows(count: int, seed: int = 42, start: datetime = datetime(2024, 1, 1)) -> Iterator[Tuple]:
+    """(name, description, price, category, image_url, stock_quantity, created_at) tuples."""
+    rng = random.Random(seed)
+    categories = list(CATEGORIES)
+    step = timedelta(days=600) / max(count, 1)
+    for i in range(count):
+        category = categories[rng.randrange(len(categories))]
+        noun = rng.choice(CATEGORIES[category])
+        name = f"{rng.choice(ADJECTIVES)} {rng.choice(MATERIALS)} {noun}"
+        description = f"{name} {', '.join(rng.sample(PHRASES, 3))}."
+        price = round(rng.lognormvariate(3.5, 1.0), 2)
+        stock = rng.randrange(0, 500)
+        yield (name, description, price, category, f"https://images.example.com/{i}.jpg", stock,
+               (start + step * i).isoformat(sep=" "))
+
+
+def catalog_path(rows: int) -> str:
+    ddl = str(CreateTable(Product.__table__).compile(create_engine("sqlite://")))
+    schema = hashlib.sha256(ddl.encode("utf-8")).hexdigest()[:8]
+    directory = os.getenv("BENCH_DATA_DIR", tempfile.gettempdir())
+    return os.path.join(directory, f"merchant-bench-{rows}-{schema}.db")
+
+
+def catalog_engine(rows: int) -> Engine:
+    """Engine on a catalog with `rows` products, generated on first use."""
+    path = catalog_path(rows)
+    if not os.path.exists(path):
+        _build(path, rows)
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    create_schema(engine)
+    return engine
+
+
+def _build(path: str, rows: int):
+    print(f"Generating {rows:,} products in {path} ...")
+    started = time.perf_counter()
+    partial = path + ".partial"
+    if os.path.exists(partial):
+        os.remove(partial)
+    Base.metadata.create_all(bind=create_engine(f"sqlite:///{partial}"))
+    connection = sqlite3.connect(partial)
+    connection.execute("PRAGMA journal_mode = OFF")
+    connection.execute("PRAGMA synchronous = OFF")
+    with connection:
+        connection.executemany(
+            "INSERT INTO products (name, description, price, category, image_url, stock_quantity, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            product_rows(rows),
+        )
+    connection.execute("ANALYZE")
+    connection.close()
+    # Index creation (full-text rebuild included) happens here, once, before the file is published
+    create_schema(create_engine(f"sqlite:///{partial}"))
+    os.replace(partial, path)
+    print(f"  done in {time.perf_counter() - started:.1f}s")
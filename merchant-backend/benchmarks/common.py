@@ -0,0 +1,100 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Shared helpers for the benchmarks: signed TAP requests and timing utilities.
+"""
+
+import time
+import uuid
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import base58
+from cryptography.hazmat.primitives.asymmetric import ed25519
+
+from app.security.signature_verification import SignatureVerifier
+
+AGENT_URL = "https://directory.example.com"
+
+
+def install_benchmark_key(verifier: SignatureVerifier) -> ed25519.Ed25519PrivateKey:
+    """Replace the trusted agent key with a freshly generated one we can sign with."""
+    private_key = ed25519.Ed25519PrivateKey.generate()
+    verifier.trusted_agents[AGENT_URL]["public_key"] = private_key.public_key()
+    return private_key
+
+
+def signed_request(verifier: SignatureVerifier, private_key: ed25519.Ed25519PrivateKey,
+                   path: str = "/api/products/1", ttl: int = 300,
+                   authority: str = "merchant.example.com") -> Tuple[str, str, str, Dict]:
+    """Build one (signature_agent, signature_input, signature, request_data) triple."""
+    now = int(time.time())
+    nonce = uuid.uuid4().hex
+    params = ["@authority", "@path"]
+    request_data = {"authority": authority, "path": path,
+                    "directory-agent": "", "query-param": ""}
+    base = verifier._build_signature_string(params, request_data, nonce, now, now + ttl)
+    signature = base58.b58encode(private_key.sign(base.encode("utf-8"))).decode("ascii")
+    components = " ".join(f'"{param}"' for param in params)
+    signature_input = (f'sig1=({components}); nonce="{nonce}"; created={now}; '
+                       f'expires={now + ttl}; keyid="bench-key"; tag="agent-browser-auth"')
+    return f'"{AGENT_URL}"', signature_input, f"sig1=:{signature}:", request_data
+
+
+def signed_requests(verifier: SignatureVerifier, private_key: ed25519.Ed25519PrivateKey,
+                    count: int) -> List[Tuple[str, str, str, Dict]]:
+    return [signed_request(verifier, private_key, path=f"/api/products/{i}") for i in range(count)]
+
+
+def timeit(fn: Callable[[], object], repeat: int = 3) -> float:
+    """Best-of-N wall time in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+class Timing(NamedTuple):
+    samples: List[float]
+    result: Any
+
+    @property
+    def best(self) -> float:
+        return self.samples[0]
+
+    @property
+    def median(self) -> float:
+        return self.samples[len(self.samples) // 2]
+
+    @property
+    def p99(self) -> float:
+        return self.samples[int(len(self.samples) * 0.99)]
+
+
+def timed(fn: Callable[[], Any], repeat: int = 3, setup: Optional[Callable[[], object]] = None) -> Timing:
+    """Sorted wall times in seconds of `repeat` calls, with the last call's result.
+
+    `setup` runs untimed before every call.
+    """
+    samples = []
+    result = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return Timing(samples, result)
+
+
+def report(label: str, seconds: float, ops: int):
+    print(f"{label:<48} {seconds * 1000:10.2f} ms  {ops / seconds:12,.0f} ops/s  "
+          f"{seconds / ops * 1e6:8.2f} us/op")
@@ -0,0 +1,90 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Minimal in-process stand-in for the Agent Registry (`GET /agents`,
+`GET /{key_id}`), for exercising AgentKeyStore without the Node service.
+It also serves `jwks` at `GET /.well-known/jwks.json` for the agent-data
+decoder.
+
+    registry = StubRegistry()
+    registry.add_key("key-1", public_key_base58, agent_domain="https://directory.example.com")
+    registry.start()
+    store = AgentKeyStore(registry.url)
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from urllib.parse import unquote
+
+
+class StubRegistry:
+    def __init__(self):
+        self.keys: Dict[str, Dict] = {}
+        self.jwks: Dict[str, List[Dict]] = {"keys": []}
+        self.requests = 0
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def add_key(self, key_id: str, public_key: str, agent_name: str = "Stub Agent",
+                agent_domain: str = "https://directory.example.com", is_active: str = "true"):
+        self.keys[key_id] = {
+            "key_id": key_id, "public_key": public_key, "algorithm": "ed25519", "is_active": is_active,
+            "agent_id": 1, "agent_name": agent_name, "agent_domain": agent_domain,
+        }
+
+    def _agents(self):
+        agents: Dict[str, Dict] = {}
+        for key in self.keys.values():
+            agent = agents.setdefault(key["agent_domain"], {
+                "id": len(agents) + 1, "name": key["agent_name"], "domain": key["agent_domain"],
+                "is_active": "true", "keys": [],
+            })
+            agent["keys"].append(key)
+        return list(agents.values())
+
+    def start(self, port: int = 0) -> "StubRegistry":
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                registry.requests += 1
+                if self.path.rstrip("/") == "/agents":
+                    self._reply(200, registry._agents())
+                elif self.path == "/.well-known/jwks.json":
+                    self._reply(200, registry.jwks)
+                elif unquote(self.path[1:]) in registry.keys:
+                    self._reply(200, registry.keys[unquote(self.path[1:])])
+                else:
+                    self._reply(404, {"success": False, "message": "Key not found"})
+
+            def _reply(self, status, body):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
@@ -0,0 +1,62 @@
+# © 2025 Visa.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Bulk import products from a CSV or NDJSON supplier feed.
+
+    python import_products.py feed.csv
+    python import_products.py feed.ndjson.gz --chunk-size 10000
+    cat feed.ndjson | python import_products.py - --format ndjson
+
+Rows with a SKU update the existing product with that SKU.
+"""
+
+import argparse
+import gzip
+import io
+import sys
+
+from app.catalog.bulk_import import CSV, FORMATS, NDJSON, BulkImporter
+from app.database.database import create_tables, engine
+
+def open_feed(path: str):
+    """Text lines of the feed; `-` reads standard input, `.gz` files are decompressed as they stream."""
+    if path == "-":
+        return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8-sig", newline="")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8-sig", newline="")
+    return open(path, encoding="utf-8-sig", newline="")
+
+def guess_format(path: str) -> str:
+    name = path[:-3] if path.endswith(".gz") else path
+    return NDJSON if name.endswith((".ndjson", ".jsonl")) else CSV
+
+def print_progress(report):
+    print(f"{report.rows:,} rows ({report.inserted:,} inserted, {report.updated:,} updated, "
+          f"{report.unchanged:,} unchanged, {report.failed:,} failed) in {report.seconds:.1f}s, "
+          f"{report.rows / report.seconds if report.seconds else 0:,.0f} rows/s", file=sys.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import products from a CSV or NDJSON feed")
+    parser.add_argument("path", help="feed file (.csv, .ndjson or .jsonl, optionally .gz), or - for stdin")
+    parser.add_argument("--format", choices=FORMATS, help="feed format (default: from the file name)")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="rows per transaction")
+    args = parser.parse_args()
+    
+    create_tables()
+    importer = BulkImporter(chunk_size=args.chunk_size)
+    with open_feed(args.path) as lines:
+        report = importer.run(engine, lines, args.format or guess_format(args.path), progress=print_progress)
+    for error in report.errors:
+        print(f"line {error['line']}: {error['error']}", file=sys.stderr)
+    if report.error:
+        print(f"import stopped: {report.error}", file=sys.stderr)
+    return 1 if report.failed or report.error else 0
+
+if __name__ == "__main__":
+    sys.exit(main())